@@ -0,0 +1,270 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Offline benchmarks for cloning, pulling, and archiving repos.
+
+Synthetic repos of different shapes are generated locally and served over
+`file://`, so no GitHub access is needed. Each phase is timed for every
+archive format and history mode, and results can be saved as a baseline and
+compared against on later runs to catch regressions.
+
+Usage::
+
+    python benchmarks/bench.py --save baseline.json
+    python benchmarks/bench.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer
+
+import git
+
+import githubtakeout
+from githubtakeout.compressors import zstd_available
+
+# synthetic repo shapes, the number of files and commits is multiplied by `--scale`
+SHAPES = {
+    "small_files": {"files": 2000, "file_size": 1024, "commits": 1},
+    "large_binaries": {"files": 4, "file_size": 16 * 1024 * 1024, "commits": 1},
+    "deep_history": {"files": 50, "file_size": 4096, "commits": 500},
+}
+FORMATS = [fmt for fmt in githubtakeout.EXTENSIONS if fmt != "tar.zst"]
+if zstd_available():
+    FORMATS.append("tar.zst")
+# ignore slowdowns smaller than this, they are mostly noise
+MIN_REGRESSION_SECS = 0.05
+
+logger = logging.getLogger("bench")
+
+
+def make_content(rng, size, binary):
+    if binary:
+        # random bytes don't compress, like media or build artifacts
+        return rng.randbytes(size)
+    words = [b"alpha", b"beta", b"gamma", b"delta", b"epsilon", b"zeta", b"eta"]
+    text = bytearray()
+    while len(text) < size:
+        text += b" ".join(rng.choices(words, k=12)) + b"\n"
+    return bytes(text[:size])
+
+
+def file_path(work_dir, i):
+    return work_dir / f"dir{i % 20:02d}" / f"file{i:05d}.dat"
+
+
+def make_remote(base_dir, name, files, file_size, commits, seed=0):
+    """Create a bare repo with the given shape and return its `file://` URL."""
+    rng = random.Random(seed)
+    binary = file_size >= 1024 * 1024
+    work_dir = base_dir / "work" / name
+    with git.Repo.init(work_dir, initial_branch="main") as work_repo:
+        for i in range(files):
+            path = file_path(work_dir, i)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(make_content(rng, file_size, binary))
+        work_repo.git.add(all=True)
+        work_repo.index.commit("initial commit")
+        # each later commit rewrites one file, building up history
+        for i in range(1, commits):
+            path = file_path(work_dir, i % files)
+            path.write_bytes(make_content(rng, file_size, binary))
+            work_repo.index.add([str(path)])
+            work_repo.index.commit(f"commit {i}")
+        bare_dir = base_dir / "remotes" / f"{name}.git"
+        work_repo.clone(bare_dir, bare=True).close()
+        work_repo.create_remote("origin", bare_dir.as_uri())
+    return bare_dir.as_uri()
+
+
+def push_commit(base_dir, name):
+    work_dir = base_dir / "work" / name
+    with git.Repo(work_dir) as work_repo:
+        file_path = work_dir / "CHANGES.md"
+        with open(file_path, "a") as f:
+            f.write("changed\n")
+        work_repo.git.add(all=True)
+        work_repo.index.commit("update CHANGES.md")
+        work_repo.remotes.origin.push("main")
+
+
+def timed(func, *args, **kwargs):
+    start = default_timer()
+    func(*args, **kwargs)
+    return default_timer() - start
+
+
+def bench_shape(base_dir, shape, url, repeat):
+    """Time each phase for a repo shape, returning the fastest of `repeat` runs."""
+    results = {}
+
+    def record(key, secs):
+        key = f"{shape}/{key}"
+        results[key] = min(results.get(key, secs), secs)
+        logger.info(f"{key}: {secs:.3f} secs")
+
+    out_dir = base_dir / "out" / shape
+    for _ in range(repeat):
+        for include_history in (False, True):
+            mode = "history" if include_history else "shallow"
+            local_repo_dir = out_dir / mode / shape
+            shutil.rmtree(local_repo_dir.parent, ignore_errors=True)
+            record(
+                f"{mode}/clone",
+                timed(
+                    githubtakeout.clone,
+                    url,
+                    local_repo_dir,
+                    include_history,
+                    show_progress=False,
+                ),
+            )
+            if include_history:
+                push_commit(base_dir, shape)
+                record(
+                    f"{mode}/pull",
+                    timed(githubtakeout.pull, local_repo_dir, show_progress=False),
+                )
+            else:
+                shutil.rmtree(local_repo_dir / ".git")
+            for archive_format in FORMATS:
+                archive_path = githubtakeout.get_archive_path(
+                    local_repo_dir, archive_format
+                )
+                record(
+                    f"{mode}/archive/{archive_format}",
+                    timed(githubtakeout.archive, local_repo_dir, archive_format),
+                )
+                archive_path.unlink()
+        # clone and archive straight from git objects (`--no_checkout`)
+        bare_dir = out_dir / "no_checkout" / shape
+        for archive_format in FORMATS:
+            shutil.rmtree(bare_dir.parent, ignore_errors=True)
+
+            def no_checkout(archive_format=archive_format):
+                githubtakeout.clone(
+                    url, bare_dir, include_history=False, show_progress=False, bare=True
+                )
+                githubtakeout.archive_objects(bare_dir, archive_format)
+
+            record(f"no_checkout/archive/{archive_format}", timed(no_checkout))
+        # mirror and bundle (`--mirror`)
+        mirror_dir = out_dir / "mirror" / f"{shape}.git"
+        shutil.rmtree(mirror_dir.parent, ignore_errors=True)
+        record(
+            "mirror/clone",
+            timed(githubtakeout.mirror_repo, url, mirror_dir, show_progress=False),
+        )
+        record("mirror/bundle", timed(githubtakeout.bundle, mirror_dir))
+        # full backup of a repo, as done for each repo in a run
+        shutil.rmtree(out_dir / "backup", ignore_errors=True)
+        record(
+            "backup",
+            timed(
+                githubtakeout.get_and_archive_repo,
+                url,
+                out_dir / "backup" / shape,
+                archive_format="zip",
+                include_history=False,
+                keep=False,
+                show_progress=False,
+            ),
+        )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (key, baseline secs, secs) for each phase slower than the baseline."""
+    regressions = []
+    for key, secs in results.items():
+        base_secs = baseline.get(key)
+        if base_secs is None:
+            continue
+        slowdown = secs - base_secs
+        if slowdown > base_secs * threshold and slowdown > MIN_REGRESSION_SECS:
+            regressions.append((key, base_secs, secs))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--shapes",
+        nargs="+",
+        choices=SHAPES,
+        default=list(SHAPES),
+        help="repo shapes to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply the number of files and commits (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs per phase, the fastest is kept (default: %(default)s)",
+    )
+    parser.add_argument("--save", metavar="PATH", help="save results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="PATH", help="compare results to a saved baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown vs. the baseline (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    # only report timings, not each clone and archive
+    logging.getLogger("githubtakeout").setLevel(logging.WARNING)
+    for var in ("GIT_AUTHOR", "GIT_COMMITTER"):
+        os.environ.setdefault(f"{var}_NAME", "githubtakeout")
+        os.environ.setdefault(f"{var}_EMAIL", "githubtakeout@example.com")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="githubtakeout-bench-") as tmp_dir:
+        base_dir = Path(tmp_dir)
+        for shape in args.shapes:
+            params = SHAPES[shape]
+            logger.info(f"generating repo: {shape}")
+            url = make_remote(
+                base_dir,
+                shape,
+                files=max(1, round(params["files"] * args.scale)),
+                file_size=params["file_size"],
+                commits=max(1, round(params["commits"] * args.scale)),
+            )
+            results.update(bench_shape(base_dir, shape, url, args.repeat))
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2, sort_keys=True))
+        logger.info(f"saved results to: {args.save}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold)
+        for key, base_secs, secs in regressions:
+            logger.error(
+                f"regression: {key}: {base_secs:.3f} -> {secs:.3f} secs "
+                f"(+{(secs / base_secs - 1) * 100:.0f}%)"
+            )
+        if regressions:
+            sys.exit(f"error: {len(regressions)} phases slower than the baseline")
+        logger.info("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2281 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Backup and archive Git Repos and Gists from GitHub."""
+
+import argparse
+import functools
+import getpass
+import hashlib
+import io
+import json
+import logging
+import math
+import operator
+import os
+import queue
+import re
+import sys
+import tarfile
+import threading
+import urllib
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext, suppress
+from datetime import UTC, datetime
+from pathlib import Path
+from timeit import default_timer
+
+from githubtakeout.api import GRAPHQL_URL, REST_URL, ApiError, GraphQLClient, RestClient
+from githubtakeout.batch import ConfigError, load_config
+from githubtakeout.checksums import (
+    CHECKSUMS_NAME,
+    Checksums,
+    HashingReader,
+    HashingWriter,
+    copy_hashed,
+)
+from githubtakeout.compressors import (
+    LEVEL_RANGES,
+    open_compressor,
+    zip_compress_type,
+    zstd_available,
+)
+from githubtakeout.files import atomic_path
+from githubtakeout.janitor import TRASH_NAME, Janitor, remove_tree
+from githubtakeout.journal import JOURNAL_NAME, Journal
+from githubtakeout.lazy import lazy_import
+from githubtakeout.listcache import LISTING_CACHE_NAME, ListingCache
+from githubtakeout.manifest import MANIFEST_NAME, Manifest
+from githubtakeout.metrics import Metrics, RepoMetrics, dir_size
+from githubtakeout.references import REFERENCES_NAME, ReferenceCache, dissociate
+from githubtakeout.s3 import S3Error, S3Sink
+from githubtakeout.scheduler import Scheduler, estimate_footprint, parse_size
+from githubtakeout.snapshots import KEEP_DAILY, KEEP_WEEKLY, Snapshots
+from githubtakeout.store import STORE_NAME, Store
+from githubtakeout.throughput import THROUGHPUT_NAME, Throughput, makespan
+
+# only loaded when repos are listed or backed up, so `--help` (and `--list`
+# from the cache) start fast
+git = lazy_import("git")
+github = lazy_import("github")
+
+ARCHIVE_FORMATS = ("tar", "tar.zst", "tar.uncompressed", "zip", "none")
+API_CHOICES = ("auto", "rest", "graphql")
+EXTENSIONS = {
+    "tar": "tar.gz",
+    "tar.zst": "tar.zst",
+    "tar.uncompressed": "tar",
+    "zip": "zip",
+}
+
+# options of the whole run, which targets in a config file can't set
+RUN_OPTIONS = {
+    "help",
+    "list",
+    "plan",
+    "cache_ttl",
+    "cached",
+    "token",
+    "jobs",
+    "disk_budget",
+    "metrics",
+    "metrics_textfile",
+    "quiet",
+    "config",
+    "restore",
+    "verify",
+}
+# options that change what a run produces, so an interrupted run is only
+# resumed with the same ones
+RESUME_OPTIONS = (
+    "format",
+    "history",
+    "keep",
+    "force",
+    "no_checkout",
+    "mirror",
+    "incremental",
+    "store",
+    "filter",
+    "sparse",
+    "reference_cache",
+    "upload",
+    "bulk_gists",
+)
+
+# entries of the listing fetched ahead of the backups (two pages)
+PREFETCH_SIZE = 200
+
+# with --bulk_gists, gists whose files are fetched per GraphQL query, and
+# packed per archive
+GIST_BATCH_SIZE = 50
+GISTS_PER_ARCHIVE = 1000
+GIST_INDEX_NAME = "index.json"
+# the most files of a gist fetched through the API (`files(limit: 100)`)
+MAX_GIST_FILES = 100
+# the earliest time a zip archive can hold
+ZIP_EPOCH = datetime(1980, 1, 1, tzinfo=UTC)
+
+# partial clone filters: leave out all blobs, blobs over a size (with an
+# optional k/m/g suffix), or trees (and their blobs) below a depth
+CLONE_FILTER_PATTERN = re.compile(r"blob:none|blob:limit=\d+[kmg]?|tree:\d+")
+# git stores a blob size limit in bytes
+BLOB_LIMIT_PATTERN = re.compile(r"blob:limit=(\d+)([kmg])")
+SIZE_SUFFIXES = {"k": 1024, "m": 1024**2, "g": 1024**3}
+
+BackupResult = namedtuple("BackupResult", ["name", "error"])
+
+# a repo to back up (`size` is in KiB, from the listing, and `deferred` repos
+# are backed up at the end of the run, one at a time), or with `gists`, a
+# `GistBatch` of gists backed up together
+Task = namedtuple(
+    "Task",
+    ["name", "url", "local_repo_dir", "description", "size", "deferred", "gists"],
+    defaults=[None, False, None],
+)
+# gists of user `login` to pack into one archive (`gists` are (RepoEntry,
+# clone URL) pairs), with the GraphQL client to fetch their files with
+GistBatch = namedtuple("GistBatch", ["client", "login", "gists"])
+
+# compact form of a repo or gist from the GitHub API, so the listing can be
+# fetched once and reused (`size` is in KiB, `pushed_at` is an ISO 8601 string,
+# `network` is the full name of the repo at the root of its fork network, or
+# None if it is unknown)
+RepoEntry = namedtuple(
+    "RepoEntry",
+    ["name", "url", "description", "fork", "size", "pushed_at", "network"],
+)
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+class BackupError(Exception):
+    pass
+
+
+def convert_size(size_bytes):
+    if size_bytes == 0:
+        return "0 B"
+    size_name = ("B", "KiB", "MiB", "GiB", "TiB", "PiB", "EiB", "ZiB", "YiB")
+    i = math.floor(math.log(size_bytes, 1024))
+    p = math.pow(1024, i)
+    s = round(size_bytes / p, 2)
+    return f"{s} {size_name[i]}"
+
+
+def add_creds(url, username, token):
+    if token is None:
+        new_url = url
+    else:
+        username = urllib.parse.quote(username)
+        url_parts = urllib.parse.urlparse(url)
+        netloc = f"{username}:{token}@{url_parts.netloc}"
+        new_url = urllib.parse.urlunparse(url_parts._replace(netloc=netloc))
+    return new_url
+
+
+def get_archive_path(local_repo_dir, archive_format, archive_basename=None):
+    extension = EXTENSIONS[archive_format]
+    if archive_basename is None:
+        archive_name = f"{local_repo_dir.name}.{extension}"
+    else:
+        archive_name = f"{archive_basename}.{extension}"
+    return local_repo_dir.parent / archive_name
+
+
+@contextmanager
+def open_archive(archive_path, sink=None):
+    # a binary file to write an archive to, either on local disk (renamed into
+    # place once complete), or uploaded to a sink as it is written
+    if sink is not None:
+        logger.info(f"uploading archive to: {sink.url(archive_path.name)}")
+        try:
+            with sink.open(archive_path.name) as archive_file:
+                yield archive_file
+        except S3Error as e:
+            raise BackupError(str(e)) from e
+        return
+    with atomic_path(archive_path) as tmp_path, open(tmp_path, "wb") as archive_file:
+        yield archive_file
+
+
+def add_to_tar(tar_archive, path, arcname, digests):
+    # add a file or dir (recursively, like `TarFile.add`), hashing the
+    # contents of files as they are read into the archive
+    info = tar_archive.gettarinfo(path, arcname)
+    if info.isreg():
+        with open(path, "rb") as f:
+            reader = HashingReader(f)
+            tar_archive.addfile(info, reader)
+        digests[arcname] = reader.hexdigest()
+        return
+    tar_archive.addfile(info)
+    if info.isdir():
+        for name in sorted(os.listdir(path)):
+            add_to_tar(tar_archive, path / name, f"{arcname}/{name}", digests)
+
+
+def record_checksums(checksums, archive_path, stream, digests=None, sink=None):
+    if checksums is None:
+        return
+    url = None if sink is None else sink.url(archive_path.name)
+    checksums.record(archive_path.name, stream.hexdigest(), stream.tell(), digests, url)
+
+
+def archive(
+    local_repo_dir,
+    archive_format="zip",
+    archive_basename=None,
+    compression_level=None,
+    compress_threads=1,
+    sink=None,
+    checksums=None,
+):
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"{archive_format} is not a valid archive format")
+    if archive_format == "none":
+        return None
+    basename = local_repo_dir.name
+    archive_path = get_archive_path(local_repo_dir, archive_format, archive_basename)
+    logger.info(f"creating archive: {archive_path}")
+    # SHA-256 of each file and of the archive, computed as they are written
+    digests = {}
+    with open_archive(archive_path, sink) as archive_file:
+        stream = HashingWriter(archive_file)
+        if archive_format == "zip":
+            with zipfile.ZipFile(
+                stream,
+                "w",
+                zipfile.ZIP_DEFLATED,
+                compresslevel=compression_level,
+            ) as zip_archive:
+                repo_path = Path(local_repo_dir)
+                for entry in repo_path.rglob("*"):
+                    path = (basename / entry.relative_to(repo_path)).as_posix()
+                    if not entry.is_file():
+                        zip_archive.write(entry, arcname=path)
+                        continue
+                    info = zipfile.ZipInfo.from_file(entry, arcname=path)
+                    # store files that won't shrink instead of deflating them
+                    info.compress_type = zip_compress_type(entry)
+                    # `ZipFile.open(info, "w")` compresses with the level
+                    # of `info`, not the archive's, and the attribute is only
+                    # public (`compress_level`) since Python 3.13
+                    if hasattr(info, "compress_level"):
+                        info.compress_level = compression_level
+                    else:
+                        info._compresslevel = compression_level
+                    with open(entry, "rb") as src, zip_archive.open(info, "w") as dest:
+                        digests[path] = copy_hashed(src, dest)
+        else:
+            compressed = open_compressor(
+                stream, archive_format, compression_level, compress_threads
+            )
+            with tarfile.open(fileobj=compressed, mode="w|") as tar_archive:
+                add_to_tar(tar_archive, local_repo_dir, basename, digests)
+            compressed.close()
+    record_checksums(checksums, archive_path, stream, digests, sink)
+    return archive_path
+
+
+def archive_objects(
+    local_repo_dir,
+    archive_format="zip",
+    archive_basename=None,
+    compression_level=None,
+    compress_threads=1,
+    sink=None,
+    checksums=None,
+):
+    # stream the archive straight from the objects in a (bare) repo with
+    # `git archive`, so no working tree is checked out and read back
+    if archive_format not in EXTENSIONS:
+        raise ValueError(f"{archive_format} is not a valid archive format")
+    archive_path = get_archive_path(local_repo_dir, archive_format, archive_basename)
+    logger.info(f"creating archive: {archive_path}")
+    prefix = f"{local_repo_dir.name}/"
+    try:
+        with (
+            git.Repo(local_repo_dir) as repo,
+            open_archive(archive_path, sink) as archive_file,
+        ):
+            # files are only seen by `git archive`, so only the archive as a
+            # whole is hashed
+            stream = HashingWriter(archive_file)
+            if archive_format == "zip":
+                level = [] if compression_level is None else [f"-{compression_level}"]
+                repo.git.archive(
+                    "HEAD",
+                    *level,
+                    format="zip",
+                    prefix=prefix,
+                    output_stream=stream,
+                )
+            else:
+                # compress the tar stream from git ourselves, so all tar
+                # formats and multi-threaded compression are supported
+                compressed = open_compressor(
+                    stream,
+                    archive_format,
+                    compression_level,
+                    compress_threads,
+                )
+                repo.git.archive(
+                    "HEAD", format="tar", prefix=prefix, output_stream=compressed
+                )
+                compressed.close()
+    except git.GitError as e:
+        logger.error(e)
+        raise BackupError("failed creating archive from repo objects") from e
+    record_checksums(checksums, archive_path, stream, sink=sink)
+    return archive_path
+
+
+def git_progress(name):
+    # rich is only loaded once there is progress to show
+    from githubtakeout.progress import GitProgress
+
+    return GitProgress(name)
+
+
+def clone(
+    repo_url,
+    local_repo_dir,
+    include_history,
+    show_progress=True,
+    bare=False,
+    clone_filter=None,
+    sparse_paths=None,
+    reference=None,
+):
+    # without progress, git's output isn't parsed at all
+    progress = git_progress(Path(local_repo_dir).name) if show_progress else None
+    multi_options = []
+    if not include_history:
+        # shallow clone (no commit history or branches)
+        multi_options.append("--depth=1")
+    if clone_filter:
+        # partial clone, objects left out by the filter are fetched on demand
+        multi_options.append(f"--filter={clone_filter}")
+    if sparse_paths:
+        # only check out files in the top level dir until the paths are set
+        multi_options.append("--sparse")
+    if reference is not None:
+        # borrow objects from a local repo instead of downloading them
+        multi_options.append(f"--reference={reference}")
+    try:
+        repo = git.Repo.clone_from(
+            url=repo_url,
+            to_path=local_repo_dir,
+            multi_options=multi_options,
+            progress=progress,
+            bare=bare,
+        )
+        if sparse_paths:
+            repo.git.sparse_checkout("set", *sparse_paths)
+    except git.GitCommandError as e:
+        logger.error(e)
+        raise BackupError("failed cloning repo") from e
+    finally:
+        if progress is not None:
+            progress.close()
+        # `UnboundLocalError` can occur if we catch a signal while cloning
+        with suppress(UnboundLocalError):
+            # release resources
+            repo.close()
+
+
+def pull(local_repo_dir, show_progress=True, sparse_paths=None):
+    progress = git_progress(Path(local_repo_dir).name) if show_progress else None
+    try:
+        repo = git.Repo(local_repo_dir)
+        if sparse_paths:
+            # the paths may have changed since the repo was cloned
+            repo.git.sparse_checkout("set", *sparse_paths)
+        elif is_sparse(repo):
+            repo.git.sparse_checkout("disable")
+        origin = repo.remotes.origin
+        origin.fetch()
+        origin.pull(progress=progress)
+    except git.GitError as e:
+        logger.error(e)
+        raise BackupError("failed pulling changes in repo") from e
+    finally:
+        if progress is not None:
+            progress.close()
+        # `UnboundLocalError` can occur if we catch a signal while pulling
+        with suppress(UnboundLocalError):
+            # release resources
+            repo.close()
+
+
+def is_sparse(repo):
+    with repo.config_reader() as config:
+        return config.get_value("core", "sparseCheckout", False)
+
+
+def normalize_clone_filter(clone_filter):
+    # a filter as git stores it in the repo config (e.g. "blob:limit=1k" is
+    # stored as "blob:limit=1024")
+    match = BLOB_LIMIT_PATTERN.fullmatch(clone_filter or "")
+    if match is None:
+        return clone_filter
+    size, suffix = match.groups()
+    return f"blob:limit={int(size) * SIZE_SUFFIXES[suffix]}"
+
+
+def partial_clone_filter(local_repo_dir):
+    # the filter a repo was cloned with, or None if it isn't a partial clone
+    try:
+        with git.Repo(local_repo_dir) as repo, repo.config_reader() as config:
+            return config.get_value('remote "origin"', "partialclonefilter", "") or None
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        return None
+
+
+def remote_refs(repo_url, mirror=False):
+    # cheap listing of the remote's refs, without fetching any objects. Only a
+    # mirror has every ref, other backups only change with branches and tags
+    # (GitHub's pull request refs change with any activity on a pull request)
+    patterns = [] if mirror else ["HEAD", "refs/heads/*", "refs/tags/*"]
+    try:
+        output = git.cmd.Git().ls_remote(repo_url, *patterns)
+    except git.GitCommandError as e:
+        logger.error(e)
+        raise BackupError("failed listing remote refs") from e
+    refs = {}
+    for line in output.splitlines():
+        sha, ref = line.split("\t", 1)
+        refs[ref] = sha
+    return refs
+
+
+def mirror_repo(repo_url, mirror_dir, show_progress=True, discard=remove_tree):
+    name = Path(mirror_dir).name.removesuffix(".git")
+    progress = git_progress(name) if show_progress else None
+    try:
+        if Path(mirror_dir, "HEAD").exists():
+            logger.info(f"updating mirror: {mirror_dir}")
+            with git.Repo(mirror_dir) as repo:
+                # a single fetch updates all refs in a mirror
+                repo.git.fetch("origin", prune=True)
+        else:
+            # a partial mirror left by an interrupted run
+            discard(mirror_dir)
+            logger.info(f"creating mirror: {mirror_dir}")
+            git.Repo.clone_from(
+                url=repo_url,
+                to_path=mirror_dir,
+                mirror=True,
+                progress=progress,
+            ).close()
+    except git.GitError as e:
+        logger.error(e)
+        raise BackupError("failed mirroring repo") from e
+    finally:
+        if progress is not None:
+            progress.close()
+
+
+def bundle(mirror_dir, incremental=False):
+    # write all refs of a mirror to `<name>.bundle`, or with `incremental`, only
+    # what is new since the latest bundle to `<name>.<timestamp>.bundle`
+    name = mirror_dir.name.removesuffix(".git")
+    full_bundle_path = mirror_dir.with_name(f"{name}.bundle")
+    increment = re.compile(rf"{re.escape(name)}\.\d{{8}}T\d{{6}}\.bundle")
+    try:
+        with git.Repo(mirror_dir) as repo:
+            if not repo.git.for_each_ref():
+                logger.info("repo is empty, no bundle created")
+                return None
+            if not incremental or not full_bundle_path.exists():
+                logger.info(f"creating bundle: {full_bundle_path}")
+                repo.git.bundle("create", full_bundle_path, "--all")
+                return full_bundle_path
+            latest_path = max(
+                (
+                    path
+                    for path in mirror_dir.parent.iterdir()
+                    if increment.fullmatch(path.name)
+                ),
+                default=full_bundle_path,
+            )
+            # everything reachable from the previous bundle's heads is already
+            # backed up, so those commits become prerequisites of the new bundle
+            exclude = []
+            for line in repo.git.bundle("list-heads", latest_path).splitlines():
+                sha = line.split()[0]
+                with suppress(git.GitCommandError):
+                    repo.git.cat_file("-e", sha)
+                    exclude.append(f"^{sha}")
+            timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+            bundle_path = mirror_dir.with_name(f"{name}.{timestamp}.bundle")
+            try:
+                repo.git.bundle("create", bundle_path, "--all", *exclude)
+            except git.GitCommandError as e:
+                if "empty bundle" not in str(e.stderr):
+                    raise
+                logger.info("no new commits since the latest bundle")
+                return latest_path
+            logger.info(f"created incremental bundle: {bundle_path}")
+            return bundle_path
+    except git.GitError as e:
+        logger.error(e)
+        raise BackupError("failed creating bundle") from e
+
+
+def get_and_archive_repo(
+    repo_url,
+    local_repo_dir,
+    archive_format,
+    include_history,
+    keep,
+    description=None,
+    show_progress=True,
+    manifest=None,
+    no_checkout=False,
+    mirror=False,
+    incremental=False,
+    compression_level=None,
+    compress_threads=1,
+    store=None,
+    metrics=None,
+    clone_filter=None,
+    sparse_paths=None,
+    journal=None,
+    reference_cache=None,
+    sink=None,
+    checksums=None,
+    janitor=None,
+):
+    # directories are moved aside and deleted in the background when there is
+    # a janitor
+    discard = remove_tree if janitor is None else janitor.discard
+    repo_name = urllib.parse.urlparse(repo_url).path.lstrip("/")
+    name = local_repo_dir.name
+    # sizes are only measured when metrics are collected, since it means
+    # walking the repo on disk
+    measure = metrics is not None and metrics.measure
+    if metrics is None:
+        metrics = RepoMetrics(name)
+    # phases completed before the run was interrupted
+    entry = {} if journal is None else journal.entry(name)
+    if entry.get("done"):
+        logger.info(f"skipping repo backed up in the interrupted run: {repo_name}\n")
+        metrics.skipped = True
+        return
+
+    def checkpoint(phase, result=True):
+        if journal is not None:
+            journal.record(name, phase, result)
+
+    options = {
+        "archive_format": archive_format,
+        "include_history": include_history,
+        "keep": keep,
+        "no_checkout": no_checkout,
+        "mirror": mirror,
+        "incremental": incremental,
+        "store": store is not None,
+        "clone_filter": clone_filter,
+        "sparse_paths": sparse_paths,
+        "reference_cache": reference_cache is not None,
+    }
+    if sink is not None:
+        # archives uploaded elsewhere are a different backup
+        options["upload"] = sink.url("")
+    if "fetched" in entry:
+        # keep the refs that were fetched before the run was interrupted
+        refs = entry["fetched"]
+    elif manifest is not None:
+        with metrics.phase("refs"):
+            refs = remote_refs(repo_url, mirror)
+        if manifest.is_unchanged(name, refs, options):
+            logger.info(f"skipping unchanged repo: {repo_name}\n")
+            metrics.skipped = True
+            return
+    else:
+        refs = None
+    # archives are renamed into place when complete, so one written before the
+    # run was interrupted can be kept (`None` means no archive was created)
+    archived = "archived" in entry and (
+        entry["archived"] is None
+        or (
+            sink.exists(entry["archived"])
+            if sink is not None
+            else local_repo_dir.with_name(entry["archived"]).exists()
+        )
+    )
+    mirror_dir = local_repo_dir.with_name(f"{name}.git")
+    fetched = archived or (
+        "fetched" in entry and (mirror_dir if mirror else local_repo_dir).exists()
+    )
+    if archived:
+        logger.info(f"resuming repo: {repo_name} (already archived)")
+        archive_path = entry["archived"] and local_repo_dir.with_name(entry["archived"])
+    elif fetched:
+        logger.info(f"resuming repo: {repo_name} (already fetched)")
+    start = default_timer()
+    if mirror:
+        # keep a bare mirror (all refs) and back it up as a git bundle, instead
+        # of compressing a working tree and its already compressed objects
+        if not fetched:
+            size_before = dir_size(mirror_dir) if measure else 0
+            with metrics.phase("mirror"):
+                mirror_repo(repo_url, mirror_dir, show_progress, discard)
+            if measure:
+                metrics.bytes_fetched = max(dir_size(mirror_dir) - size_before, 0)
+            checkpoint("fetched", refs)
+        if not archived:
+            with metrics.phase("bundle"):
+                archive_path = bundle(mirror_dir, incremental)
+            checkpoint("archived", archive_path and archive_path.name)
+        if archive_path:
+            metrics.bytes_written = archive_path.stat().st_size
+            size = convert_size(metrics.bytes_written)
+            logger.info(f"bundle size: {size}")
+    else:
+        git_dir = local_repo_dir if no_checkout else Path(local_repo_dir, ".git")
+        if not fetched:
+            # we can only pull if the local repo exists and has a .git directory,
+            # and was cloned with the same filter (a fetch can't change the filter)
+            if (
+                Path(local_repo_dir, ".git").exists()
+                and not no_checkout
+                and partial_clone_filter(local_repo_dir)
+                == normalize_clone_filter(clone_filter)
+            ):
+                needs_clone = False
+            else:
+                needs_clone = True
+                with metrics.phase("clean"):
+                    discard(local_repo_dir)
+            size_before = dir_size(git_dir) if measure else 0
+            reference_dir = None
+            if reference_cache is not None:
+                # fetch objects shared with other repos in its fork network
+                # once, into the cache the repo borrows them from
+                reference_dir = reference_cache.cache_dir(name)
+                size_before += dir_size(reference_dir) if measure else 0
+                with metrics.phase("reference"):
+                    try:
+                        reference_cache.update(name, repo_url)
+                        if not needs_clone:
+                            # copy them locally, a dissociated repo would
+                            # download them again when it is pulled
+                            reference_cache.fetch_into(name, local_repo_dir)
+                    except git.GitError as e:
+                        logger.error(e)
+                        raise BackupError("failed updating reference cache") from e
+            if no_checkout:
+                # shallow bare clone, the archive is created directly from its
+                # objects
+                logger.info(f"fetching repo: {repo_name} to: {local_repo_dir}")
+                with metrics.phase("fetch"):
+                    clone(
+                        repo_url,
+                        local_repo_dir,
+                        include_history,
+                        show_progress,
+                        bare=True,
+                    )
+            elif needs_clone:
+                logger.info(f"cloning repo: {repo_name} to: {local_repo_dir}")
+                with metrics.phase("clone"):
+                    clone(
+                        repo_url,
+                        local_repo_dir,
+                        include_history,
+                        show_progress,
+                        clone_filter=clone_filter,
+                        sparse_paths=sparse_paths,
+                        reference=reference_dir,
+                    )
+            else:
+                logger.info(
+                    f"pulling changes from repo: {repo_name} to: {local_repo_dir}"
+                )
+                with metrics.phase("pull"):
+                    pull(local_repo_dir, show_progress, sparse_paths)
+            if measure:
+                size_after = dir_size(git_dir)
+                if reference_dir is not None:
+                    size_after += dir_size(reference_dir)
+                metrics.bytes_fetched = max(size_after - size_before, 0)
+            if reference_cache is not None and (
+                archive_format != "none" or store is not None
+            ):
+                # archives and snapshots must not depend on the cache, so only
+                # repos that are kept without them keep borrowing objects
+                with metrics.phase("dissociate"):
+                    try:
+                        dissociate(local_repo_dir)
+                    except git.GitError as e:
+                        logger.error(e)
+                        raise BackupError(
+                            "failed copying objects from reference"
+                        ) from e
+            if not include_history and not no_checkout:
+                # delete the .git directory if we are not saving history
+                with metrics.phase("remove_git"):
+                    discard(git_dir)
+            checkpoint("fetched", refs)
+        if measure and not no_checkout and not archived:
+            metrics.bytes_source = dir_size(local_repo_dir)
+        if store is not None and not archived and not entry.get("stored"):
+            # only content that isn't already in the store is written
+            with metrics.phase("store"):
+                snapshot_path, num_new, size_new = store.snapshot(
+                    local_repo_dir, local_repo_dir.name
+                )
+            logger.info(
+                f"stored snapshot: {snapshot_path.name} "
+                f"({num_new} new files, {convert_size(size_new)})"
+            )
+            checkpoint("stored")
+        if description:
+            # clean unsafe chars and truncate description to create a useable file name
+            clean_name = re.sub(r"[/\\?%*:|\"<>\x7F\x00-\x1F]", "-", description)[:255]
+            archive_basename = f"gist - {clean_name}"
+        else:
+            archive_basename = None
+        if not archived:
+            with metrics.phase("archive"):
+                if no_checkout:
+                    archive_path = archive_objects(
+                        local_repo_dir,
+                        archive_format,
+                        archive_basename=archive_basename,
+                        compression_level=compression_level,
+                        compress_threads=compress_threads,
+                        sink=sink,
+                        checksums=checksums,
+                    )
+                else:
+                    archive_path = archive(
+                        local_repo_dir,
+                        archive_format,
+                        archive_basename=archive_basename,
+                        compression_level=compression_level,
+                        compress_threads=compress_threads,
+                        sink=sink,
+                        checksums=checksums,
+                    )
+            checkpoint("archived", archive_path and archive_path.name)
+        if archive_path:
+            if sink is not None:
+                metrics.bytes_written = sink.size(archive_path.name)
+            else:
+                metrics.bytes_written = archive_path.stat().st_size
+            size = convert_size(metrics.bytes_written)
+            logger.info(f"archive size: {size}")
+            if not keep:
+                # delete repo after archive is created
+                logger.info("deleting repo")
+                with metrics.phase("delete"):
+                    discard(local_repo_dir)
+    if manifest is not None:
+        if archive_path is not None:
+            output = archive_path
+        else:
+            output = mirror_dir if mirror else local_repo_dir
+        manifest.record(name, refs, options, output)
+    checkpoint("done")
+    elapsed = default_timer() - start
+    logger.info(f"successfully backed up '{name}' repo in {elapsed:.3f} secs\n")
+
+
+def api_gist_files(files):
+    # the (name, contents) of a gist's files from the API, or None if they
+    # might not be exact: binary files have no text, large files are
+    # truncated, and text that isn't UTF-8 is converted (so its size changes)
+    if files is None or len(files) >= MAX_GIST_FILES:
+        return None
+    contents = []
+    for file in files:
+        if file["text"] is None or file["isTruncated"]:
+            return None
+        data = file["text"].encode()
+        if len(data) != file["size"]:
+            return None
+        contents.append((file["name"], data))
+    return contents
+
+
+def cloned_gist_files(url, clone_dir):
+    clone(url, clone_dir, include_history=False, show_progress=False)
+    return [
+        (path.relative_to(clone_dir).as_posix(), path.read_bytes())
+        for path in sorted(clone_dir.rglob("*"))
+        if path.is_file() and ".git" not in path.relative_to(clone_dir).parts
+    ]
+
+
+def archive_gists(
+    archive_path,
+    members,
+    archive_format="zip",
+    compression_level=None,
+    compress_threads=1,
+    sink=None,
+    checksums=None,
+):
+    # write (arcname, data, timestamp) members to an archive as they are
+    # generated, so only a batch of gists is held in memory
+    digests = {}
+    with open_archive(archive_path, sink) as archive_file:
+        stream = HashingWriter(archive_file)
+        if archive_format == "zip":
+            with zipfile.ZipFile(
+                stream, "w", zipfile.ZIP_DEFLATED, compresslevel=compression_level
+            ) as zip_archive:
+                for arcname, data, timestamp in members:
+                    info = zipfile.ZipInfo(arcname, timestamp.timetuple()[:6])
+                    info.external_attr = 0o644 << 16
+                    zip_archive.writestr(
+                        info,
+                        data,
+                        compress_type=zipfile.ZIP_DEFLATED,
+                        compresslevel=compression_level,
+                    )
+                    digests[arcname] = hashlib.sha256(data).hexdigest()
+        else:
+            compressed = open_compressor(
+                stream, archive_format, compression_level, compress_threads
+            )
+            with tarfile.open(fileobj=compressed, mode="w|") as tar_archive:
+                for arcname, data, timestamp in members:
+                    info = tarfile.TarInfo(arcname)
+                    info.size = len(data)
+                    info.mtime = timestamp.timestamp()
+                    info.mode = 0o644
+                    tar_archive.addfile(info, io.BytesIO(data))
+                    digests[arcname] = hashlib.sha256(data).hexdigest()
+            compressed.close()
+    record_checksums(checksums, archive_path, stream, digests, sink)
+    return archive_path
+
+
+def get_and_archive_gists(
+    batch,
+    local_dir,
+    archive_format,
+    manifest=None,
+    metrics=None,
+    compression_level=None,
+    compress_threads=1,
+    journal=None,
+    sink=None,
+    checksums=None,
+    janitor=None,
+    **_,
+):
+    # back up many gists into one archive, with their files fetched through
+    # the API (many gists per query) instead of cloning each gist. Gists whose
+    # files can't be fetched exactly are cloned, into `local_dir`.
+    name = local_dir.name
+    if metrics is None:
+        metrics = RepoMetrics(name)
+    if journal is not None and journal.entry(name).get("done"):
+        logger.info(f"skipping gists backed up in the interrupted run: {name}\n")
+        metrics.skipped = True
+        return
+    # when each gist was last updated stands in for its refs
+    refs = {gist.name: gist.pushed_at for gist, _ in batch.gists}
+    options = {"archive_format": archive_format, "bulk_gists": True}
+    if sink is not None:
+        options["upload"] = sink.url("")
+    if manifest is not None and manifest.is_unchanged(name, refs, options):
+        logger.info(f"skipping unchanged gists: {name}\n")
+        metrics.skipped = True
+        return
+    discard = remove_tree if janitor is None else janitor.discard
+    start = default_timer()
+    index = []
+    # the newest update is the time of the index, and of gists without one,
+    # so unchanged gists give unchanged archives
+    newest = max(
+        (
+            datetime.fromisoformat(gist.pushed_at)
+            for gist, _ in batch.gists
+            if gist.pushed_at is not None
+        ),
+        default=ZIP_EPOCH,
+    )
+
+    def members():
+        for offset in range(0, len(batch.gists), GIST_BATCH_SIZE):
+            gists = batch.gists[offset : offset + GIST_BATCH_SIZE]
+            with metrics.phase("fetch"):
+                found = batch.client.gist_files(
+                    batch.login, [gist.name for gist, _ in gists]
+                )
+            for gist, url in gists:
+                if found[gist.name] is None:
+                    logger.info(f"skipping deleted gist: {gist.name}")
+                    continue
+                files = api_gist_files(found[gist.name])
+                if files is None:
+                    logger.info(f"cloning gist: {gist.name}")
+                    clone_dir = local_dir / gist.name
+                    with metrics.phase("clone"):
+                        files = cloned_gist_files(url, clone_dir)
+                    discard(clone_dir)
+                index.append(
+                    {
+                        "id": gist.name,
+                        "description": gist.description,
+                        "updated_at": gist.pushed_at,
+                        "files": [file_name for file_name, _ in files],
+                    }
+                )
+                timestamp = (
+                    newest
+                    if gist.pushed_at is None
+                    else datetime.fromisoformat(gist.pushed_at)
+                )
+                for file_name, data in files:
+                    yield f"{name}/{gist.name}/{file_name}", data, timestamp
+        yield (
+            f"{name}/{GIST_INDEX_NAME}",
+            json.dumps(index, indent=2).encode(),
+            newest,
+        )
+
+    local_dir.parent.mkdir(parents=True, exist_ok=True)
+    archive_path = get_archive_path(local_dir, archive_format)
+    logger.info(f"creating archive of {len(batch.gists)} gists: {archive_path}")
+    try:
+        # files are fetched as the archive is written, and the time spent
+        # fetching them is counted in their own phases
+        archive_gists(
+            archive_path,
+            members(),
+            archive_format,
+            compression_level,
+            compress_threads,
+            sink,
+            checksums,
+        )
+    except ApiError as e:
+        raise BackupError(f"failed fetching gists: {e}") from e
+    finally:
+        discard(local_dir)
+    if sink is not None:
+        metrics.bytes_written = sink.size(archive_path.name)
+    else:
+        metrics.bytes_written = archive_path.stat().st_size
+    logger.info(f"archive size: {convert_size(metrics.bytes_written)}")
+    if manifest is not None:
+        manifest.record(name, refs, options, archive_path)
+    if journal is not None:
+        journal.record(name, "done", True)
+    elapsed = default_timer() - start
+    logger.info(f"successfully backed up {len(index)} gists in {elapsed:.3f} secs\n")
+
+
+def backup_mode(
+    archive_format, include_history=False, mirror=False, no_checkout=False, **_
+):
+    # how repos are backed up, as far as how long it takes is concerned
+    if mirror:
+        return "bundle"
+    if include_history:
+        return f"{archive_format}+history"
+    if no_checkout:
+        return f"{archive_format}+no_checkout"
+    return archive_format
+
+
+def backup(
+    name,
+    repo_url,
+    local_repo_dir,
+    metrics=None,
+    gists=None,
+    size=None,
+    throughput=None,
+    snapshots=None,
+    **options,
+):
+    # back up a single repo (or a batch of gists), turning failures into a
+    # result so one bad repo doesn't stop the rest of the run. Phases are
+    # always timed, for the throughput of the run (`size` is the size on
+    # GitHub in KiB). `snapshots` are taken once the whole run is done.
+    if metrics is None:
+        repo_metrics = RepoMetrics(name, measure=False)
+    else:
+        repo_metrics = metrics.repo(name)
+    try:
+        if gists is not None:
+            get_and_archive_gists(
+                gists, local_repo_dir, metrics=repo_metrics, **options
+            )
+        else:
+            get_and_archive_repo(
+                repo_url, local_repo_dir, metrics=repo_metrics, **options
+            )
+    except (BackupError, OSError, S3Error, git.GitError) as e:
+        logger.error(f"error: failed backing up '{name}': {e}\n")
+        result = BackupResult(name, str(e))
+    else:
+        result = BackupResult(name, None)
+        if throughput is not None and gists is None and size is not None:
+            throughput.add(backup_mode(**options), size * 1024, repo_metrics)
+    if metrics is not None:
+        metrics.add(repo_metrics, result.error)
+    return result
+
+
+def backup_all(tasks, jobs=1, disk_budget=None, **options):
+    # `tasks` is an iterable of `Task`s, or (name, repo_url, local_repo_dir,
+    # description) tuples
+    return backup_batch(((task, options) for task in tasks), jobs, disk_budget)
+
+
+def backup_batch(work, jobs=1, disk_budget=None):
+    # `work` is an iterable of (task, options) pairs, so repos backed up with
+    # different options (e.g. for each target of a batch run) share the
+    # workers. It is consumed in a background thread, so repos are backed up
+    # while the rest are still being listed. Repos are handed out to workers
+    # largest first (of those listed so far), each once its estimated
+    # footprint fits in the disk budget and the free disk space. Results are
+    # returned in the order of `work`.
+    janitors = []
+
+    def settle():
+        # dirs discarded by earlier repos may still be being deleted
+        for janitor in list(janitors):
+            janitor.wait()
+
+    scheduler = Scheduler(budget=disk_budget, closed=False, settle=settle)
+    results = {}
+    feed_error = None
+
+    def feed():
+        nonlocal feed_error
+        try:
+            for i, (task, options) in enumerate(work):
+                janitor = options.get("janitor")
+                if janitor is not None and janitor not in janitors:
+                    janitors.append(janitor)
+                task = Task(*task)
+                footprint = estimate_footprint(task.size, **options)
+                scheduler.add(
+                    ((i, task, options), task.local_repo_dir, footprint, task.deferred)
+                )
+        except BaseException as e:
+            # e.g. sys.exit() for an invalid token, raised once the workers stop
+            feed_error = e
+            scheduler.cancel()
+        finally:
+            scheduler.close()
+
+    def worker():
+        while (handed_out := scheduler.next()) is not None:
+            (i, task, options), footprint, admitted = handed_out
+            if not admitted:
+                error = f"not enough disk space (needs about {convert_size(footprint)})"
+                logger.error(f"error: failed backing up '{task.name}': {error}\n")
+                results[i] = BackupResult(task.name, error)
+                metrics = options.get("metrics")
+                if metrics is not None:
+                    metrics.add(metrics.repo(task.name), error)
+                continue
+            try:
+                results[i] = backup(
+                    task.name,
+                    task.url,
+                    task.local_repo_dir,
+                    description=task.description,
+                    gists=task.gists,
+                    size=task.size,
+                    **options,
+                )
+            finally:
+                scheduler.done(footprint)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    if jobs == 1:
+        try:
+            worker()
+        except BaseException:
+            scheduler.cancel()
+            raise
+    else:
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            futures = [executor.submit(worker) for _ in range(jobs)]
+            for future in futures:
+                future.result()
+        except BaseException:
+            # stop handing out repos, the ones in progress finish in the
+            # background
+            scheduler.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+    feeder.join()
+    if feed_error is not None:
+        raise feed_error
+    return [results[i] for i in sorted(results)]
+
+
+@functools.cache
+def github_client(token):
+    # one client (and connection pool) per token, shared by all the targets of
+    # a batch run
+    base_url = os.getenv("GITHUB_API_URL", REST_URL)
+    if token is None:
+        return github.Github(base_url=base_url)
+    return github.Github(base_url=base_url, auth=github.Auth.Token(token))
+
+
+@functools.cache
+def token_login(token):
+    # the user a token belongs to, which is who it lists the repos of
+    try:
+        return github_client(token).get_user().login
+    except github.GithubException as e:
+        if e.status == 401:
+            sys.exit("error: invalid auth token")
+        raise e
+    except OSError as e:
+        # `requests` errors, e.g. when offline
+        sys.exit(f"error: failed looking up the user of the auth token: {e}")
+
+
+@functools.cache
+def graphql_client(token, url):
+    # shared the same way, so the rate limit quota is tracked per token
+    return GraphQLClient(token, url)
+
+
+@functools.cache
+def rest_client(token):
+    return RestClient(token, os.getenv("GITHUB_API_URL", REST_URL))
+
+
+def get_repos(username, token, include_gists):
+    gh = github_client(token)
+    if token is not None:
+        # you need to be authenticated and then call the API
+        # with no username to get public and private repos
+        user = gh.get_user()
+        repos = user.get_repos(affiliation="owner")
+        try:
+            # this just makes an API request so we can exit if unauthorized
+            _ = repos.totalCount
+        except github.GithubException as e:
+            if e.data["status"] == "401":
+                sys.exit(f"error: invalid auth token for user '{username}'")
+            else:
+                raise e
+    else:
+        try:
+            user = gh.get_user(username)
+        except github.GithubException as e:
+            if e.data["status"] == "404":
+                sys.exit(f"error: user '{username}' not found")
+            else:
+                raise e
+        repos = user.get_repos()
+    if include_gists:
+        gists = user.get_gists()
+    else:
+        gists = []
+    return repos, gists
+
+
+def get_org_repos(org, token):
+    # private repos are included when the token has access to them
+    gh = github_client(token)
+    try:
+        organization = gh.get_organization(org)
+    except github.GithubException as e:
+        if e.status == 401:
+            sys.exit(f"error: invalid auth token for org '{org}'")
+        if e.status == 404:
+            sys.exit(f"error: org '{org}' not found")
+        raise e
+    return organization.get_repos(type="all")
+
+
+def keep_repo(repo, pattern, skip_pattern, skip_forks):
+    if not re.match(pattern, repo.name):
+        return False
+    if skip_pattern and re.match(skip_pattern, repo.name):
+        return False
+    return not (skip_forks and repo.fork)
+
+
+def filter_repos(repos, pattern, skip_pattern, skip_forks):
+    return (
+        repo for repo in repos if keep_repo(repo, pattern, skip_pattern, skip_forks)
+    )
+
+
+def isoformat(timestamp):
+    return None if timestamp is None else timestamp.isoformat()
+
+
+def parse_timestamp(timestamp):
+    # GraphQL timestamps end in "Z", match the REST listing's format
+    return None if timestamp is None else isoformat(datetime.fromisoformat(timestamp))
+
+
+def get_network(repo, resolve_forks):
+    if not repo.fork:
+        return repo.full_name
+    # the root of a fork's network isn't in the listing, looking it up costs
+    # an API request per fork
+    return repo.source.full_name if resolve_forks else None
+
+
+def get_repos_graphql(username, token, include_gists, org=False):
+    # a few batched GraphQL requests, instead of a REST request per page,
+    # yielding ("repo", entry) and ("gist", entry) pairs as each page arrives
+    client = graphql_client(token, os.getenv("GITHUB_GRAPHQL_URL", GRAPHQL_URL))
+    if org:
+        nodes = (("repo", repo) for repo in client.iter_org_repos(username))
+    else:
+        nodes = client.iter_repos_and_gists(include_gists)
+    try:
+        for kind, node in nodes:
+            if kind == "repo":
+                yield (
+                    kind,
+                    RepoEntry(
+                        name=node["name"],
+                        url=f"{node['url']}.git",
+                        description=node["description"],
+                        fork=node["isFork"],
+                        size=node["diskUsage"],
+                        pushed_at=parse_timestamp(node["pushedAt"]),
+                        network=node["network"],
+                    ),
+                )
+            else:
+                yield (
+                    kind,
+                    RepoEntry(
+                        name=node["name"],
+                        url=f"https://gist.github.com/{node['name']}.git",
+                        description=node["description"],
+                        fork=False,
+                        size=sum(file["size"] for file in node["files"]) // 1024,
+                        pushed_at=parse_timestamp(node["updatedAt"]),
+                        network=None,
+                    ),
+                )
+    except ApiError as e:
+        if e.status == 401:
+            owner = "org" if org else "user"
+            sys.exit(f"error: invalid auth token for {owner} '{username}'")
+        sys.exit(f"error: {e}")
+
+
+def stream_repos(
+    username,
+    token,
+    pattern,
+    skip_pattern,
+    skip_forks,
+    include_gists,
+    resolve_forks=False,
+    api="rest",
+    org=False,
+):
+    # yield ("repo", entry) and ("gist", entry) pairs, filtering repos as each
+    # page of the listing arrives, so they can be backed up before the rest of
+    # the pages are fetched (`username` is the name of an org when `org` is
+    # True, orgs have no gists)
+    if api == "graphql":
+        for kind, entry in get_repos_graphql(username, token, include_gists, org):
+            if kind == "gist" or keep_repo(entry, pattern, skip_pattern, skip_forks):
+                yield kind, entry
+        return
+    # page through the API a single time and keep only what we need
+    if org:
+        all_repos, gists = get_org_repos(username, token), []
+    else:
+        all_repos, gists = get_repos(username, token, include_gists)
+    for repo in filter_repos(all_repos, pattern, skip_pattern, skip_forks):
+        yield (
+            "repo",
+            RepoEntry(
+                name=repo.name,
+                url=repo.clone_url,
+                description=repo.description,
+                fork=repo.fork,
+                size=repo.size,
+                pushed_at=isoformat(repo.pushed_at),
+                network=get_network(repo, resolve_forks),
+            ),
+        )
+    for gist in gists:
+        yield (
+            "gist",
+            RepoEntry(
+                name=gist.id,
+                url=gist.git_pull_url,
+                description=gist.description,
+                fork=False,
+                size=sum(file.size for file in gist.files.values()) // 1024,
+                pushed_at=isoformat(gist.updated_at),
+                network=None,
+            ),
+        )
+
+
+def listing_pages(username, token, include_gists, org=False):
+    # the REST endpoints (and parameters) `get_repos` and `get_org_repos` page
+    # through
+    if org:
+        return [(f"/orgs/{username}/repos", {"type": "all"})]
+    if token is not None:
+        pages = [("/user/repos", {"affiliation": "owner"})]
+        gists = ("/gists", {})
+    else:
+        pages = [(f"/users/{username}/repos", {})]
+        gists = (f"/users/{username}/gists", {})
+    return [*pages, gists] if include_gists else pages
+
+
+def cached_listing(
+    username, token, include_gists, api, org, cache, cache_ttl=None, cached=False
+):
+    """Return the whole (unfiltered) listing, using `cache` when possible.
+
+    The cached listing is used if it is less than `cache_ttl` secs old, or
+    whatever its age with `cached` (no API requests at all). Otherwise, a
+    listing fetched with the REST API is revalidated with conditional
+    requests, and only fetched again if it changed.
+    """
+    owner = "org" if org else "user"
+    key = f"{owner}:{username}{':gists' if include_gists else ''}"
+    entry = cache.get(key)
+    if entry is None and cached:
+        sys.exit(f"error: no cached listing for {owner} '{username}'")
+    if entry is not None:
+        fresh = cached or (cache_ttl is not None and cache.age(key) < cache_ttl)
+        if not fresh and entry["validators"] and api == "rest":
+            try:
+                fresh = rest_client(token).unchanged(entry["validators"])
+            except ApiError:
+                fresh = False
+            if fresh:
+                cache.touch(key)
+        if fresh:
+            logger.info(f"using listing cached {cache.age(key):.0f} secs ago\n")
+            return [(kind, RepoEntry(**fields)) for kind, fields in entry["items"]]
+    validators = None
+    if api == "rest":
+        # taken before the listing, so a change while it is fetched shows up
+        # as a change next time
+        try:
+            validators = [
+                validator
+                for path, params in listing_pages(username, token, include_gists, org)
+                for validator in rest_client(token).validators(path, params)
+            ]
+        except ApiError:
+            validators = None
+    items = list(
+        stream_repos(
+            username,
+            token,
+            ".*",
+            None,
+            False,
+            include_gists,
+            api=api,
+            org=org,
+        )
+    )
+    cache.put(key, [(kind, entry._asdict()) for kind, entry in items], validators)
+    return items
+
+
+def prefetch(iterable, size=PREFETCH_SIZE):
+    """Iterate over `iterable` in a background thread, up to `size` items ahead.
+
+    The thread starts right away, so API pages are fetched while earlier
+    repos are backed up. Errors (including `sys.exit()`) are raised where the
+    items are consumed.
+    """
+    items = queue.Queue(maxsize=size)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    def consume():
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+
+    return consume()
+
+
+def get_token(prompt_for_token):
+    if prompt_for_token:
+        token = getpass.getpass("Token:")
+        if not token:
+            sys.exit("error: auth token cannot be empty")
+    else:
+        # populate environment variable via .env file if it exists
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        token = os.getenv("GITHUB_TOKEN")
+    return token
+
+
+def resolve_api(api, token):
+    if api == "auto":
+        # the GraphQL API can only be used when authenticated
+        return "rest" if token is None else "graphql"
+    if api == "graphql" and token is None:
+        sys.exit("error: --api=graphql requires an auth token")
+    return api
+
+
+def limit_size(task, max_repo_size, defer_large):
+    # skip a repo larger than `max_repo_size` bytes (by the size GitHub
+    # reports) by returning None, or defer it to the end of the run
+    if task.size is None or task.size * 1024 <= max_repo_size:
+        return task
+    size = convert_size(task.size * 1024)
+    if defer_large:
+        logger.info(f"deferring large repo to the end of the run: {task.name} ({size})")
+        return task._replace(deferred=True)
+    logger.info(f"skipping large repo: {task.name} ({size})")
+    return None
+
+
+def log_found(counts, owner, username, include_gists):
+    # totals are only known once the whole listing has arrived
+    logger.info(f"found {counts['repo']} repos for {owner} '{username}'")
+    if include_gists:
+        logger.info(f"found {counts['gist']} gists for user '{username}'")
+    logger.info("")
+
+
+def plan(username, args, token, org=False, metrics=None):
+    # list a user's (or an org's) repos, and return the tasks to back them up
+    # with the options to pass to `backup_all` (or with --plan, all the tasks
+    # with just the options `estimate_run` needs). `args` are the command line
+    # options, or a target's options from a config file.
+    working_dir = Path(args.dir) / "backups"
+    if args.bulk_gists and not args.list and not args.plan and token is None:
+        sys.exit("error: --bulk_gists requires an auth token")
+    api = resolve_api(args.api, token)
+    sink = None
+    if args.upload is not None:
+        try:
+            sink = S3Sink.from_url(args.upload)
+        except ValueError as e:
+            sys.exit(f"error: {e}")
+    owner = "org" if org else "user"
+    if args.list or args.plan:
+        listing = cached_listing(
+            username,
+            token,
+            args.gists,
+            api,
+            org,
+            ListingCache(working_dir / LISTING_CACHE_NAME),
+            args.cache_ttl,
+            args.cached,
+        )
+        counts = {"repo": 0, "gist": 0}
+        tasks = []
+        for kind, entry in listing:
+            if kind == "repo" and not keep_repo(
+                entry, args.pattern, args.skip_pattern, args.skip_forks
+            ):
+                continue
+            counts[kind] += 1
+            if args.plan:
+                task = Task(
+                    entry.name, None, working_dir / entry.name, None, entry.size
+                )
+                if args.max_repo_size is not None:
+                    task = limit_size(task, args.max_repo_size, args.defer_large)
+                if task is not None:
+                    tasks.append(task)
+            elif kind == "repo":
+                logger.info(f"{username}/{entry.name}")
+            else:
+                logger.info(f"{username}/{entry.name}\n  - {entry.description}")
+        log_found(counts, owner, username, args.gists)
+        if not args.plan:
+            return [], {}
+        return tasks, {
+            "archive_format": args.format,
+            "include_history": args.history,
+            "mirror": args.mirror,
+            "no_checkout": args.no_checkout,
+            "sink": sink,
+            "throughput": Throughput(working_dir / THROUGHPUT_NAME),
+        }
+    entries = prefetch(
+        stream_repos(
+            username,
+            token,
+            args.pattern,
+            args.skip_pattern,
+            args.skip_forks,
+            args.gists,
+            resolve_forks=args.reference_cache,
+            api=api,
+            org=org,
+        )
+    )
+    if sink is not None:
+        logger.info(f"uploading archives to: {sink.url('')}\n")
+    else:
+        logger.info(f"creating archives in: {working_dir}\n")
+    # the manifest lets us skip repos that haven't changed since the last run
+    manifest = None
+    if not args.force:
+        manifest = Manifest(
+            working_dir / MANIFEST_NAME, exists=None if sink is None else sink.exists
+        )
+    # the journal lets an interrupted run resume where it left off
+    journal = Journal(
+        working_dir / JOURNAL_NAME,
+        {option: getattr(args, option) for option in RESUME_OPTIONS},
+    )
+    if journal.resumed:
+        logger.info(f"resuming interrupted run from: {journal.path}\n")
+    options = {
+        "archive_format": args.format,
+        "include_history": args.history,
+        "keep": args.keep,
+        # progress bars are only useful (and only worth parsing git's output
+        # for) when someone is watching
+        "show_progress": not args.quiet and sys.stdout.isatty(),
+        "manifest": manifest,
+        "no_checkout": args.no_checkout,
+        "mirror": args.mirror,
+        "incremental": args.incremental,
+        "compression_level": args.compression_level,
+        "compress_threads": args.compress_threads,
+        "store": Store(working_dir / STORE_NAME) if args.store else None,
+        "metrics": metrics,
+        "clone_filter": args.filter,
+        "sparse_paths": args.sparse,
+        "journal": journal,
+        # filled in as repos are listed, before each repo is backed up
+        "reference_cache": (
+            ReferenceCache(working_dir / REFERENCES_NAME)
+            if args.reference_cache
+            else None
+        ),
+        "sink": sink,
+        "checksums": Checksums(working_dir / CHECKSUMS_NAME),
+        # also deletes what an interrupted run left in the trash
+        "janitor": Janitor(working_dir / TRASH_NAME),
+        # timings of this run, for estimating later runs with --plan
+        "throughput": Throughput(working_dir / THROUGHPUT_NAME),
+        # the content-addressed store already keeps every snapshot
+        "snapshots": (
+            Snapshots(
+                working_dir,
+                args.keep_daily,
+                args.keep_weekly,
+                exclude=[STORE_NAME],
+            )
+            if args.snapshots
+            else None
+        ),
+    }
+
+    def tasks():
+        # repos are handed to the backups as they are listed
+        counts = {"repo": 0, "gist": 0}
+        gists = []
+        with nullcontext() if metrics is None else metrics.run.phase("enumerate"):
+            for kind, entry in entries:
+                counts[kind] += 1
+                local_repo_dir = working_dir / entry.name
+                url = add_creds(entry.url, username, token)
+                if kind == "gist" and args.bulk_gists:
+                    gists.append((entry, url))
+                    continue
+                if kind == "repo":
+                    if args.reference_cache:
+                        options["reference_cache"].networks[entry.name] = entry.network
+                    task = Task(entry.name, url, local_repo_dir, None, entry.size)
+                else:
+                    task = Task(
+                        entry.name, url, local_repo_dir, entry.description, entry.size
+                    )
+                if args.max_repo_size is not None:
+                    task = limit_size(task, args.max_repo_size, args.defer_large)
+                if task is not None:
+                    yield task
+        if gists:
+            # gists are packed in a stable order, so unchanged gists give
+            # unchanged archives. Spaces keep the names apart from repos'.
+            gists.sort(key=lambda gist: gist[0].name)
+            client = graphql_client(token, os.getenv("GITHUB_GRAPHQL_URL", GRAPHQL_URL))
+            for offset in range(0, len(gists), GISTS_PER_ARCHIVE):
+                shard = gists[offset : offset + GISTS_PER_ARCHIVE]
+                name = f"gists {offset // GISTS_PER_ARCHIVE + 1}"
+                yield Task(
+                    name,
+                    None,
+                    working_dir / name,
+                    None,
+                    sum(entry.size or 0 for entry, _ in shard),
+                    gists=GistBatch(client, username, shard),
+                )
+        log_found(counts, owner, username, args.gists)
+
+    return tasks(), options
+
+
+def finish_run(results, planned, metrics):
+    # `planned` are the options returned by `plan` for each user or org
+    for options in planned:
+        options["journal"].finish()
+        if options["snapshots"] is not None:
+            options["snapshots"].take(discard=options["janitor"].discard)
+        options["janitor"].close()
+        options["throughput"].save()
+    if metrics is not None:
+        metrics.finish()
+    failed = [result for result in results if result.error is not None]
+    logger.info(f"backed up {len(results) - len(failed)} of {len(results)} repos")
+    for result in failed:
+        logger.error(f"  - failed: {result.name} ({result.error})")
+    return results
+
+
+def convert_duration(secs):
+    minutes, secs = divmod(round(secs), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {secs}s"
+    return f"{secs}s"
+
+
+def estimate_run(planned, jobs=1, disk_budget=None):
+    """Log what a run would take, without backing anything up.
+
+    `planned` is a list of (tasks, options) pairs returned by `plan` with
+    `plan_only`. Bytes to transfer and peak scratch disk are predicted from
+    the sizes GitHub reports. Output size and wall time also need the
+    throughput of previous runs in the same mode, and are left out without
+    it. Every repo is assumed to be cloned and archived, so a run that skips
+    unchanged repos, or pulls kept ones, takes less.
+    """
+    transfer = output = 0
+    # (size in bytes, footprint, secs or None, deferred) of each repo
+    items = []
+    modes = {}
+    for tasks, options in planned:
+        mode = backup_mode(**options)
+        throughput = options["throughput"]
+        if mode not in modes:
+            modes[mode] = {
+                stage: throughput.model(mode, stage)
+                for stage in ("transfer", "archive", "total")
+            }
+            modes[mode]["ratio"] = throughput.ratio(mode)
+        total, ratio = modes[mode]["total"], modes[mode]["ratio"]
+        for task in tasks:
+            size = (task.size or 0) * 1024
+            transfer += size
+            if options["archive_format"] != "none" or options["mirror"]:
+                output = (
+                    None if output is None or ratio is None else output + size * ratio
+                )
+            secs = None if total is None else total[0] + total[1] * size
+            footprint = estimate_footprint(task.size, **options)
+            items.append((size, footprint, secs, task.deferred))
+    # the scheduler starts the largest repos first, as many as fit in the
+    # budget (at least one), and deferred repos one at a time at the end
+    items.sort(key=operator.itemgetter(0), reverse=True)
+    regular = [item for item in items if not item[3]]
+    deferred = [item for item in items if item[3]]
+    peak = 0
+    for _, footprint, _, _ in regular[:jobs]:
+        if peak and disk_budget is not None and peak + footprint > disk_budget:
+            continue
+        peak += footprint
+    peak = max([peak] + [footprint for _, footprint, _, _ in deferred])
+    wall_time = None
+    if all(item[2] is not None for item in items):
+        wall_time = makespan([item[2] for item in regular], jobs)
+        wall_time += sum(item[2] for item in deferred)
+
+    logger.info(f"plan for {len(items)} repos, with {jobs} jobs:")
+    logger.info(f"  transfer: {convert_size(transfer)} (at most)")
+    logger.info(f"  peak scratch disk: {convert_size(peak)}")
+    unknown = "unknown (no previous run in this mode)"
+    if output is not None:
+        output = convert_size(round(output))
+    logger.info(f"  output: {unknown if output is None else output}")
+    logger.info(
+        f"  wall time: {unknown if wall_time is None else convert_duration(wall_time)}"
+    )
+    for mode, models in modes.items():
+        rates = []
+        for stage in ("transfer", "archive"):
+            if models[stage] is not None:
+                overhead, secs_per_byte = models[stage]
+                rate = convert_size(round(1 / secs_per_byte))
+                rates.append(f"{stage} {rate}/s + {overhead:.1f} secs per repo")
+        if models["ratio"] is not None:
+            rates.append(f"output {models['ratio']:.2f}x size on GitHub")
+        logger.info(f"  {mode}: {', '.join(rates) or 'no previous runs'}")
+
+
+def run(args):
+    # back up (or list, or plan) the repos of `args.username`, with the command
+    # line options in `args`
+    token = get_token(args.token)
+    metrics = None
+    if args.metrics is not None or args.metrics_textfile is not None:
+        metrics = Metrics(args.metrics, args.metrics_textfile)
+    tasks, options = plan(args.username, args, token, metrics=metrics)
+    if args.list:
+        return []
+    if args.plan:
+        estimate_run([(tasks, options)], args.jobs, args.disk_budget)
+        return []
+    results = backup_all(tasks, args.jobs, args.disk_budget, **options)
+    return finish_run(results, [options], metrics)
+
+
+def run_batch(targets, args):
+    """Back up the repos of several users and orgs in a single run.
+
+    `targets` is a list of (owner, org, token_env, target_args) tuples, where
+    `target_args` are the command line options with the target's options from
+    the config file merged over them, and `args` are the options of the whole
+    run (like --jobs). All targets are listed in the background (sharing an
+    API client per token), and their repos are backed up by one pool of
+    workers as they are listed. With --plan, the run is estimated for all
+    targets together instead.
+    """
+    default_token = get_token(args.token)
+    metrics = None
+    if args.metrics is not None or args.metrics_textfile is not None:
+        metrics = Metrics(args.metrics, args.metrics_textfile)
+    planned = []
+    # every target starts listing in the background right away
+    for owner, org, token_env, target_args in targets:
+        if token_env is None:
+            token = default_token
+        else:
+            token = os.getenv(token_env)
+            if not token:
+                sys.exit(f"error: {token_env} is not set (token for '{owner}')")
+        # a cached listing is used without any API requests (or the token)
+        if not org and token is not None and not target_args.cached:
+            login = token_login(token)
+            if login.lower() != owner.lower():
+                # a token lists the repos of the user it belongs to, so another
+                # user's public repos are listed without it
+                logger.warning(
+                    f"token belongs to '{login}', only listing public repos of "
+                    f"'{owner}'"
+                )
+                token = None
+        tasks, backup_options = plan(
+            owner, target_args, token, org=org, metrics=metrics
+        )
+        if args.list:
+            logger.info("")
+            continue
+        planned.append((owner, tasks, backup_options))
+    if args.list:
+        return []
+    if args.plan:
+        estimate_run(
+            [(tasks, backup_options) for _, tasks, backup_options in planned],
+            args.jobs,
+            args.disk_budget,
+        )
+        return []
+    # repo names are only unique per owner
+    work = (
+        (task._replace(name=f"{owner}/{task.name}"), backup_options)
+        for owner, tasks, backup_options in planned
+        for task in tasks
+    )
+    results = backup_batch(work, args.jobs, args.disk_budget)
+    return finish_run(
+        results, [backup_options for _, _, backup_options in planned], metrics
+    )
+
+
+def restore(base_dir, spec):
+    # `spec` is "<repo>" for the latest snapshot, or "<repo>@<snapshot>"
+    name, _, snapshot = spec.partition("@")
+    store = Store(base_dir / "backups" / STORE_NAME)
+    target_dir = base_dir / "restored" / name
+    if target_dir.exists():
+        sys.exit(f"error: restore directory already exists: {target_dir}")
+    try:
+        snapshot_path = store.restore(name, target_dir, snapshot or None)
+    except FileNotFoundError as e:
+        sys.exit(f"error: {e}")
+    logger.info(
+        f"restored snapshot '{snapshot_path.stem}' of '{name}' to: {target_dir}"
+    )
+
+
+def verify(base_dirs, jobs=1):
+    # check the archives in each dir against the checksums recorded when they
+    # were written, `jobs` archives at a time, and return the number that failed
+    checked = []
+    for base_dir in base_dirs:
+        working_dir = base_dir / "backups"
+        checksums = Checksums(working_dir / CHECKSUMS_NAME)
+        entries = checksums.entries()
+        recorded = {entry["archive"] for entry in entries}
+        suffixes = tuple(f".{extension}" for extension in EXTENSIONS.values())
+        for path in sorted(working_dir.glob("*")):
+            if (
+                path.name.endswith(suffixes)
+                and path.is_file()
+                and path.name not in recorded
+            ):
+                logger.warning(f"no checksums for archive: {path}")
+        for entry in entries:
+            if "url" in entry:
+                logger.info(f"skipping uploaded archive: {entry['url']}")
+            else:
+                checked.append((checksums, entry))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        errors = list(executor.map(lambda pair: pair[0].verify(pair[1]), checked))
+    num_failed = 0
+    for (checksums, entry), error in zip(checked, errors, strict=True):
+        archive_path = checksums.path.parent / entry["archive"]
+        if error is None:
+            logger.info(f"ok: {archive_path}")
+        else:
+            num_failed += 1
+            logger.error(f"error: {archive_path}: {error}")
+    logger.info(f"verified {len(checked) - num_failed} of {len(checked)} archives")
+    return num_failed
+
+
+def check_args(args):
+    # return the error for an invalid combination of options, or None (options
+    # from a config file aren't checked by the parser, so choices are checked
+    # here too)
+    if args.format not in ARCHIVE_FORMATS:
+        return f"--format must be one of: {', '.join(ARCHIVE_FORMATS)}"
+    if args.api not in API_CHOICES:
+        return f"--api must be one of: {', '.join(API_CHOICES)}"
+    if args.jobs < 1:
+        return "--jobs must be at least 1"
+    if args.compress_threads < 1:
+        return "--compress_threads must be at least 1"
+    if args.compression_level is not None:
+        level_range = LEVEL_RANGES.get(args.format)
+        if level_range is None:
+            return f"--compression_level can't be used with --format={args.format}"
+        if args.compression_level not in level_range:
+            return (
+                f"--compression_level must be {level_range.start}-"
+                f"{level_range.stop - 1} for --format={args.format}"
+            )
+    if args.format == "tar.zst" and not zstd_available():
+        return "--format=tar.zst requires Python 3.14+ or the zstandard package"
+    if args.incremental and not args.mirror:
+        return "--incremental requires --mirror"
+    if args.mirror and args.no_checkout:
+        return "--mirror can't be used with --no_checkout"
+    if args.filter is not None:
+        if not CLONE_FILTER_PATTERN.fullmatch(args.filter):
+            return "--filter must be blob:none, blob:limit=SIZE, or tree:DEPTH"
+        if not args.history or args.mirror:
+            return "--filter requires --history and can't be used with --mirror"
+    if args.reference_cache and (
+        not args.history or args.mirror or args.no_checkout or args.filter
+    ):
+        return (
+            "--reference_cache requires --history and can't be used with --mirror, "
+            "--no_checkout, or --filter"
+        )
+    if args.sparse and (args.mirror or args.no_checkout):
+        return "--sparse can't be used with --mirror or --no_checkout"
+    if args.store and (args.mirror or args.no_checkout):
+        return "--store can't be used with --mirror or --no_checkout"
+    if args.upload is not None:
+        if not args.upload.startswith("s3://"):
+            return "--upload must be an s3://BUCKET[/PREFIX] URL"
+        if args.mirror or args.format == "none":
+            return "--upload can't be used with --mirror or --format=none"
+    if args.list and args.plan:
+        return "--list can't be used with --plan"
+    if args.quiet and (args.list or args.plan):
+        # the listing and the plan are logged, which --quiet hides
+        return "--quiet can't be used with --list or --plan"
+    if (args.cached or args.cache_ttl is not None) and not (args.list or args.plan):
+        return "--cached and --cache_ttl require --list or --plan"
+    if args.bulk_gists and (
+        not args.gists
+        or args.history
+        or args.mirror
+        or args.store
+        or args.format == "none"
+    ):
+        return (
+            "--bulk_gists requires --gists and can't be used with --history, "
+            "--mirror, --store, or --format=none"
+        )
+    if args.snapshots and args.upload is not None:
+        return "--snapshots can't be used with --upload"
+    if args.keep_daily < 0 or args.keep_weekly < 0:
+        return "--keep_daily and --keep_weekly must be at least 0"
+    if args.defer_large and args.max_repo_size is None:
+        return "--defer_large requires --max_repo_size"
+    if args.no_checkout and (args.history or args.keep or args.format == "none"):
+        return "--no_checkout can't be used with --history, --keep, or --format=none"
+    return None
+
+
+def config_options(parser):
+    # the options a target in a config file can set, with the types of their
+    # values (or the function a string value is converted with, like sizes)
+    options = {"token_env": str}
+    for action in parser._actions:
+        if not action.option_strings or action.dest in RUN_OPTIONS:
+            continue
+        if action.nargs == 0:
+            options[action.dest] = bool
+        elif isinstance(action, argparse._AppendAction):
+            options[action.dest] = list
+        else:
+            options[action.dest] = action.type or str
+    return options
+
+
+def build_parser():
+    def formatter(prog):
+        return argparse.HelpFormatter(prog, max_help_position=30)
+
+    parser = argparse.ArgumentParser(formatter_class=formatter)
+    parser.add_argument("username", nargs="?", help="github username")
+    parser.add_argument(
+        "--dir",
+        default=Path.cwd(),
+        help="output directory (default: .)",
+    )
+    parser.add_argument(
+        "--pattern",
+        default=".*",
+        help="regex matching repo names to include",
+    )
+    parser.add_argument(
+        "--skip_pattern",
+        metavar="PATTERN",
+        help="regex matching repo names to skip",
+    )
+    parser.add_argument(
+        "--format",
+        choices=ARCHIVE_FORMATS,
+        default="zip",
+        help="archive format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--gists", action="store_true", default=False, help="include gists"
+    )
+    parser.add_argument(
+        "--bulk_gists",
+        action="store_true",
+        default=False,
+        help="with --gists, fetch gists' files through the API and pack them "
+        "into a few combined archives, instead of cloning each gist",
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        default=False,
+        help="include commit history and branches (.git directory)",
+    )
+    parser.add_argument(
+        "--skip_forks",
+        action="store_true",
+        default=False,
+        help="skip repos that are forks",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", default=False, help="keep repos after archiving"
+    )
+    parser.add_argument(
+        "--snapshots",
+        action="store_true",
+        default=False,
+        help="keep a dated snapshot of the backups after each run, sharing "
+        "unchanged files with the previous one",
+    )
+    parser.add_argument(
+        "--keep_daily",
+        metavar="N",
+        type=int,
+        default=KEEP_DAILY,
+        help="with --snapshots, keep the last snapshot of each of the last N days "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--keep_weekly",
+        metavar="N",
+        type=int,
+        default=KEEP_WEEKLY,
+        help="with --snapshots, keep the last snapshot of each of the last N weeks "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--list", action="store_true", default=False, help="list repos only"
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=False,
+        help="estimate the transfer, disk space, output size, and time of a "
+        "backup with the other options, from the sizes of the repos and the "
+        "throughput of previous runs",
+    )
+    parser.add_argument(
+        "--cache_ttl",
+        metavar="SECS",
+        type=int,
+        help="with --list or --plan, use the listing cached by a previous run if "
+        "it is less than SECS old",
+    )
+    parser.add_argument(
+        "--cached",
+        action="store_true",
+        default=False,
+        help="with --list or --plan, use the cached listing without querying the API",
+    )
+    parser.add_argument(
+        "--token", action="store_true", default=False, help="prompt for auth token"
+    )
+    parser.add_argument(
+        "--api",
+        choices=API_CHOICES,
+        default="auto",
+        help="GitHub API used to list repos (default: %(default)s, which uses "
+        "graphql when authenticated)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of repos to back up in parallel (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--disk_budget",
+        metavar="SIZE",
+        type=parse_size,
+        help="most disk space used at once by repos being backed up (e.g. 20G), "
+        "estimated from their size on GitHub",
+    )
+    parser.add_argument(
+        "--max_repo_size",
+        metavar="SIZE",
+        type=parse_size,
+        help="skip repos larger than SIZE on GitHub (e.g. 2G)",
+    )
+    parser.add_argument(
+        "--defer_large",
+        action="store_true",
+        default=False,
+        help="with --max_repo_size, back up larger repos at the end of the run, "
+        "one at a time, instead of skipping them",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="back up all repos, even if unchanged since the last run",
+    )
+    parser.add_argument(
+        "--no_checkout",
+        action="store_true",
+        default=False,
+        help="create archives directly from git objects, without a working tree",
+    )
+    parser.add_argument(
+        "--filter",
+        metavar="SPEC",
+        help="with --history, make a partial clone (blob:none, blob:limit=SIZE, "
+        "tree:DEPTH)",
+    )
+    parser.add_argument(
+        "--sparse",
+        metavar="DIR",
+        action="append",
+        help="only check out files in DIR (can be used more than once)",
+    )
+    parser.add_argument(
+        "--reference_cache",
+        action="store_true",
+        default=False,
+        help="with --history, fetch objects shared by forks once, into a cache",
+    )
+    parser.add_argument(
+        "--mirror",
+        action="store_true",
+        default=False,
+        help="keep bare mirrors and back them up as git bundles (all refs)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="with --mirror, only bundle what is new since the previous bundle",
+    )
+    parser.add_argument(
+        "--compression_level",
+        metavar="LEVEL",
+        type=int,
+        help="compression level (0-9 for tar/zip, 1-22 for tar.zst)",
+    )
+    parser.add_argument(
+        "--compress_threads",
+        metavar="N",
+        type=int,
+        default=1,
+        help="threads used to compress each tar archive (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--upload",
+        metavar="URL",
+        help="stream archives to S3-compatible storage (s3://BUCKET/PREFIX) "
+        "instead of saving them locally",
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        default=False,
+        help="also add files to a deduplicating store (backups/store)",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="append per-repo, per-phase timings and sizes to a JSON lines file",
+    )
+    parser.add_argument(
+        "--metrics_textfile",
+        metavar="PATH",
+        help="write metrics to a Prometheus node exporter textfile (.prom)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        default=False,
+        help="only show warnings and errors, without progress bars",
+    )
+    parser.add_argument(
+        "--config",
+        metavar="PATH",
+        help="back up the users and orgs listed in a TOML config file, instead "
+        "of username",
+    )
+    parser.add_argument(
+        "--restore",
+        metavar="REPO[@SNAPSHOT]",
+        help="restore a repo snapshot from the store to restored/REPO",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        default=False,
+        help="check archives against the checksums recorded when they were "
+        "created (with --jobs archives at a time)",
+    )
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.quiet:
+        logger.setLevel(logging.WARNING)
+    if args.restore:
+        restore(Path(args.dir), args.restore)
+        return
+    if args.verify:
+        base_dirs = [Path(args.dir)]
+        if args.config is not None:
+            try:
+                config = load_config(args.config, config_options(parser))
+            except ConfigError as e:
+                parser.error(f"{args.config}: {e}")
+            base_dirs = [
+                Path(target.get("dir", args.dir)) / target["owner"] for target in config
+            ]
+        if verify(base_dirs, args.jobs):
+            sys.exit("error: some archives failed verification")
+        return
+    if args.config is not None:
+        if args.username is not None:
+            parser.error("username can't be used with --config")
+        try:
+            config = load_config(args.config, config_options(parser))
+        except ConfigError as e:
+            parser.error(f"{args.config}: {e}")
+        targets = []
+        for target in config:
+            # options on the command line are defaults for the config file
+            target_args = argparse.Namespace(**{**vars(args), **target})
+            error = check_args(target_args)
+            if error:
+                parser.error(f"{args.config}: target '{target['owner']}': {error}")
+            # each target gets a dir (and upload prefix) of its own, with the
+            # usual layout
+            target_args.dir = Path(target_args.dir) / target["owner"]
+            if target_args.upload is not None:
+                target_args.upload = (
+                    f"{target_args.upload.rstrip('/')}/{target['owner']}"
+                )
+            targets.append(
+                (target["owner"], target["org"], target.get("token_env"), target_args)
+            )
+        try:
+            results = run_batch(targets, args)
+        except KeyboardInterrupt:
+            sys.exit("\nexiting program ...")
+    else:
+        if args.username is None:
+            parser.error("the following arguments are required: username")
+        error = check_args(args)
+        if error:
+            parser.error(error)
+        try:
+            results = run(args)
+        except KeyboardInterrupt:
+            sys.exit("\nexiting program ...")
+    num_failed = sum(1 for result in results if result.error is not None)
+    if num_failed:
+        sys.exit(f"error: failed backing up {num_failed} repos")
@@ -0,0 +1,400 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""GitHub GraphQL client for listing repos and gists in a few batched requests.
+
+Also a REST client for checking if a cached listing is still current.
+"""
+
+import json
+import logging
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+REST_URL = "https://api.github.com"
+LAST_PAGE_PATTERN = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>; rel="last"')
+# the most nodes GitHub returns per page
+PAGE_SIZE = 100
+# rate limits and server errors that are worth retrying (a 403 is only when it
+# is a rate limit, see `is_rate_limit`)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# fields of each page of repos, shared by the listing queries (the nested
+# parents stand in for the root of a fork's network)
+REPOSITORY_PAGE = """
+fragment repositoryPage on RepositoryConnection {
+  pageInfo {
+    hasNextPage
+    endCursor
+  }
+  nodes {
+    name
+    nameWithOwner
+    url
+    description
+    isFork
+    diskUsage
+    pushedAt
+    parent {
+      nameWithOwner
+      parent {
+        nameWithOwner
+        parent {
+          nameWithOwner
+        }
+      }
+    }
+  }
+}
+"""
+
+# repos and gists are paged through together, and a connection is left out of
+# the query once all of its pages are fetched (queries of repos are sent with
+# `REPOSITORY_PAGE` appended)
+LISTING_QUERY = """
+query(
+  $pageSize: Int!
+  $repoCursor: String
+  $gistCursor: String
+  $withRepos: Boolean!
+  $withGists: Boolean!
+) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
+  viewer {
+    login
+    repositories(
+      first: $pageSize
+      after: $repoCursor
+      ownerAffiliations: [OWNER]
+    ) @include(if: $withRepos) {
+      ...repositoryPage
+    }
+    gists(first: $pageSize, after: $gistCursor, privacy: ALL)
+      @include(if: $withGists) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        name
+        description
+        updatedAt
+        files(limit: 100) {
+          size
+        }
+      }
+    }
+  }
+}
+"""
+
+ORG_LISTING_QUERY = """
+query($login: String!, $pageSize: Int!, $repoCursor: String) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
+  organization(login: $login) {
+    repositories(first: $pageSize, after: $repoCursor) {
+      ...repositoryPage
+    }
+  }
+}
+"""
+
+# the contents of the files of a gist, fetched for many gists per query (text
+# is null for binary files)
+GIST_FILES = """
+fragment gistFiles on Gist {
+  files(limit: 100) {
+    name
+    size
+    isTruncated
+    text
+  }
+}
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_rate_limit(error):
+    # GitHub answers 403 both for rate limits and for missing permissions
+    if error.headers.get("x-ratelimit-remaining") == "0":
+        return True
+    if error.headers.get("retry-after") is not None:
+        return True
+    try:
+        body = error.read().decode(errors="replace")
+    except OSError:
+        return False
+    return "rate limit" in body.lower()
+
+
+class GraphQLClient:
+    """Client for the GitHub GraphQL API that stays within its rate limits.
+
+    The remaining quota is tracked from the response headers and the
+    `rateLimit` field of each query. When it runs out, the client sleeps
+    until the quota is reset instead of failing. Secondary rate limits,
+    server errors and failed connections are retried with exponential
+    backoff, honoring `Retry-After`.
+    """
+
+    def __init__(self, token, url=GRAPHQL_URL, max_retries=5, sleep=time.sleep):
+        self.token = token
+        self.url = url
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.remaining = None
+        self.reset_at = None
+        self.last_cost = 1
+
+    def wait_for_quota(self):
+        # don't send a query that would exceed the quota, wait for the reset
+        if self.remaining is None or self.remaining >= self.last_cost:
+            return
+        self.sleep_until_reset()
+
+    def sleep_until_reset(self, default=60):
+        if self.reset_at is None:
+            delay = default
+        else:
+            delay = max(self.reset_at - time.time(), 0) + 1
+        logger.info(f"GitHub API rate limit reached, waiting {delay:.0f} secs")
+        self.sleep(delay)
+        self.remaining = None
+
+    def update_quota(self, headers):
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset is not None:
+            self.reset_at = int(reset)
+
+    def query(self, query, variables=None):
+        body = json.dumps({"query": query, "variables": variables or {}}).encode()
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            headers={
+                "Authorization": f"bearer {self.token}",
+                "Content-Type": "application/json",
+                "User-Agent": "githubtakeout",
+            },
+        )
+        attempt = 0
+        backoff = 1
+        while True:
+            self.wait_for_quota()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    self.update_quota(response.headers)
+                    result = json.load(response)
+            except urllib.error.HTTPError as e:
+                self.update_quota(e.headers)
+                if e.code == 401:
+                    raise ApiError("invalid auth token", e.code) from e
+                retry = e.code in RETRY_STATUSES or (e.code == 403 and is_rate_limit(e))
+                if not retry or attempt == self.max_retries:
+                    raise ApiError(f"GitHub API error: {e.code}", e.code) from e
+                attempt += 1
+                if self.remaining == 0:
+                    # primary rate limit
+                    self.sleep_until_reset()
+                    continue
+                # secondary rate limit or server error
+                delay = int(e.headers.get("retry-after", backoff))
+                logger.info(f"GitHub API error: {e.code}, retrying in {delay} secs")
+                self.sleep(delay)
+                backoff *= 2
+                continue
+            except (urllib.error.URLError, TimeoutError) as e:
+                # connection refused or reset, DNS failures, timeouts
+                reason = getattr(e, "reason", e)
+                if attempt == self.max_retries:
+                    raise ApiError(f"GitHub API request failed: {reason}") from e
+                attempt += 1
+                logger.info(
+                    f"GitHub API request failed: {reason}, retrying in {backoff} secs"
+                )
+                self.sleep(backoff)
+                backoff *= 2
+                continue
+            errors = result.get("errors")
+            if errors and any(error.get("type") == "RATE_LIMITED" for error in errors):
+                if attempt == self.max_retries:
+                    raise ApiError("GitHub API rate limit exceeded")
+                attempt += 1
+                self.remaining = 0
+                self.sleep_until_reset()
+                continue
+            if errors:
+                raise ApiError(f"GitHub API error: {errors[0].get('message')}")
+            rate_limit = result["data"].get("rateLimit")
+            if rate_limit:
+                self.last_cost = rate_limit["cost"]
+                self.remaining = rate_limit["remaining"]
+                reset_at = datetime.fromisoformat(rate_limit["resetAt"])
+                self.reset_at = int(reset_at.timestamp())
+            return result["data"]
+
+    def iter_repos_and_gists(self, include_gists):
+        """Yield the authenticated user's repos and gists, a page at a time.
+
+        Yields ("repo", repo) and ("gist", gist) pairs as each page arrives.
+        Each repo and gist is a dict with the fields from `LISTING_QUERY`,
+        plus `network` for repos: the full name of the root of its fork
+        network.
+        """
+        cursors = {"repoCursor": None, "gistCursor": None}
+        with_repos = True
+        with_gists = include_gists
+        while with_repos or with_gists:
+            data = self.query(
+                LISTING_QUERY + REPOSITORY_PAGE,
+                {
+                    "pageSize": PAGE_SIZE,
+                    "withRepos": with_repos,
+                    "withGists": with_gists,
+                    **cursors,
+                },
+            )
+            viewer = data["viewer"]
+            if with_repos:
+                page = viewer["repositories"]
+                cursors["repoCursor"] = page["pageInfo"]["endCursor"]
+                with_repos = page["pageInfo"]["hasNextPage"]
+                yield from (("repo", repo) for repo in add_networks(page["nodes"]))
+            if with_gists:
+                page = viewer["gists"]
+                cursors["gistCursor"] = page["pageInfo"]["endCursor"]
+                with_gists = page["pageInfo"]["hasNextPage"]
+                yield from (("gist", gist) for gist in page["nodes"])
+
+    def iter_org_repos(self, login):
+        """Yield the repos of an org, a page at a time."""
+        cursor = None
+        has_next_page = True
+        while has_next_page:
+            data = self.query(
+                ORG_LISTING_QUERY + REPOSITORY_PAGE,
+                {"login": login, "pageSize": PAGE_SIZE, "repoCursor": cursor},
+            )
+            page = data["organization"]["repositories"]
+            cursor = page["pageInfo"]["endCursor"]
+            has_next_page = page["pageInfo"]["hasNextPage"]
+            yield from add_networks(page["nodes"])
+
+    def gist_files(self, login, names):
+        """Return the files of the gists of user `login` with `names`.
+
+        All gists are fetched in one query (each as an aliased field), as a
+        dict of each gist's name to a list of its files (dicts with the
+        fields from `GIST_FILES`), or None if there is no such gist.
+        """
+        params = "".join(f", $name{i}: String!" for i in range(len(names)))
+        fields = "\n".join(
+            f"    gist{i}: gist(name: $name{i}) {{ ...gistFiles }}"
+            for i in range(len(names))
+        )
+        query = (
+            f"query($login: String!{params}) {{\n"
+            "  rateLimit {\n    cost\n    remaining\n    resetAt\n  }\n"
+            f"  user(login: $login) {{\n{fields}\n  }}\n}}\n" + GIST_FILES
+        )
+        variables = {f"name{i}": name for i, name in enumerate(names)}
+        data = self.query(query, {"login": login, **variables})
+        if data["user"] is None:
+            raise ApiError(f"user '{login}' not found")
+        gists = {}
+        for i, name in enumerate(names):
+            gist = data["user"][f"gist{i}"]
+            gists[name] = None if gist is None else gist["files"]
+        return gists
+
+
+def add_networks(repos):
+    for repo in repos:
+        # the furthest parent in the query stands in for the root of the
+        # network, which is exact unless forks are nested very deep
+        network = repo["nameWithOwner"]
+        parent = repo["parent"]
+        while parent is not None:
+            network = parent["nameWithOwner"]
+            parent = parent.get("parent")
+        repo["network"] = network
+    return repos
+
+
+class RestClient:
+    """Conditional requests to the GitHub REST API.
+
+    `validators` gets the URL and ETag of each page of a listing (from
+    headers only), before the listing is fetched. Later, `unchanged` sends
+    each page's ETag back: GitHub answers with an empty 304 (which doesn't
+    count against the rate limit) if the page is still the same.
+    """
+
+    def __init__(self, token=None, url=REST_URL):
+        self.token = token
+        self.url = url.rstrip("/")
+
+    def request(self, method, url, etag=None):
+        # return the status and headers of a response, without its body
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "githubtakeout",
+        }
+        if self.token is not None:
+            headers["Authorization"] = f"bearer {self.token}"
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        request = urllib.request.Request(url, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return e.code, e.headers
+            raise ApiError(f"GitHub API error: {e.code}", e.code) from e
+        except urllib.error.URLError as e:
+            raise ApiError(f"GitHub API request failed: {e.reason}") from e
+
+    def validators(self, path, params=None):
+        """Return [url, etag] pairs for each page of the listing at `path`."""
+        query = urllib.parse.urlencode({**(params or {}), "per_page": PAGE_SIZE})
+        url = f"{self.url}{path}?{query}"
+        _, headers = self.request("HEAD", url)
+        pairs = [[url, headers.get("ETag")]]
+        match = LAST_PAGE_PATTERN.search(headers.get("Link", ""))
+        last_page = int(match.group(1)) if match else 1
+        for page in range(2, last_page + 1):
+            page_url = f"{url}&page={page}"
+            _, headers = self.request("HEAD", page_url)
+            pairs.append([page_url, headers.get("ETag")])
+        return pairs
+
+    def unchanged(self, validators):
+        """Check if none of the pages changed since their ETags were taken."""
+        return all(
+            etag is not None and self.request("GET", url, etag)[0] == 304
+            for url, etag in validators
+        )
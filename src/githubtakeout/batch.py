@@ -0,0 +1,97 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Config file for backing up several users and orgs in a single run."""
+
+import tomllib
+from pathlib import Path
+
+
+class ConfigError(Exception):
+    pass
+
+
+def check_options(options, where, types):
+    for key, value in options.items():
+        expected = types.get(key)
+        if expected is None:
+            raise ConfigError(f"unknown option '{key}' in {where}")
+        # values like sizes ("2G") are strings, converted by a function
+        convert = None
+        if expected not in (bool, int, list, str):
+            expected, convert = str, expected
+        # bools are ints in Python, but `compression_level = true` is a mistake
+        if not isinstance(value, expected) or (
+            expected is int and isinstance(value, bool)
+        ):
+            raise ConfigError(
+                f"option '{key}' in {where} must be of type {expected.__name__}"
+            )
+        if convert is not None:
+            try:
+                options[key] = convert(value)
+            except ValueError as e:
+                raise ConfigError(f"option '{key}' in {where}: {e}") from e
+
+
+def load_config(path, types):
+    """Read the targets of a batch run from a TOML config file.
+
+    `types` maps the options that can be set for all targets in `[defaults]`,
+    or per target, to the types their values must have: bool, int, list, str,
+    or a function converting a string (names match the command line options,
+    plus `token_env`, the environment variable holding a target's auth token).
+
+    Example::
+
+        [defaults]
+        dir = "/backups"
+        history = true
+
+        [[target]]
+        user = "cgoldberg"
+        gists = true
+
+        [[target]]
+        org = "example"
+        pattern = "^api-"
+        format = "tar.zst"
+        token_env = "EXAMPLE_TOKEN"
+
+    Returns a list of dicts, one per target, with `owner` (the user or org
+    name), `org` (True for an org), and its options merged over the defaults.
+    """
+    try:
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+    except OSError as e:
+        raise ConfigError(f"can't read config file: {e}") from e
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"invalid config file: {e}") from e
+    unknown = set(config) - {"defaults", "target"}
+    if unknown:
+        raise ConfigError(f"unknown section '{min(unknown)}'")
+    defaults = config.get("defaults", {})
+    check_options(defaults, "[defaults]", types)
+    targets = []
+    seen = set()
+    for i, target in enumerate(config.get("target", []), start=1):
+        target = dict(target)
+        user = target.pop("user", None)
+        org = target.pop("org", None)
+        if (user is None) == (org is None):
+            raise ConfigError(f"target {i} must have either 'user' or 'org'")
+        owner = user if org is None else org
+        check_options(target, f"target '{owner}'", types)
+        options = {**defaults, **target}
+        if org is not None and options.get("gists"):
+            raise ConfigError(f"target '{owner}' is an org, orgs don't have gists")
+        # each target is backed up in a dir of its own under `dir`
+        key = (Path(options.get("dir", ".")).resolve(), owner.lower())
+        if key in seen:
+            raise ConfigError(f"target '{owner}' is listed more than once")
+        seen.add(key)
+        targets.append({"owner": owner, "org": org is not None, **options})
+    if not targets:
+        raise ConfigError("no targets in config file")
+    return targets
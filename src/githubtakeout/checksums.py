@@ -0,0 +1,131 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""SHA-256 checksums of archives, computed while the archives are written."""
+
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from githubtakeout.files import write_text
+from githubtakeout.store import CHUNK_SIZE, hash_file
+
+CHECKSUMS_NAME = ".checksums"
+
+
+class HashingWriter(io.BufferedIOBase):
+    """Binary stream that hashes what is written to it on the way to `file`.
+
+    The stream isn't seekable (so `zipfile` writes entries sequentially, and
+    every byte is hashed exactly once), but `tell()` works. Closing it doesn't
+    close `file`.
+    """
+
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.size
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed file")
+        size = memoryview(data).nbytes
+        self.file.write(data)
+        self.digest.update(data)
+        self.size += size
+        return size
+
+    def flush(self):
+        if not self.file.closed:
+            self.file.flush()
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+class HashingReader(io.RawIOBase):
+    """Binary stream that hashes what is read from `file`."""
+
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.digest.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def copy_hashed(src, dest):
+    # copy one file into another, and return the SHA-256 of its contents
+    digest = hashlib.sha256()
+    while chunk := src.read(CHUNK_SIZE):
+        dest.write(chunk)
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checksums:
+    """Checksums of the archives in an output directory.
+
+    Layout::
+
+        <archive name>.json   size and SHA-256 of the archive, and SHA-256 of
+                              each file in it (when they were archived from
+                              a working tree)
+
+    Digests are computed from the bytes as they are streamed into the archive,
+    so nothing is read back. An archive can then be verified with one
+    sequential read, without unpacking it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def entry_path(self, archive_name):
+        return self.path / f"{archive_name}.json"
+
+    def record(self, archive_name, sha256, size, files=None, url=None):
+        entry = {"archive": archive_name, "size": size, "sha256": sha256}
+        if files is not None:
+            entry["files"] = files
+        if url is not None:
+            # uploaded to object storage, there is no local archive to verify
+            entry["url"] = url
+        write_text(self.entry_path(archive_name), json.dumps(entry, indent=2))
+
+    def entries(self):
+        if not self.path.is_dir():
+            return []
+        return [
+            json.loads(path.read_text()) for path in sorted(self.path.glob("*.json"))
+        ]
+
+    def verify(self, entry):
+        """Check an archive against its checksums, and return the error or None."""
+        archive_path = self.path.parent / entry["archive"]
+        try:
+            size = archive_path.stat().st_size
+        except FileNotFoundError:
+            return "archive is missing"
+        # a truncated or extended archive is caught without reading it
+        if size != entry["size"]:
+            return f"size is {size} bytes, expected {entry['size']}"
+        if hash_file(archive_path) != entry["sha256"]:
+            return "SHA-256 doesn't match"
+        return None
@@ -0,0 +1,149 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Compression streams for tar archives, and codec selection for zip entries."""
+
+import gzip
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # Python 3.14+
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# default compression levels, matching what `tarfile` and `zstd` use
+DEFAULT_LEVELS = {"tar": 9, "tar.zst": 3}
+LEVEL_RANGES = {"tar": range(10), "zip": range(10), "tar.zst": range(1, 23)}
+
+# file types that are already compressed, so deflating them is wasted work
+COMPRESSED_EXTENSIONS = frozenset(
+    """
+    .7z .aac .apk .avif .br .bz2 .docx .epub .flac .gif .gz .heic .jar .jpeg .jpg
+    .lz .lz4 .lzma .m4a .mkv .mov .mp3 .mp4 .odt .ogg .pack .png .pptx .rar .tgz
+    .war .webm .webp .whl .woff .woff2 .xlsx .xz .zip .zst
+    """.split(),
+)
+COMPRESSED_MAGIC_NUMBERS = (
+    b"\x1f\x8b",  # gzip
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"\x89PNG",  # png
+    b"\xff\xd8\xff",  # jpeg
+    b"\xfd7zXZ\x00",  # xz
+    b"7z\xbc\xaf",  # 7z
+    b"BZh",  # bzip2
+    b"GIF8",  # gif
+    b"OggS",  # ogg
+    b"PACK",  # git packfile
+    b"PK\x03\x04",  # zip, jar, docx, etc.
+    b"Rar!",  # rar
+    b"fLaC",  # flac
+)
+# files smaller than this are always deflated, probing them costs more than
+# it could save
+MIN_PROBE_SIZE = 4096
+PROBE_SIZE = 64 * 1024
+# store a file if a quick compression of its first block saves less than this
+MIN_SAVINGS = 0.1
+
+
+def zstd_available():
+    return zstd is not None or zstandard is not None
+
+
+class ParallelGzipWriter:
+    """Write-only stream that gzips blocks of data on multiple threads.
+
+    Each block is compressed as a separate gzip member. Concatenated members
+    are a valid gzip file, so the output can be read by any gzip reader.
+    """
+
+    def __init__(self, fileobj, level=9, threads=2, block_size=1024 * 1024):
+        self.fileobj = fileobj
+        self.level = level
+        self.threads = threads
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            block = bytes(self.buffer[: self.block_size])
+            del self.buffer[: self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block):
+        # zlib releases the GIL, so blocks are compressed in parallel
+        self.pending.append(
+            self.executor.submit(gzip.compress, block, self.level, mtime=0)
+        )
+        # bound the memory used by blocks that are queued or compressed
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.executor.shutdown()
+
+
+def zip_compress_type(path):
+    """Choose whether a file is deflated or stored uncompressed in a zip.
+
+    Files are stored if their extension or magic number shows they are
+    already compressed, or if a fast compression of their first block barely
+    shrinks it. Everything else is deflated.
+    """
+    if path.suffix.lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    if path.stat().st_size < MIN_PROBE_SIZE:
+        return zipfile.ZIP_DEFLATED
+    with open(path, "rb") as f:
+        sample = f.read(PROBE_SIZE)
+    if sample.startswith(COMPRESSED_MAGIC_NUMBERS):
+        return zipfile.ZIP_STORED
+    if len(zlib.compress(sample, 1)) > len(sample) * (1 - MIN_SAVINGS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def open_compressor(fileobj, archive_format, level=None, threads=1):
+    """Wrap a binary file object with a compressor for a tar archive format.
+
+    The returned stream must be closed to flush it. Closing it doesn't close
+    `fileobj`, except for uncompressed tarballs where `fileobj` is returned.
+    """
+    if level is None:
+        level = DEFAULT_LEVELS.get(archive_format)
+    if archive_format == "tar":
+        if threads > 1:
+            return ParallelGzipWriter(fileobj, level, threads)
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=level)
+    if archive_format == "tar.zst":
+        if zstd is not None:
+            options = {zstd.CompressionParameter.compression_level: level}
+            if threads > 1:
+                options[zstd.CompressionParameter.nb_workers] = threads
+            return zstd.ZstdFile(fileobj, "w", options=options)
+        if zstandard is not None:
+            compressor = zstandard.ZstdCompressor(
+                level=level, threads=threads if threads > 1 else 0
+            )
+            return compressor.stream_writer(fileobj, closefd=False)
+        raise ValueError("tar.zst format requires Python 3.14+ or `zstandard`")
+    if archive_format == "tar.uncompressed":
+        return fileobj
+    raise ValueError(f"{archive_format} is not a compressed tar format")
@@ -0,0 +1,28 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Atomic writes of the archives and state files in the output directory."""
+
+import os
+from contextlib import contextmanager, suppress
+
+
+@contextmanager
+def atomic_path(path):
+    # write to a temp file that is renamed into place once it is complete, so
+    # an interrupted write never leaves something that looks like a backup
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        yield tmp_path
+    except BaseException:
+        with suppress(FileNotFoundError):
+            tmp_path.unlink()
+        raise
+    os.replace(tmp_path, path)
+
+
+def write_text(path, text):
+    # readers (a resumed run, the node exporter) never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(path) as tmp_path:
+        tmp_path.write_text(text)
@@ -0,0 +1,102 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Background deletion of directories, so backups don't wait for it."""
+
+import logging
+import os
+import queue
+import shutil
+import stat
+import tempfile
+import threading
+from contextlib import suppress
+from pathlib import Path
+
+TRASH_NAME = ".trash"
+# deleting is bound by the disk, a couple of threads keep it busy
+JANITOR_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+
+
+def remove_readonly(func, path, _):
+    # This is necessary so rmtree() doesn't fail if there are any readonly
+    # dirs/files when trying to delete. This seems to happen after cloning on
+    # Windows. When any error occurs during deletion, we change the permissions
+    # and and reattempt removal.
+    #
+    # give read permissions
+    os.chmod(path, stat.S_IREAD)
+    # give write permissions
+    os.chmod(path, stat.S_IWRITE)
+    # try again
+    func(path)
+
+
+def remove_tree(path):
+    with suppress(FileNotFoundError):
+        shutil.rmtree(path, onexc=remove_readonly)
+
+
+class Janitor:
+    """Deletes directories in the background, with `workers` threads.
+
+    A discarded directory is renamed into the trash directory at `path`
+    right away (on the same disk, so it is instant), which frees its name
+    for the next clone, and is deleted later. Whatever is left in the trash
+    by an interrupted run is deleted when the next run starts.
+    """
+
+    def __init__(self, path, workers=JANITOR_WORKERS):
+        self.path = Path(path)
+        self.queue = queue.Queue()
+        # daemon threads, so Ctrl-C doesn't wait for deletions, which are
+        # picked up again by the next run
+        self.threads = [
+            threading.Thread(target=self.work, daemon=True) for _ in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+        if self.path.is_dir():
+            leftovers = list(self.path.iterdir())
+            if leftovers:
+                logger.info(f"deleting {len(leftovers)} dirs left by a previous run")
+            for leftover in leftovers:
+                self.queue.put(leftover)
+
+    def work(self):
+        while (path := self.queue.get()) is not None:
+            try:
+                remove_tree(path)
+            except OSError as e:
+                logger.warning(f"failed deleting {path}: {e}")
+            finally:
+                self.queue.task_done()
+        self.queue.task_done()
+
+    def discard(self, path):
+        path = Path(path)
+        if not os.path.lexists(path):
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        # a dir of its own in the trash, so names never collide
+        trash_dir = Path(tempfile.mkdtemp(dir=self.path))
+        try:
+            os.replace(path, trash_dir / path.name)
+        except OSError:
+            # e.g. on another disk, or in use on Windows
+            remove_tree(path)
+        self.queue.put(trash_dir)
+
+    def wait(self):
+        # wait for everything discarded so far to be deleted, e.g. for the
+        # disk space it takes
+        self.queue.join()
+
+    def close(self):
+        # wait for everything discarded so far to be deleted
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,65 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Journal of the phases each repo has completed in a run, used to resume runs."""
+
+import json
+import threading
+from pathlib import Path
+
+from githubtakeout.files import write_text
+
+JOURNAL_NAME = ".journal.json"
+
+
+class Journal:
+    """Checkpoints of the current run, so an interrupted run can resume.
+
+    The journal lives in the output directory and is deleted when a run
+    finishes. If a run is interrupted, the next run with the same options
+    picks it up and skips the phases each repo already completed. Each entry
+    is keyed by the local repo directory name and maps a phase to its result:
+
+        fetched    refs that were cloned or pulled (None if unknown)
+        stored     True once the files are added to the store
+        archived   archive or bundle produced (None if there is none)
+        done       True once the repo is fully backed up
+    """
+
+    def __init__(self, path, options):
+        self.path = Path(path)
+        self.options = options
+        self.lock = threading.Lock()
+        try:
+            journal = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            journal = None
+        if journal is not None and journal["options"] == options:
+            self.entries = journal["repos"]
+        else:
+            # a run with different options can't resume from this journal
+            self.entries = {}
+
+    @property
+    def resumed(self):
+        return bool(self.entries)
+
+    def entry(self, name):
+        with self.lock:
+            return dict(self.entries.get(name, {}))
+
+    def record(self, name, phase, result=True):
+        with self.lock:
+            self.entries.setdefault(name, {})[phase] = result
+            self.save()
+
+    def save(self):
+        write_text(
+            self.path,
+            json.dumps({"options": self.options, "repos": self.entries}, indent=2),
+        )
+
+    def finish(self):
+        with self.lock:
+            self.entries = {}
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,28 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Deferred imports, so `--help` and `--list` don't load GitPython or PyGithub."""
+
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module, which is imported when an attribute is first used.
+
+    Unlike `importlib.util.LazyLoader`, it is safe to use from several threads
+    at once, since `importlib.import_module` holds the import lock while the
+    module is loaded.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,52 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Cache of repo listings, so `--list` doesn't fetch the whole listing every run."""
+
+import json
+import time
+from pathlib import Path
+
+from githubtakeout.files import write_text
+
+LISTING_CACHE_NAME = ".listing.json"
+
+
+class ListingCache:
+    """Listings of users and orgs from previous runs of `--list`.
+
+    Each entry is keyed by the owner (and whether gists were listed), and
+    stores the unfiltered listing as (kind, fields) pairs, when it was fetched
+    (or last found unchanged), and the validators (see `RestClient`) to check
+    if it changed, for listings fetched with the REST API.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = Path(path)
+        self.clock = clock
+        try:
+            self.entries = json.loads(self.path.read_text())["listings"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def age(self, key):
+        return self.clock() - self.entries[key]["fetched_at"]
+
+    def put(self, key, items, validators=None):
+        self.entries[key] = {
+            "fetched_at": self.clock(),
+            "validators": validators,
+            "items": items,
+        }
+        self.save()
+
+    def touch(self, key):
+        # the listing was found unchanged
+        self.entries[key]["fetched_at"] = self.clock()
+        self.save()
+
+    def save(self):
+        write_text(self.path, json.dumps({"listings": self.entries}, indent=2))
@@ -0,0 +1,56 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Manifest of backed up repos, used to skip repos that haven't changed."""
+
+import json
+import threading
+from pathlib import Path
+
+from githubtakeout.files import write_text
+
+MANIFEST_NAME = ".manifest.json"
+
+
+class Manifest:
+    """Record of the remote refs and output produced for each backed up repo.
+
+    The manifest lives in the output directory. Each entry is keyed by the
+    local repo directory name and stores the refs (from `git ls-remote`) that
+    were backed up, the options used, and the archive or directory produced.
+    `exists` checks if an output still exists when it isn't kept on local disk
+    (e.g. archives uploaded to object storage).
+    """
+
+    def __init__(self, path, exists=None):
+        self.path = Path(path)
+        self.exists = exists
+        self.lock = threading.Lock()
+        try:
+            self.entries = json.loads(self.path.read_text())["repos"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            # start over if there is no manifest yet or it is unreadable
+            self.entries = {}
+
+    def is_unchanged(self, name, refs, options):
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        if entry["refs"] != refs or entry["options"] != options:
+            return False
+        # the backup must still exist, otherwise we need to create it again
+        if self.exists is not None:
+            return self.exists(entry["output"])
+        return (self.path.parent / entry["output"]).exists()
+
+    def record(self, name, refs, options, output):
+        with self.lock:
+            self.entries[name] = {
+                "refs": refs,
+                "options": options,
+                "output": Path(output).relative_to(self.path.parent).as_posix(),
+            }
+            self.save()
+
+    def save(self):
+        write_text(self.path, json.dumps({"repos": self.entries}, indent=2))
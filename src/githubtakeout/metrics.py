@@ -0,0 +1,215 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Per-repo, per-phase timings and sizes, written as JSON lines or Prometheus."""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from timeit import default_timer
+
+from githubtakeout.files import write_text
+
+
+def dir_size(path):
+    # total size of the regular files under `path` (0 if it doesn't exist)
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = Path(dirpath, filename)
+            if not file_path.is_symlink():
+                size += file_path.stat().st_size
+    return size
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RepoMetrics:
+    """Timings and sizes collected while backing up a single repo.
+
+    `phases` maps a phase name (clone, pull, archive, etc.) to the seconds
+    spent in it. Sizes are in bytes and are None when they weren't measured.
+    Sizes on disk are only measured when `measure` is set, since it means
+    walking the repo.
+    """
+
+    def __init__(self, name, measure=True):
+        self.name = name
+        self.measure = measure
+        self.start = default_timer()
+        self.phases = {}
+        self.skipped = False
+        self.bytes_fetched = None
+        self.bytes_source = None
+        self.bytes_written = None
+
+    @contextmanager
+    def phase(self, name):
+        start = default_timer()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + default_timer() - start
+
+    @property
+    def ratio(self):
+        if not self.bytes_source or self.bytes_written is None:
+            return None
+        return self.bytes_written / self.bytes_source
+
+    def to_dict(self, error=None):
+        if error is not None:
+            status = "failed"
+        elif self.skipped:
+            status = "skipped"
+        else:
+            status = "ok"
+        return {
+            "repo": self.name,
+            "status": status,
+            "error": error,
+            "total_secs": round(default_timer() - self.start, 6),
+            "phases": {name: round(secs, 6) for name, secs in self.phases.items()},
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_source": self.bytes_source,
+            "bytes_written": self.bytes_written,
+            "ratio": None if self.ratio is None else round(self.ratio, 6),
+        }
+
+
+class Metrics:
+    """Collector for the metrics of all repos in a run.
+
+    Each repo is appended to `jsonl_path` as one JSON object per line as soon
+    as it finishes, followed by a summary line for the run. `textfile_path`
+    is written once at the end of the run in the Prometheus text format, for
+    the node exporter's textfile collector.
+    """
+
+    def __init__(self, jsonl_path=None, textfile_path=None):
+        self.jsonl_path = None if jsonl_path is None else Path(jsonl_path)
+        self.textfile_path = None if textfile_path is None else Path(textfile_path)
+        self.lock = threading.Lock()
+        self.run = RepoMetrics(None)
+        self.records = []
+
+    def repo(self, name):
+        return RepoMetrics(name)
+
+    def add(self, repo_metrics, error=None):
+        record = repo_metrics.to_dict(error)
+        with self.lock:
+            self.records.append(record)
+            self.write_line(record)
+
+    def write_line(self, record):
+        if self.jsonl_path is None:
+            return
+        self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"time": datetime.now(UTC).isoformat(), **record}
+        with open(self.jsonl_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def finish(self):
+        """Write the run summary line and the Prometheus textfile."""
+        summary = {
+            "run": True,
+            "total_secs": round(default_timer() - self.run.start, 6),
+            "phases": {name: round(secs, 6) for name, secs in self.run.phases.items()},
+            "repos": len(self.records),
+            "failed": sum(1 for record in self.records if record["error"]),
+            "skipped": sum(
+                1 for record in self.records if record["status"] == "skipped"
+            ),
+        }
+        with self.lock:
+            self.write_line(summary)
+            if self.textfile_path is not None:
+                self.write_textfile(summary)
+
+    def write_textfile(self, summary):
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP githubtakeout_{name} {help_text}")
+            lines.append(f"# TYPE githubtakeout_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{escape_label(str(label))}"'
+                    for key, label in labels.items()
+                )
+                if label_text:
+                    label_text = f"{{{label_text}}}"
+                lines.append(f"githubtakeout_{name}{label_text} {value}")
+
+        records = self.records
+        metric(
+            "repo_phase_duration_seconds",
+            "Seconds spent in each phase of backing up a repo.",
+            [
+                ({"repo": record["repo"], "phase": phase}, secs)
+                for record in records
+                for phase, secs in record["phases"].items()
+            ],
+        )
+        metric(
+            "repo_duration_seconds",
+            "Seconds spent backing up a repo.",
+            [({"repo": record["repo"]}, record["total_secs"]) for record in records],
+        )
+        metric(
+            "repo_success",
+            "Whether the last backup of a repo succeeded (1) or failed (0).",
+            [
+                ({"repo": record["repo"]}, int(not record["error"]))
+                for record in records
+            ],
+        )
+        for key, help_text in (
+            ("bytes_fetched", "Bytes of git objects fetched for a repo."),
+            ("bytes_source", "Bytes of files archived for a repo."),
+            ("bytes_written", "Bytes written to the archive or bundle of a repo."),
+            ("ratio", "Archive size divided by the size of the archived files."),
+        ):
+            metric(
+                f"repo_{key}",
+                help_text,
+                [
+                    ({"repo": record["repo"]}, record[key])
+                    for record in records
+                    if record[key] is not None
+                ],
+            )
+        metric(
+            "run_phase_duration_seconds",
+            "Seconds spent in each phase of a run that isn't specific to a repo.",
+            [({"phase": phase}, secs) for phase, secs in summary["phases"].items()],
+        )
+        metric(
+            "run_duration_seconds",
+            "Seconds spent on the last run.",
+            [({}, summary["total_secs"])],
+        )
+        metric(
+            "run_repos",
+            "Number of repos in the last run, by status.",
+            [
+                ({"status": "failed"}, summary["failed"]),
+                ({"status": "skipped"}, summary["skipped"]),
+                (
+                    {"status": "ok"},
+                    summary["repos"] - summary["failed"] - summary["skipped"],
+                ),
+            ],
+        )
+        metric(
+            "run_timestamp_seconds",
+            "Unix time the last run finished.",
+            [({}, round(datetime.now(UTC).timestamp()))],
+        )
+        write_text(self.textfile_path, "\n".join(lines) + "\n")
@@ -0,0 +1,110 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Progress bars for cloning and pulling Git repos."""
+
+import threading
+from timeit import default_timer
+
+import git
+from rich import console, progress
+
+# minimum seconds between updates of a single bar, git reports progress
+# thousands of times per transfer
+UPDATE_INTERVAL = 0.1
+
+
+class ProgressDisplay:
+    """One live display that the progress bars of all transfers report into.
+
+    The display is started when the first transfer begins and stopped when
+    the last active one ends, so repos backed up in parallel share a single
+    display. Rendering is done by `rich` at a fixed refresh rate.
+    """
+
+    def __init__(self, refresh_per_second=4):
+        self.refresh_per_second = refresh_per_second
+        self.lock = threading.Lock()
+        self.progressbar = None
+        self.active = 0
+
+    def add_task(self, description, total):
+        with self.lock:
+            if self.progressbar is None:
+                self.progressbar = progress.Progress(
+                    progress.SpinnerColumn(),
+                    progress.TextColumn("[progress.description]{task.description}"),
+                    progress.BarColumn(),
+                    progress.TextColumn(
+                        "[progress.percentage]{task.percentage:>3.0f}%"
+                    ),
+                    "eta",
+                    progress.TimeRemainingColumn(),
+                    progress.TextColumn("{task.fields[message]}"),
+                    console=console.Console(),
+                    transient=False,
+                    refresh_per_second=self.refresh_per_second,
+                )
+                self.progressbar.start()
+            self.active += 1
+            return self.progressbar.add_task(
+                description=description, total=total, message=""
+            )
+
+    def update(self, task_id, completed, message):
+        self.progressbar.update(task_id, completed=completed, message=message)
+
+    def finish_task(self, task_id, message):
+        # a finished bar is printed above the display once and removed from
+        # it, so the display only grows with the transfers still running
+        with self.lock:
+            task = next(task for task in self.progressbar.tasks if task.id == task_id)
+            self.progressbar.console.print(
+                f"{task.description} [bright_black]{message}".rstrip()
+            )
+            self.progressbar.remove_task(task_id)
+            self.active -= 1
+            if not self.active:
+                self.progressbar.stop()
+                self.progressbar = None
+
+
+display = ProgressDisplay()
+
+
+class GitProgress(git.RemoteProgress):
+    """Progress of receiving objects for one repo, shown in the shared display.
+
+    Only the receiving stage is shown, and bars are updated at most every
+    `UPDATE_INTERVAL` seconds. Call `close()` when the transfer is done, so
+    a bar is finished even if git fails before reporting the end of a stage.
+    """
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.task_id = None
+        self.last_update = 0
+
+    def update(self, op_code, cur_count, max_count=None, message=""):
+        if op_code & self.OP_MASK != self.RECEIVING:
+            return
+        if op_code & self.BEGIN:
+            self.close()
+            self.task_id = display.add_task(f"{self.name}: Receiving", max_count)
+        if self.task_id is None:
+            return
+        if op_code & self.END:
+            display.update(self.task_id, cur_count, message)
+            display.finish_task(self.task_id, message)
+            self.task_id = None
+            return
+        now = default_timer()
+        if now - self.last_update >= UPDATE_INTERVAL:
+            self.last_update = now
+            display.update(self.task_id, cur_count, message)
+
+    def close(self):
+        if self.task_id is not None:
+            display.finish_task(self.task_id, "")
+            self.task_id = None
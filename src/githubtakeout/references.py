@@ -0,0 +1,107 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Shared object cache for repos in the same fork network."""
+
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from githubtakeout.lazy import lazy_import
+
+git = lazy_import("git")
+
+REFERENCES_NAME = ".references"
+
+
+class ReferenceCache:
+    """Bare repos holding the Git objects of each network of forks.
+
+    Layout::
+
+        <owner>/<repo>.git   objects of every repo in the network whose root
+                             (the repo all the others were forked from) is
+                             <owner>/<repo>
+
+    Before a repo is cloned or pulled, its branches and tags are fetched into
+    the cache for its network, under `refs/repos/<name>/`. Objects already
+    fetched for another repo in the network aren't downloaded again, and the
+    repo is cloned with the cache as a reference (`git clone --reference`), so
+    it borrows objects from the cache instead of downloading a copy.
+
+    `networks` maps the name of each repo to the full name of the root of its
+    network. Repos without a network get a cache of their own.
+    """
+
+    def __init__(self, path, networks=None):
+        self.path = Path(path)
+        self.networks = networks or {}
+        self.lock = threading.Lock()
+        self.network_locks = defaultdict(threading.Lock)
+
+    def cache_dir(self, name):
+        return self.path / f"{self.networks.get(name) or name}.git"
+
+    def update(self, name, repo_url):
+        """Fetch a repo's objects into the cache for its network.
+
+        Returns the cache dir, to clone the repo with as a reference.
+        """
+        cache_dir = self.cache_dir(name)
+        with self.lock:
+            network_lock = self.network_locks[cache_dir]
+        # repos in the same network may be backed up in parallel
+        with network_lock:
+            if Path(cache_dir, "HEAD").exists():
+                repo = git.Repo(cache_dir)
+            else:
+                repo = git.Repo.init(cache_dir, bare=True, mkdir=True)
+            with repo:
+                # kept repos borrow objects from the cache, and may still
+                # reference branches that were deleted or force-pushed, so
+                # objects are never deleted from it: refs aren't pruned, and
+                # gc never runs or drops unreachable objects
+                with repo.config_writer() as config:
+                    config.set_value("gc", "auto", 0)
+                    config.set_value("gc", "pruneExpire", "never")
+                # fetch from the URL instead of adding a remote, so credentials
+                # in the URL aren't saved in the cache's config
+                repo.git.fetch(
+                    repo_url,
+                    f"+refs/heads/*:refs/repos/{name}/heads/*",
+                    f"+refs/tags/*:refs/repos/{name}/tags/*",
+                    no_tags=True,
+                )
+        return cache_dir
+
+    def fetch_into(self, name, local_repo_dir):
+        """Fetch a repo's branches from the cache into a clone of it.
+
+        The branches become the clone's remote-tracking branches, so a repo
+        that doesn't borrow from the cache (it was dissociated) gets the
+        objects just fetched into the cache locally, and pulling it has
+        nothing left to download.
+        """
+        cache_dir = self.cache_dir(name)
+        with self.lock:
+            network_lock = self.network_locks[cache_dir]
+        with network_lock, git.Repo(local_repo_dir) as repo:
+            repo.git.fetch(
+                str(cache_dir),
+                f"+refs/repos/{name}/heads/*:refs/remotes/origin/*",
+                no_tags=True,
+            )
+
+
+def dissociate(local_repo_dir):
+    """Copy objects borrowed from a reference into a repo, and stop borrowing.
+
+    Afterwards the repo is self-contained, so it can be archived or moved
+    without the reference cache.
+    """
+    alternates = Path(local_repo_dir, ".git", "objects", "info", "alternates")
+    if not alternates.exists():
+        return
+    with git.Repo(local_repo_dir) as repo:
+        repo.git.repack("-a", "-d")
+    alternates.unlink()
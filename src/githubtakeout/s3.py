@@ -0,0 +1,336 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Streaming uploads of archives to S3-compatible object storage."""
+
+import hashlib
+import hmac
+import io
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+# S3 requires parts of at least 5 MiB (except the last one)
+PART_SIZE = 8 * 1024**2
+# parts waiting to be uploaded while the next one is filled, so memory use is
+# bounded to about (QUEUE_SIZE + 2) * PART_SIZE per upload
+QUEUE_SIZE = 2
+MAX_RETRIES = 3
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+logger = logging.getLogger(__name__)
+
+
+class S3Error(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def hmac_sha256(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def quote(text, safe=""):
+    return urllib.parse.quote(text, safe=f"-_.~{safe}")
+
+
+class S3Client:
+    """Minimal S3 API client, signing requests with AWS Signature Version 4.
+
+    Buckets are addressed by path (`<endpoint>/<bucket>/<key>`), which works
+    with AWS and with S3-compatible servers (MinIO, Ceph, etc.).
+    """
+
+    def __init__(self, endpoint, access_key, secret_key, region="us-east-1"):
+        self.endpoint = endpoint.rstrip("/")
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+
+    def sign(self, method, path, query, headers, payload_hash):
+        amz_date = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        headers = {
+            **headers,
+            "host": urllib.parse.urlsplit(self.endpoint).netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        names = sorted(name.lower() for name in headers)
+        values = {name.lower(): str(value).strip() for name, value in headers.items()}
+        signed_headers = ";".join(names)
+        canonical_request = "\n".join(
+            [
+                method,
+                quote(path, safe="/"),
+                "&".join(
+                    f"{quote(key)}={quote(value)}"
+                    for key, value in sorted(query.items())
+                ),
+                "".join(f"{name}:{values[name]}\n" for name in names),
+                signed_headers,
+                payload_hash,
+            ]
+        )
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac_sha256(key, part)
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    def request(self, method, bucket, key, query=None, body=b"", headers=None):
+        """Send a signed request, and return (status, headers, body).
+
+        Server errors and connection failures are retried with exponential
+        backoff. A 404 is returned, any other error raises `S3Error`.
+        """
+        query = query or {}
+        path = f"/{bucket}/{key}"
+        url = f"{self.endpoint}{quote(path, safe='/')}"
+        if query:
+            url += "?" + urllib.parse.urlencode(query, quote_via=urllib.parse.quote)
+        payload_hash = hashlib.sha256(body).hexdigest() if body else EMPTY_SHA256
+        backoff = 1
+        for attempt in range(MAX_RETRIES + 1):
+            signed = self.sign(method, path, query, headers or {}, payload_hash)
+            request = urllib.request.Request(
+                url,
+                data=body if method in ("PUT", "POST") else None,
+                headers=signed,
+                method=method,
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=300) as response:
+                    return response.status, response.headers, response.read()
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    return e.code, e.headers, e.read()
+                if e.code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    raise S3Error(f"S3 error: {e.code} {e.reason}", e.code) from e
+            except urllib.error.URLError as e:
+                if attempt == MAX_RETRIES:
+                    raise S3Error(f"S3 connection failed: {e.reason}") from e
+            logger.info(f"S3 request failed, retrying in {backoff} secs")
+            time.sleep(backoff)
+            backoff *= 2
+
+
+class MultipartWriter(io.BufferedIOBase):
+    """Binary file that uploads what is written to it as an S3 object.
+
+    Data is buffered into parts of `part_size` bytes, which a background
+    thread uploads (as a multipart upload) while the next part is filled.
+    Writes block while `queue_size` parts are waiting, so memory use stays
+    bounded however large the object is. An object smaller than one part is
+    uploaded with a single request instead.
+
+    The object only appears once `close()` completes the upload. `abort()`
+    discards everything uploaded so far. The writer isn't seekable, but
+    `tell()` works, which is all `zipfile` and `tarfile` need to stream.
+    """
+
+    def __init__(self, client, bucket, key, part_size=PART_SIZE, queue_size=QUEUE_SIZE):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.position = 0
+        self.upload_id = None
+        self.etags = []
+        self.error = None
+        self.parts = queue.Queue(maxsize=queue_size)
+        self.uploader = None
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed file")
+        self.check_error()
+        data = memoryview(data).cast("B")
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[: self.part_size])
+            del self.buffer[: self.part_size]
+            self.put_part(part)
+        return len(data)
+
+    def put_part(self, part):
+        if self.uploader is None:
+            _, _, body = self.client.request(
+                "POST", self.bucket, self.key, {"uploads": ""}
+            )
+            self.upload_id = find_text(body, "UploadId")
+            self.uploader = threading.Thread(target=self.upload_parts, daemon=True)
+            self.uploader.start()
+        self.parts.put(part)
+
+    def upload_parts(self):
+        number = 0
+        while (part := self.parts.get()) is not None:
+            if self.error is not None:
+                # keep draining, so the writer never blocks on a full queue
+                continue
+            number += 1
+            try:
+                _, headers, _ = self.client.request(
+                    "PUT",
+                    self.bucket,
+                    self.key,
+                    {"partNumber": str(number), "uploadId": self.upload_id},
+                    part,
+                )
+                self.etags.append(headers["ETag"])
+            except Exception as e:
+                self.error = e
+
+    def check_error(self):
+        if self.error is not None:
+            raise S3Error(f"failed uploading {self.key}: {self.error}") from self.error
+
+    def finish_parts(self):
+        if self.uploader is not None:
+            self.parts.put(None)
+            self.uploader.join()
+            self.uploader = None
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.client.request(
+                    "PUT", self.bucket, self.key, body=bytes(self.buffer)
+                )
+            else:
+                if self.buffer:
+                    self.put_part(bytes(self.buffer))
+                self.finish_parts()
+                self.check_error()
+                parts = "".join(
+                    f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                    for number, etag in enumerate(self.etags, start=1)
+                )
+                self.client.request(
+                    "POST",
+                    self.bucket,
+                    self.key,
+                    {"uploadId": self.upload_id},
+                    f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode(),
+                )
+            self.buffer = bytearray()
+        finally:
+            super().close()
+
+    def abort(self):
+        self.finish_parts()
+        if self.upload_id is not None:
+            self.client.request(
+                "DELETE", self.bucket, self.key, {"uploadId": self.upload_id}
+            )
+        self.buffer = bytearray()
+        super().close()
+
+
+def find_text(body, tag):
+    # S3 responses are namespaced XML
+    for element in ET.fromstring(body).iter():
+        if element.tag.rpartition("}")[2] == tag:
+            return element.text
+    raise S3Error(f"S3 response without {tag}")
+
+
+class S3Sink:
+    """Archives uploaded to `s3://<bucket>/<prefix>` as they are written.
+
+    Archives go to the sink instead of being saved on local disk.
+
+    The endpoint is read from `AWS_ENDPOINT_URL` (AWS S3 if it isn't set),
+    the credentials from `AWS_ACCESS_KEY_ID` and `AWS_SECRET_ACCESS_KEY`, and
+    the region from `AWS_REGION` (default: us-east-1).
+    """
+
+    def __init__(self, client, bucket, prefix="", part_size=PART_SIZE):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+
+    @classmethod
+    def from_url(cls, url):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != "s3" or not parts.netloc:
+            raise ValueError(f"invalid upload URL (expected s3://BUCKET/PREFIX): {url}")
+        access_key = os.getenv("AWS_ACCESS_KEY_ID")
+        secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+        if not access_key or not secret_key:
+            raise ValueError("AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY must be set")
+        region = (
+            os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
+        )
+        endpoint = os.getenv("AWS_ENDPOINT_URL") or f"https://s3.{region}.amazonaws.com"
+        prefix = parts.path.strip("/")
+        return cls(
+            S3Client(endpoint, access_key, secret_key, region),
+            parts.netloc,
+            f"{prefix}/" if prefix else "",
+        )
+
+    def url(self, name):
+        return f"s3://{self.bucket}/{self.prefix}{name}"
+
+    @contextmanager
+    def open(self, name):
+        """Upload an object, completed when the block exits without error."""
+        writer = MultipartWriter(
+            self.client, self.bucket, f"{self.prefix}{name}", self.part_size
+        )
+        try:
+            yield writer
+            writer.close()
+        except BaseException:
+            try:
+                writer.abort()
+            except S3Error as e:
+                logger.error(f"failed aborting upload of {name}: {e}")
+            raise
+
+    def size(self, name):
+        # size of an uploaded object, or None if there is no such object
+        status, headers, _ = self.client.request(
+            "HEAD", self.bucket, f"{self.prefix}{name}"
+        )
+        return None if status == 404 else int(headers["Content-Length"])
+
+    def exists(self, name):
+        return self.size(name) is not None
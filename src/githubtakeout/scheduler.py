@@ -0,0 +1,162 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Size-aware ordering of repos, and admission control for disk space."""
+
+import bisect
+import re
+import shutil
+import threading
+from pathlib import Path
+
+SIZE_PATTERN = re.compile(r"(\d+)([kmgt]?)i?b?", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(text):
+    """Parse a size like `500M` or `20GiB` into bytes (units are binary)."""
+    match = SIZE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    number, unit = match.groups()
+    return int(number) * SIZE_UNITS[unit.lower()]
+
+
+def estimate_footprint(
+    size, archive_format="zip", include_history=False, sink=None, **_
+):
+    """Estimate the most disk space a repo takes while it is backed up.
+
+    `size` is the size GitHub reports for the repo in KiB, which is about the
+    size of its packed objects. The fetched objects and the checked out files
+    (usually no smaller than the objects) are on disk at the same time as the
+    archive being written. A shallow clone fetches fewer objects, but the
+    estimate is kept the same, to err on the side of caution. Archives
+    uploaded to a sink take no local disk space.
+    """
+    if not size:
+        return 0
+    objects = size * 1024
+    footprint = objects * 2
+    if archive_format != "none" and sink is None:
+        footprint += objects
+        if include_history:
+            # the .git directory is archived too
+            footprint += objects
+    return footprint
+
+
+def disk_free(path):
+    # free space on the disk `path` is (or will be) on
+    path = Path(path)
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+
+class Scheduler:
+    """Hands out repos to workers, largest first, within a disk budget.
+
+    `items` is a list of (item, path, footprint, exclusive) tuples, where
+    `footprint` is the estimated bytes a repo needs while it is backed up
+    (see `estimate_footprint`), and `path` is where it is backed up to.
+    Exclusive repos (e.g. oversized repos deferred to the end of the run) are
+    handed out last, once nothing else is running.
+
+    A repo is admitted when the footprints of all repos in progress, plus its
+    own, fit in `budget` bytes and in the free space of its disk. Smaller
+    repos are admitted while a larger one waits for space. A repo is always
+    admitted when nothing else is running (so one larger than the budget can
+    still be backed up on its own), unless it doesn't fit in the free space
+    even then, in which case it is handed out as not admitted, to be failed
+    instead of filling the disk. Before that, `settle` is called (if given)
+    to wait for space that is about to be freed, e.g. by dirs being deleted
+    in the background (see `Janitor.wait`), and the free space is checked
+    again.
+
+    Repos can also be added while others are backed up (e.g. as the pages of
+    a listing arrive): create the scheduler with `closed=False`, `add()` each
+    repo, and `close()` it once all were added. Exclusive repos wait until
+    then, since a larger repo may still be on its way.
+    """
+
+    def __init__(
+        self, items=(), budget=None, free_space=None, closed=True, settle=None
+    ):
+        # kept sorted, so the search for the next repo that fits is in order
+        self.pending = sorted(items, key=self.order)
+        self.budget = budget
+        self.free_space = free_space or disk_free
+        self.settle = settle
+        self.reserved = 0
+        self.running = 0
+        self.closed = closed
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def order(item):
+        _, _, footprint, exclusive = item
+        return exclusive, -footprint
+
+    def add(self, item):
+        with self.condition:
+            if not self.cancelled:
+                bisect.insort(self.pending, item, key=self.order)
+                self.condition.notify_all()
+
+    def close(self):
+        # no more repos will be added
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def fits(self, path, footprint, exclusive):
+        if exclusive:
+            return self.closed and self.running == 0
+        if self.running == 0:
+            return True
+        if self.budget is not None and self.reserved + footprint > self.budget:
+            return False
+        return self.reserved + footprint <= self.free_space(path)
+
+    def has_space(self, path, footprint):
+        # nothing else is running, only space still being freed can help
+        if footprint <= self.free_space(path):
+            return True
+        if self.settle is None:
+            return False
+        self.settle()
+        return footprint <= self.free_space(path)
+
+    def next(self):
+        """Wait for a repo that fits, and return (item, footprint, admitted).
+
+        Returns None once all repos have been handed out.
+        """
+        with self.condition:
+            while self.pending or not self.closed:
+                for i, (item, path, footprint, exclusive) in enumerate(self.pending):
+                    if self.fits(path, footprint, exclusive):
+                        del self.pending[i]
+                        if self.running == 0 and not self.has_space(path, footprint):
+                            return item, footprint, False
+                        self.reserved += footprint
+                        self.running += 1
+                        return item, footprint, True
+                self.condition.wait()
+            return None
+
+    def done(self, footprint):
+        with self.condition:
+            self.reserved -= footprint
+            self.running -= 1
+            self.condition.notify_all()
+
+    def cancel(self):
+        # hand out nothing else (e.g. after Ctrl-C)
+        with self.condition:
+            self.pending = []
+            self.closed = True
+            self.cancelled = True
+            self.condition.notify_all()
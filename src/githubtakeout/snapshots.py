@@ -0,0 +1,190 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Dated snapshots of the backups dir, which share unchanged files."""
+
+import logging
+import os
+import shutil
+from datetime import UTC, datetime
+from pathlib import Path
+
+from githubtakeout.janitor import remove_tree
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+SNAPSHOTS_NAME = ".snapshots"
+SNAPSHOT_FORMAT = "%Y%m%dT%H%M%S"
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+# ioctl that makes a file share the disk blocks of another (a reflink), on
+# filesystems with copy-on-write (Btrfs, XFS, etc.)
+FICLONE = 0x40049409
+
+logger = logging.getLogger(__name__)
+
+
+def copy_file(src, dest):
+    # copy a file as a reflink where the filesystem supports it (instant, and
+    # no disk space until either file changes), and its times, so it can be
+    # compared with the next snapshot
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        try:
+            if fcntl is None:
+                raise OSError("reflinks aren't supported")
+            fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            shutil.copyfileobj(src_file, dest_file)
+    shutil.copystat(src, dest)
+
+
+def link_file(src, dest):
+    # hard link, or copy on filesystems without them
+    try:
+        os.link(src, dest)
+    except OSError:
+        copy_file(src, dest)
+
+
+def same_file(stat, other):
+    return stat.st_size == other.st_size and stat.st_mtime_ns == other.st_mtime_ns
+
+
+class Snapshots:
+    """Dated snapshots of the archives and dirs in `source_dir`.
+
+    Layout::
+
+        <source_dir>/.snapshots/<timestamp>/   a copy of <source_dir>, without
+                                               hidden entries (or `exclude`)
+
+    A snapshot costs about as much as what changed since the previous one.
+    Archives and bundles are hard links to the files in `source_dir` (they
+    are always replaced with a new file, never changed in place). Files in
+    dirs (repos kept with `--keep`, and mirrors) may be changed in place, so
+    they are hard links to the same file in the previous snapshot when it is
+    unchanged (same size and modification time), and copied otherwise.
+
+    Snapshots are pruned by age: the newest of each of the last `keep_daily`
+    days and `keep_weekly` weeks that have snapshots are kept, and the newest
+    snapshot always is.
+    """
+
+    def __init__(
+        self, source_dir, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY, exclude=()
+    ):
+        self.source_dir = Path(source_dir)
+        self.path = self.source_dir / SNAPSHOTS_NAME
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.exclude = set(exclude)
+
+    def snapshots(self):
+        # timestamps of complete snapshots, oldest first
+        if not self.path.is_dir():
+            return []
+        names = []
+        for path in self.path.iterdir():
+            try:
+                datetime.strptime(path.name, SNAPSHOT_FORMAT)
+            except ValueError:
+                continue
+            names.append(path.name)
+        return sorted(names)
+
+    def take(self, timestamp=None, discard=remove_tree):
+        """Take a snapshot, then prune old ones, and return its path.
+
+        `discard` deletes dirs, e.g. `Janitor.discard` to delete them in the
+        background.
+        """
+        if timestamp is None:
+            timestamp = datetime.now(UTC)
+        name = timestamp.strftime(SNAPSHOT_FORMAT)
+        previous = self.snapshots()
+        previous_dir = self.path / previous[-1] if previous else None
+        # built under a temp name and renamed when complete, so an interrupted
+        # snapshot is never mistaken for a complete one
+        if self.path.is_dir():
+            for leftover in self.path.glob("*.tmp"):
+                discard(leftover)
+        tmp_dir = self.path / f"{name}.tmp"
+        tmp_dir.mkdir(parents=True)
+        linked = copied = 0
+        for entry in sorted(self.source_dir.iterdir()):
+            if entry.name.startswith(".") or entry.name in self.exclude:
+                continue
+            if entry.is_symlink():
+                os.symlink(os.readlink(entry), tmp_dir / entry.name)
+            elif entry.is_file():
+                link_file(entry, tmp_dir / entry.name)
+                linked += 1
+            elif entry.is_dir():
+                num_linked, num_copied = self.snapshot_dir(
+                    entry, tmp_dir / entry.name, previous_dir
+                )
+                linked += num_linked
+                copied += num_copied
+        snapshot_dir = self.path / name
+        if snapshot_dir.exists():
+            # a second run in the same second replaces the first's snapshot
+            discard(snapshot_dir)
+        os.replace(tmp_dir, snapshot_dir)
+        logger.info(
+            f"snapshot: {snapshot_dir} ({linked} files linked, {copied} copied)"
+        )
+        self.prune(discard)
+        return snapshot_dir
+
+    def snapshot_dir(self, src_dir, dest_dir, previous_dir):
+        # returns the number of files linked and copied
+        linked = copied = 0
+        for dirpath, dirnames, filenames in os.walk(src_dir):
+            relative = Path(dirpath).relative_to(src_dir)
+            (dest_dir / relative).mkdir()
+            # symlinks to dirs are listed as dirs, but aren't walked
+            links = [name for name in dirnames if Path(dirpath, name).is_symlink()]
+            for name in sorted(filenames + links):
+                src = Path(dirpath, name)
+                dest = dest_dir / relative / name
+                if src.is_symlink():
+                    os.symlink(os.readlink(src), dest)
+                    continue
+                if previous_dir is not None:
+                    previous = previous_dir / src_dir.name / relative / name
+                    try:
+                        unchanged = same_file(src.stat(), previous.lstat())
+                    except FileNotFoundError:
+                        unchanged = False
+                    if unchanged:
+                        link_file(previous, dest)
+                        linked += 1
+                        continue
+                copy_file(src, dest)
+                copied += 1
+        return linked, copied
+
+    def prune(self, discard=remove_tree):
+        names = self.snapshots()
+        keep = set(names[-1:])
+        for keep_count, period in (
+            (self.keep_daily, lambda timestamp: timestamp.date()),
+            (self.keep_weekly, lambda timestamp: timestamp.isocalendar()[:2]),
+        ):
+            periods = set()
+            for name in reversed(names):
+                timestamp = datetime.strptime(name, SNAPSHOT_FORMAT)
+                if period(timestamp) in periods:
+                    continue
+                if len(periods) == keep_count:
+                    break
+                periods.add(period(timestamp))
+                keep.add(name)
+        for name in names:
+            if name not in keep:
+                logger.info(f"pruning snapshot: {name}")
+                discard(self.path / name)
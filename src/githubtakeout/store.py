@@ -0,0 +1,146 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Content-addressed store that deduplicates files across repos and runs."""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from datetime import UTC, datetime
+from pathlib import Path
+
+STORE_NAME = "store"
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Store:
+    """Store of file contents keyed by SHA-256, plus a snapshot index per repo.
+
+    Layout::
+
+        objects/<first 2 hex chars>/<sha256>   zlib compressed file contents
+        snapshots/<repo>/<timestamp>.json      files, symlinks and dirs of a repo
+
+    A file is only written to `objects` the first time its content is seen, so
+    content shared between repos, forks, gists, and runs is stored once.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.objects_dir = self.path / "objects"
+        self.snapshots_dir = self.path / "snapshots"
+
+    def object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def add_file(self, path):
+        # returns the digest, and whether a new object was written
+        digest = hash_file(path)
+        object_path = self.object_path(digest)
+        if object_path.exists():
+            return digest, False
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temp file and rename it into place, so concurrent writers
+        # and interrupted runs never leave a partial object behind
+        compressor = zlib.compressobj()
+        with (
+            open(path, "rb") as src,
+            tempfile.NamedTemporaryFile(
+                dir=object_path.parent, suffix=".tmp", delete=False
+            ) as dst,
+        ):
+            while chunk := src.read(CHUNK_SIZE):
+                dst.write(compressor.compress(chunk))
+            dst.write(compressor.flush())
+        os.replace(dst.name, object_path)
+        return digest, True
+
+    def snapshot(self, repo_dir, name):
+        """Add all files in `repo_dir` to the store and write a snapshot index.
+
+        Returns the snapshot path, and the number and size of new objects.
+        """
+        repo_dir = Path(repo_dir)
+        entries = []
+        num_new = size_new = 0
+        for entry in sorted(repo_dir.rglob("*")):
+            path = entry.relative_to(repo_dir).as_posix()
+            if entry.is_symlink():
+                entries.append(
+                    {"path": path, "type": "symlink", "target": os.readlink(entry)}
+                )
+            elif entry.is_dir():
+                entries.append({"path": path, "type": "dir"})
+            else:
+                digest, is_new = self.add_file(entry)
+                size = entry.stat().st_size
+                if is_new:
+                    num_new += 1
+                    size_new += size
+                entries.append(
+                    {
+                        "path": path,
+                        "type": "file",
+                        "mode": entry.stat().st_mode & 0o777,
+                        "size": size,
+                        "sha256": digest,
+                    }
+                )
+        snapshot_dir = self.snapshots_dir / name
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        snapshot_path = snapshot_dir / f"{timestamp}.json"
+        counter = 1
+        while snapshot_path.exists():
+            snapshot_path = snapshot_dir / f"{timestamp}-{counter}.json"
+            counter += 1
+        snapshot = {"repo": name, "created": timestamp, "entries": entries}
+        snapshot_path.write_text(json.dumps(snapshot, indent=1))
+        return snapshot_path, num_new, size_new
+
+    def snapshots(self, name):
+        # oldest first
+        snapshot_dir = self.snapshots_dir / name
+        if not snapshot_dir.exists():
+            return []
+        return sorted(snapshot_dir.glob("*.json"), key=lambda path: path.stem)
+
+    def restore(self, name, target_dir, snapshot=None):
+        """Rebuild a repo snapshot (the latest by default) in `target_dir`."""
+        snapshots = self.snapshots(name)
+        if snapshot is not None:
+            snapshots = [path for path in snapshots if path.stem == snapshot]
+        if not snapshots:
+            raise FileNotFoundError(f"no snapshot found for '{name}'")
+        snapshot_path = snapshots[-1]
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True)
+        for entry in json.loads(snapshot_path.read_text())["entries"]:
+            path = target_dir / entry["path"]
+            if entry["type"] == "dir":
+                path.mkdir(parents=True, exist_ok=True)
+            elif entry["type"] == "symlink":
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.symlink_to(entry["target"])
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                decompressor = zlib.decompressobj()
+                with (
+                    open(self.object_path(entry["sha256"]), "rb") as src,
+                    open(path, "wb") as dst,
+                ):
+                    while chunk := src.read(CHUNK_SIZE):
+                        dst.write(decompressor.decompress(chunk))
+                    dst.write(decompressor.flush())
+                path.chmod(entry["mode"])
+        return snapshot_path
@@ -0,0 +1,141 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Throughput of previous runs, to estimate how long a run will take."""
+
+import heapq
+import json
+import threading
+import time
+from pathlib import Path
+
+from githubtakeout.files import write_text
+
+THROUGHPUT_NAME = ".throughput.json"
+# only recent runs are used, so estimates follow changes in network speed or
+# hardware
+THROUGHPUT_RUNS = 10
+# what is timed for each repo, by the phases of `RepoMetrics` it is made of
+# (a bare clone is the "fetch" phase of --no_checkout, a bundle is the archive
+# of --mirror)
+STAGES = {
+    "transfer": ("clone", "fetch"),
+    "archive": ("archive", "bundle"),
+    "total": None,
+}
+
+
+def empty_sums():
+    return {"n": 0, "bytes": 0, "secs": 0.0, "bytes_sq": 0, "bytes_secs": 0.0}
+
+
+def add_sample(sums, size, secs):
+    sums["n"] += 1
+    sums["bytes"] += size
+    sums["secs"] += secs
+    sums["bytes_sq"] += size * size
+    sums["bytes_secs"] += size * secs
+
+
+def fit(sums):
+    """Fit `secs = overhead + size * secs_per_byte` to summed samples.
+
+    Return (overhead, secs_per_byte), or None without samples. Most repos are
+    small, so the time per repo (connecting, spawning git, etc.) matters as
+    much as the rate. When the samples can't separate the two (e.g. repos of
+    a single size), the time is taken to be proportional to the size.
+    """
+    if not sums.get("n") or not sums["bytes"]:
+        return None
+    n, x, y = sums["n"], sums["bytes"], sums["secs"]
+    denominator = n * sums["bytes_sq"] - x * x
+    if denominator > 0:
+        slope = (n * sums["bytes_secs"] - x * y) / denominator
+        intercept = (y - slope * x) / n
+        if slope > 0 and intercept >= 0:
+            return intercept, slope
+    return 0.0, y / x
+
+
+def makespan(durations, jobs):
+    # wall time of running jobs on `jobs` workers, each taking the next job
+    # when it is free (jobs are taken in the order given)
+    workers = [0.0] * min(jobs, len(durations))
+    if not workers:
+        return 0.0
+    for duration in durations:
+        heapq.heapreplace(workers, workers[0] + duration)
+    return max(workers)
+
+
+class Throughput:
+    """Timings and sizes of repos backed up by recent runs.
+
+    Layout::
+
+        {"runs": [{"time": ..., "modes": {<mode>: {<stage>: <sums>}}}, ...]}
+
+    A mode is the archive format, and how repos are fetched (e.g.
+    "zip+history" or "bundle"), since both change how fast a repo is backed
+    up. Samples are keyed by the size GitHub reports for each repo, so they
+    can be used to estimate a run before anything is fetched. Only sums are
+    kept, enough to fit a line to the samples.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = Path(path)
+        self.clock = clock
+        self.lock = threading.Lock()
+        try:
+            self.runs = json.loads(self.path.read_text())["runs"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.runs = []
+        self.current = {}
+
+    def add(self, mode, size, metrics):
+        """Record a repo of `size` bytes (on GitHub) backed up in `mode`."""
+        if not size or metrics.skipped:
+            return
+        with self.lock:
+            stages = self.current.setdefault(mode, {})
+            for stage, phases in STAGES.items():
+                if phases is None:
+                    secs = sum(metrics.phases.values())
+                else:
+                    timed = [metrics.phases[p] for p in phases if p in metrics.phases]
+                    if not timed:
+                        # e.g. pulled instead of cloned, or resumed
+                        continue
+                    secs = sum(timed)
+                add_sample(stages.setdefault(stage, empty_sums()), size, secs)
+            if metrics.bytes_written is not None:
+                output = stages.setdefault("output", {"bytes": 0, "written": 0})
+                output["bytes"] += size
+                output["written"] += metrics.bytes_written
+
+    def save(self):
+        # the current run is added to the history, if anything was backed up
+        if not self.current:
+            return
+        runs = [*self.runs, {"time": self.clock(), "modes": self.current}]
+        self.runs = runs[-THROUGHPUT_RUNS:]
+        self.current = {}
+        write_text(self.path, json.dumps({"runs": self.runs}, indent=2))
+
+    def sums(self, mode, stage):
+        # samples of all recent runs added together
+        total = {}
+        for run in self.runs:
+            for key, value in run["modes"].get(mode, {}).get(stage, {}).items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def model(self, mode, stage):
+        return fit(self.sums(mode, stage))
+
+    def ratio(self, mode):
+        # output size divided by the size on GitHub
+        sums = self.sums(mode, "output")
+        if not sums.get("bytes"):
+            return None
+        return sums["written"] / sums["bytes"]
@@ -0,0 +1,58 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Shared fixtures for tests that run against local Git repos."""
+
+import git
+import pytest
+
+
+@pytest.fixture
+def git_identity(monkeypatch):
+    for var in ("GIT_AUTHOR", "GIT_COMMITTER"):
+        monkeypatch.setenv(f"{var}_NAME", "githubtakeout")
+        monkeypatch.setenv(f"{var}_EMAIL", "githubtakeout@example.com")
+
+
+@pytest.fixture
+def make_remote(tmp_path, git_identity):
+    """Create a bare repo to clone from and return its `file://` URL."""
+
+    def _make_remote(name="repo", files=None):
+        if files is None:
+            files = {"README.md": "# test repo\n", "src/main.py": "print('hi')\n"}
+        work_dir = tmp_path / "work" / name
+        work_repo = git.Repo.init(work_dir, initial_branch="main")
+        for path, content in files.items():
+            file_path = work_dir / path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, bytes):
+                file_path.write_bytes(content)
+            else:
+                file_path.write_text(content)
+        work_repo.git.add(all=True)
+        work_repo.index.commit("initial commit")
+        bare_dir = tmp_path / "remotes" / f"{name}.git"
+        work_repo.clone(bare_dir, bare=True).close()
+        work_repo.create_remote("origin", bare_dir.as_uri())
+        work_repo.close()
+        return bare_dir.as_uri()
+
+    return _make_remote
+
+
+@pytest.fixture
+def push_commit(tmp_path, git_identity):
+    """Commit a new file to a remote created with `make_remote`."""
+
+    def _push_commit(name="repo", path="CHANGES.md", content="changed\n"):
+        work_dir = tmp_path / "work" / name
+        with git.Repo(work_dir) as work_repo:
+            file_path = work_dir / path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+            work_repo.git.add(all=True)
+            work_repo.index.commit(f"update {path}")
+            work_repo.remotes.origin.push("main")
+
+    return _push_commit
@@ -0,0 +1,358 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for the GraphQL client, against a local stand-in for the GitHub API."""
+
+import json
+import socket
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import githubtakeout
+from githubtakeout.api import ApiError, GraphQLClient
+
+RESET_AT = "2030-01-01T00:00:00Z"
+
+
+def repo_node(name, parent=None):
+    return {
+        "name": name,
+        "nameWithOwner": f"user/{name}",
+        "url": f"https://github.com/user/{name}",
+        "description": f"{name} description",
+        "isFork": parent is not None,
+        "diskUsage": 42,
+        "pushedAt": "2026-01-02T03:04:05Z",
+        "parent": parent,
+    }
+
+
+def page(nodes, end_cursor=None):
+    return {
+        "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor},
+        "nodes": nodes,
+    }
+
+
+def data(remaining=4999, **viewer):
+    rate_limit = {"cost": 1, "remaining": remaining, "resetAt": RESET_AT}
+    return {"data": {"rateLimit": rate_limit, "viewer": {"login": "user"} | viewer}}
+
+
+@pytest.fixture
+def api_server():
+    """Serve queued responses to GraphQL requests, and record the requests."""
+    responses = []
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            requests.append(
+                {
+                    "authorization": self.headers["Authorization"],
+                    **json.loads(self.rfile.read(length)),
+                }
+            )
+            status, headers, body = responses.pop(0)
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.responses = responses
+    server.requests = requests
+    server.url = f"http://127.0.0.1:{server.server_port}/graphql"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_repos_and_gists_batched(api_server):
+    upstream = {"nameWithOwner": "org/upstream", "parent": None}
+    fork = repo_node("fork", {"nameWithOwner": "x/fork", "parent": upstream})
+    api_server.responses.extend(
+        [
+            (
+                200,
+                {},
+                data(
+                    repositories=page([repo_node("one")], "r1"),
+                    gists=page([{"name": "abc123"}]),
+                ),
+            ),
+            (200, {}, data(repositories=page([fork]))),
+        ]
+    )
+    client = GraphQLClient("secret", api_server.url)
+    listing = list(client.iter_repos_and_gists(include_gists=True))
+    # each page is yielded as it arrives
+    assert [(kind, node["name"]) for kind, node in listing] == [
+        ("repo", "one"),
+        ("gist", "abc123"),
+        ("repo", "fork"),
+    ]
+    assert [node["network"] for kind, node in listing if kind == "repo"] == [
+        "user/one",
+        "org/upstream",
+    ]
+    first, second = (request["variables"] for request in api_server.requests)
+    assert first["withRepos"]
+    assert first["withGists"]
+    assert second["repoCursor"] == "r1"
+    assert not second["withGists"]
+    assert api_server.requests[0]["authorization"] == "bearer secret"
+    assert client.remaining == 4999
+
+
+def test_backoff_on_secondary_rate_limit(api_server):
+    api_server.responses.extend(
+        [
+            (403, {"Retry-After": "7"}, {"message": "secondary rate limit"}),
+            (502, {}, {"message": "bad gateway"}),
+            (200, {}, data(repositories=page([]))),
+        ]
+    )
+    sleeps = []
+    client = GraphQLClient("secret", api_server.url, sleep=sleeps.append)
+    assert not list(client.iter_repos_and_gists(include_gists=False))
+    assert sleeps == [7, 2]
+
+
+def test_wait_for_quota_reset(api_server):
+    reset = int(time.time()) + 30
+    api_server.responses.extend(
+        [
+            (
+                403,
+                {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)},
+                {"message": "rate limit exceeded"},
+            ),
+            (200, {}, data(remaining=0, repositories=page([repo_node("one")], "r1"))),
+            (200, {}, data(repositories=page([]))),
+        ]
+    )
+    sleeps = []
+    client = GraphQLClient("secret", api_server.url, sleep=sleeps.append)
+    assert len(list(client.iter_repos_and_gists(include_gists=False))) == 1
+    # waited for the reset after the 403, and before the query that would have
+    # exceeded the remaining quota
+    assert len(sleeps) == 2
+    assert 0 < sleeps[0] <= 31
+    assert sleeps[1] > 60
+
+
+def test_retries_are_limited(api_server):
+    api_server.responses.extend([(503, {}, {})] * 3)
+    client = GraphQLClient("secret", api_server.url, max_retries=2, sleep=lambda _: 0)
+    with pytest.raises(ApiError) as e:
+        list(client.iter_repos_and_gists(include_gists=False))
+    assert e.value.status == 503
+
+
+def test_forbidden_is_not_retried(api_server):
+    # a 403 that isn't a rate limit (e.g. a token without access) fails at once
+    api_server.responses.append((403, {}, {"message": "Resource not accessible"}))
+    sleeps = []
+    client = GraphQLClient("secret", api_server.url, sleep=sleeps.append)
+    with pytest.raises(ApiError) as e:
+        list(client.iter_repos_and_gists(include_gists=False))
+    assert e.value.status == 403
+    assert sleeps == []
+
+
+def test_connection_errors_are_retried():
+    # nothing listens on the port once the socket is closed
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    url = f"http://127.0.0.1:{port}/graphql"
+    sleeps = []
+    client = GraphQLClient("secret", url, max_retries=2, sleep=sleeps.append)
+    with pytest.raises(ApiError, match="GitHub API request failed"):
+        list(client.iter_repos_and_gists(include_gists=False))
+    assert sleeps == [1, 2]
+
+
+def test_invalid_token(api_server):
+    api_server.responses.append((401, {}, {"message": "Bad credentials"}))
+    client = GraphQLClient("bad", api_server.url)
+    with pytest.raises(ApiError) as e:
+        list(client.iter_repos_and_gists(include_gists=False))
+    assert e.value.status == 401
+
+
+def test_stream_repos_graphql(api_server, monkeypatch):
+    monkeypatch.setenv("GITHUB_GRAPHQL_URL", api_server.url)
+    gist = {
+        "name": "abc123",
+        "description": "a gist",
+        "updatedAt": "2026-01-02T03:04:05Z",
+        "files": [{"size": 2048}, {"size": 1}],
+    }
+    api_server.responses.append(
+        (
+            200,
+            {},
+            data(
+                repositories=page(
+                    [repo_node("one"), repo_node("fork", {"nameWithOwner": "o/fork"})]
+                ),
+                gists=page([gist]),
+            ),
+        )
+    )
+    listing = list(
+        githubtakeout.stream_repos(
+            "user",
+            "secret",
+            pattern=".*",
+            skip_pattern=None,
+            skip_forks=True,
+            include_gists=True,
+            api="graphql",
+        )
+    )
+    assert listing[0] == (
+        "repo",
+        githubtakeout.RepoEntry(
+            name="one",
+            url="https://github.com/user/one.git",
+            description="one description",
+            fork=False,
+            size=42,
+            pushed_at="2026-01-02T03:04:05+00:00",
+            network="user/one",
+        ),
+    )
+    ((kind, gist),) = listing[1:]
+    assert kind == "gist"
+    assert gist.url == "https://gist.github.com/abc123.git"
+    assert gist.size == 2
+    assert len(api_server.requests) == 1
+
+
+def test_iter_org_repos(api_server):
+    rate_limit = {"cost": 1, "remaining": 4999, "resetAt": RESET_AT}
+    api_server.responses.extend(
+        [
+            (
+                200,
+                {},
+                {
+                    "data": {
+                        "rateLimit": rate_limit,
+                        "organization": {"repositories": page([repo_node(name)], c)},
+                    }
+                },
+            )
+            for name, c in (("one", "r1"), ("two", None))
+        ]
+    )
+    repos = list(GraphQLClient("secret", api_server.url).iter_org_repos("acme"))
+    assert [repo["name"] for repo in repos] == ["one", "two"]
+    assert [repo["network"] for repo in repos] == ["user/one", "user/two"]
+    first, second = (request["variables"] for request in api_server.requests)
+    assert first["login"] == "acme"
+    assert second["repoCursor"] == "r1"
+
+
+def gist_file(name, content, **fields):
+    data = content.encode()
+    return {
+        "name": name,
+        "size": len(data),
+        "isTruncated": False,
+        "text": content,
+    } | fields
+
+
+def test_bulk_gists(api_server, make_remote, tmp_path):
+    rate_limit = {"cost": 1, "remaining": 4999, "resetAt": RESET_AT}
+    files = {
+        # fetched through the API
+        "gist0": [gist_file("a.txt", "hello\n"), gist_file("b.md", "# b\n")],
+        # binary, so cloned
+        "gist1": [gist_file("data.bin", "", size=3, text=None)],
+        # deleted since it was listed
+        "gist2": None,
+    }
+    api_server.responses.append(
+        (
+            200,
+            {},
+            {
+                "data": {
+                    "rateLimit": rate_limit,
+                    "user": {
+                        f"gist{i}": files[f"gist{i}"] and {"files": files[f"gist{i}"]}
+                        for i in range(3)
+                    },
+                }
+            },
+        )
+    )
+    make_remote("gist1", {"data.bin": b"\x00\x01\x02"})
+    gists = [
+        (
+            githubtakeout.RepoEntry(
+                name,
+                None,
+                f"{name} description",
+                False,
+                0,
+                # gist1 has no update time
+                None if name == "gist1" else "2026-01-02T03:04:05+00:00",
+                None,
+            ),
+            (tmp_path / "remotes" / f"{name}.git").as_uri(),
+        )
+        for name in files
+    ]
+    working_dir = tmp_path / "backups"
+    batch = githubtakeout.GistBatch(
+        GraphQLClient("secret", api_server.url), "user", gists
+    )
+    task = githubtakeout.Task(
+        "gists 1", None, working_dir / "gists 1", None, 0, gists=batch
+    )
+    (result,) = githubtakeout.backup_all(
+        [task], archive_format="zip", include_history=False, show_progress=False
+    )
+    assert result.error is None
+    (request,) = api_server.requests
+    assert request["variables"] == {
+        "login": "user",
+        "name0": "gist0",
+        "name1": "gist1",
+        "name2": "gist2",
+    }
+    with zipfile.ZipFile(working_dir / "gists 1.zip") as zip_archive:
+        assert sorted(zip_archive.namelist()) == [
+            "gists 1/gist0/a.txt",
+            "gists 1/gist0/b.md",
+            "gists 1/gist1/data.bin",
+            "gists 1/index.json",
+        ]
+        assert zip_archive.read("gists 1/gist0/a.txt") == b"hello\n"
+        assert zip_archive.read("gists 1/gist1/data.bin") == b"\x00\x01\x02"
+        index = json.loads(zip_archive.read("gists 1/index.json"))
+        # times come from the gists, not from when they were backed up
+        assert {info.date_time for info in zip_archive.infolist()} == {
+            (2026, 1, 2, 3, 4, 4)
+        }
+    assert [gist["id"] for gist in index] == ["gist0", "gist1"]
+    assert index[0]["files"] == ["a.txt", "b.md"]
+    # the clone of the binary gist is gone
+    assert not (working_dir / "gists 1").exists()
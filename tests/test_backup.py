@@ -0,0 +1,298 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for backing up local Git repos (no GitHub access needed)."""
+
+import tarfile
+import zipfile
+from pathlib import Path
+
+import git
+import pytest
+
+import githubtakeout
+from githubtakeout.references import REFERENCES_NAME, ReferenceCache
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_backup_all(jobs, make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    tasks = [
+        (name, make_remote(name), working_dir / name, None)
+        for name in ("one", "two", "three")
+    ]
+    results = githubtakeout.backup_all(
+        tasks,
+        jobs,
+        archive_format="zip",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+    )
+    assert [result.name for result in results] == ["one", "two", "three"]
+    assert all(result.error is None for result in results)
+    for name in ("one", "two", "three"):
+        assert Path(working_dir / f"{name}.zip").exists()
+        assert not Path(working_dir / name).exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_backup_all_failure_does_not_stop_run(jobs, make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    missing_url = (tmp_path / "remotes" / "missing.git").as_uri()
+    tasks = [
+        ("missing", missing_url, working_dir / "missing", None),
+        ("good", make_remote("good"), working_dir / "good", None),
+    ]
+    results = githubtakeout.backup_all(
+        tasks,
+        jobs,
+        archive_format="tar",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+    )
+    assert results[0].name == "missing"
+    assert results[0].error == "failed cloning repo"
+    assert results[1].error is None
+    assert Path(working_dir / "good.tar.gz").exists()
+
+
+def test_broken_kept_repo_does_not_stop_run(make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    # an empty .git dir, as left by a clone that was killed
+    (working_dir / "broken" / ".git").mkdir(parents=True)
+    tasks = [
+        ("broken", make_remote("broken"), working_dir / "broken", None),
+        ("good", make_remote("good"), working_dir / "good", None),
+    ]
+    results = githubtakeout.backup_all(
+        tasks,
+        2,
+        archive_format="zip",
+        include_history=True,
+        keep=True,
+        show_progress=False,
+    )
+    assert results[0].error == "failed pulling changes in repo"
+    assert results[1].error is None
+    assert Path(working_dir / "good.zip").exists()
+
+
+def archived_files(archive_path):
+    if archive_path.name.endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zip_archive:
+            names = zip_archive.namelist()
+    else:
+        with tarfile.open(archive_path) as tar_archive:
+            names = [member.name for member in tar_archive if member.isfile()]
+    return {name for name in names if not name.endswith("/")}
+
+
+@pytest.mark.parametrize(
+    ("archive_format", "extension"),
+    [("zip", "zip"), ("tar", "tar.gz"), ("tar.uncompressed", "tar")],
+)
+def test_no_checkout(archive_format, extension, make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    githubtakeout.get_and_archive_repo(
+        url,
+        working_dir / "repo",
+        archive_format=archive_format,
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        no_checkout=True,
+    )
+    assert "fetching repo" in caplog.text
+    assert not Path(working_dir / "repo").exists()
+    archive_path = working_dir / f"repo.{extension}"
+    assert archived_files(archive_path) == {"repo/README.md", "repo/src/main.py"}
+
+
+def test_mirror_incremental_bundles(make_remote, push_commit, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+
+    def backup():
+        githubtakeout.get_and_archive_repo(
+            url,
+            working_dir / "repo",
+            archive_format="zip",
+            include_history=True,
+            keep=True,
+            show_progress=False,
+            mirror=True,
+            incremental=True,
+        )
+
+    backup()
+    assert "creating mirror" in caplog.text
+    full_bundle_path = working_dir / "repo.bundle"
+    assert full_bundle_path.exists()
+    assert not (working_dir / "repo.zip").exists()
+
+    caplog.clear()
+    push_commit()
+    backup()
+    assert "updating mirror" in caplog.text
+    increments = list(working_dir.glob("repo.*T*.bundle"))
+    assert len(increments) == 1
+
+    # no changes, so no new bundle is written
+    caplog.clear()
+    backup()
+    assert "no new commits since the latest bundle" in caplog.text
+    assert len(list(working_dir.glob("repo.*T*.bundle"))) == 1
+
+    # restore from the full bundle plus the increment
+    restored = git.Repo.clone_from(full_bundle_path, tmp_path / "restored")
+    restored.git.fetch(increments[0], "main:refs/remotes/origin/main")
+    restored.git.merge("origin/main")
+    assert (tmp_path / "restored" / "CHANGES.md").exists()
+    restored.close()
+
+
+def test_partial_sparse_clone(make_remote, push_commit, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote(
+        files={
+            "README.md": "# test repo\n",
+            "src/main.py": "print('hi')\n",
+            "docs/big.bin": b"\x00" * 4096,
+        }
+    )
+    with git.Repo(tmp_path / "remotes" / "repo.git") as remote:
+        with remote.config_writer() as config:
+            config.set_value("uploadpack", "allowFilter", True)
+    local_repo_dir = tmp_path / "backups" / "repo"
+
+    def backup(**options):
+        githubtakeout.get_and_archive_repo(
+            url,
+            local_repo_dir,
+            archive_format="zip",
+            include_history=True,
+            keep=True,
+            show_progress=False,
+            **options,
+        )
+
+    backup(clone_filter="blob:none", sparse_paths=["src"])
+    assert githubtakeout.partial_clone_filter(local_repo_dir) == "blob:none"
+    assert (local_repo_dir / "README.md").exists()
+    assert (local_repo_dir / "src" / "main.py").exists()
+    assert not (local_repo_dir / "docs").exists()
+
+    # pulling applies new sparse paths
+    caplog.clear()
+    push_commit(path="src/new.py")
+    backup(clone_filter="blob:none", sparse_paths=["src", "docs"])
+    assert "pulling changes" in caplog.text
+    assert (local_repo_dir / "src" / "new.py").exists()
+    assert (local_repo_dir / "docs" / "big.bin").exists()
+
+    # a different filter needs a new clone
+    caplog.clear()
+    backup()
+    assert "cloning repo" in caplog.text
+    assert githubtakeout.partial_clone_filter(local_repo_dir) is None
+    assert (local_repo_dir / "docs" / "big.bin").exists()
+
+
+def test_partial_clone_size_suffix(make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    with git.Repo(tmp_path / "remotes" / "repo.git") as remote:
+        with remote.config_writer() as config:
+            config.set_value("uploadpack", "allowFilter", True)
+    local_repo_dir = tmp_path / "backups" / "repo"
+    for _ in range(2):
+        githubtakeout.get_and_archive_repo(
+            url,
+            local_repo_dir,
+            archive_format="zip",
+            include_history=True,
+            keep=True,
+            show_progress=False,
+            clone_filter="blob:limit=1k",
+        )
+    # git stores the limit in bytes, it is still the same filter
+    assert githubtakeout.partial_clone_filter(local_repo_dir) == "blob:limit=1024"
+    assert "pulling changes" in caplog.text
+
+
+def test_reference_cache(make_remote, tmp_path, monkeypatch):
+    upstream_url = make_remote("upstream")
+    # a fork shares the upstream's history and adds a commit of its own
+    upstream_dir = tmp_path / "remotes" / "upstream.git"
+    fork_dir = tmp_path / "remotes" / "fork.git"
+    with git.Repo(upstream_dir) as upstream:
+        upstream.clone(fork_dir, bare=True).close()
+    with git.Repo.clone_from(fork_dir.as_uri(), tmp_path / "work" / "fork") as work:
+        (tmp_path / "work" / "fork" / "FORK.md").write_text("forked\n")
+        work.git.add(all=True)
+        work.index.commit("fork commit")
+        work.remotes.origin.push("main")
+    working_dir = tmp_path / "backups"
+    cache = ReferenceCache(
+        working_dir / REFERENCES_NAME, {"upstream": "o/upstream", "fork": "o/upstream"}
+    )
+
+    def backup(name, url, archive_format):
+        githubtakeout.get_and_archive_repo(
+            url,
+            working_dir / name,
+            archive_format=archive_format,
+            include_history=True,
+            keep=True,
+            show_progress=False,
+            reference_cache=cache,
+        )
+
+    backup("upstream", upstream_url, "none")
+    backup("fork", fork_dir.as_uri(), "zip")
+    cache_dir = working_dir / REFERENCES_NAME / "o" / "upstream.git"
+    with git.Repo(cache_dir) as cache_repo, cache_repo.config_reader() as config:
+        refs = {ref.path for ref in cache_repo.refs}
+        # objects kept repos borrow are never deleted from the cache
+        assert config.get_value("gc", "auto") == 0
+        assert config.get_value("gc", "pruneExpire") == "never"
+    assert refs == {
+        "refs/repos/upstream/heads/main",
+        "refs/repos/fork/heads/main",
+    }
+    # kept without an archive, the repo borrows objects from the cache
+    info_dir = working_dir / "upstream" / ".git" / "objects" / "info"
+    assert (info_dir / "alternates").read_text().strip() == str(cache_dir / "objects")
+    # archived repos are self-contained
+    assert not (
+        working_dir / "fork" / ".git" / "objects" / "info" / "alternates"
+    ).exists()
+    with git.Repo(working_dir / "fork") as fork:
+        assert fork.git.fsck() == ""
+    with zipfile.ZipFile(working_dir / "fork.zip") as zip_archive:
+        assert "fork/FORK.md" in zip_archive.namelist()
+
+    # new commits fetched into the cache are copied into a dissociated repo
+    # before it is pulled, instead of being downloaded twice
+    with git.Repo(tmp_path / "work" / "fork") as work:
+        (tmp_path / "work" / "fork" / "NEW.md").write_text("new\n")
+        work.git.add(all=True)
+        new_commit = work.index.commit("new commit").hexsha
+        work.remotes.origin.push("main")
+    pulled = []
+    pull = githubtakeout.pull
+
+    def pull_after_cache(local_repo_dir, *args):
+        with git.Repo(local_repo_dir) as repo:
+            pulled.append(repo.commit("origin/main").hexsha)
+        pull(local_repo_dir, *args)
+
+    monkeypatch.setattr(githubtakeout, "pull", pull_after_cache)
+    backup("fork", fork_dir.as_uri(), "zip")
+    assert pulled == [new_commit]
+    assert (working_dir / "fork" / "NEW.md").exists()
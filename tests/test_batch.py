@@ -0,0 +1,168 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for backing up several users and orgs from a config file."""
+
+import pytest
+
+import githubtakeout
+from githubtakeout.batch import ConfigError, load_config
+
+
+def parse_args(*argv):
+    return githubtakeout.build_parser().parse_args(argv)
+
+
+def load(path):
+    return load_config(path, githubtakeout.config_options(githubtakeout.build_parser()))
+
+
+def write_config(tmp_path, text):
+    path = tmp_path / "takeout.toml"
+    path.write_text(text)
+    return path
+
+
+def test_load_config(tmp_path):
+    path = write_config(
+        tmp_path,
+        """
+[defaults]
+history = true
+format = "tar"
+
+[[target]]
+user = "alice"
+gists = true
+
+[[target]]
+org = "acme"
+format = "zip"
+sparse = ["docs"]
+max_repo_size = "2K"
+token_env = "ACME_TOKEN"
+""",
+    )
+    alice, acme = load(path)
+    assert alice == {
+        "owner": "alice",
+        "org": False,
+        "history": True,
+        "format": "tar",
+        "gists": True,
+    }
+    assert acme["org"]
+    assert acme["format"] == "zip"
+    assert acme["history"]
+    assert acme["sparse"] == ["docs"]
+    assert acme["max_repo_size"] == 2048
+    assert acme["token_env"] == "ACME_TOKEN"
+
+
+@pytest.mark.parametrize(
+    ("text", "error"),
+    [
+        ("[[target]]\nuser = 'a'\norg = 'b'\n", "must have either 'user' or 'org'"),
+        ("[[target]]\nuser = 'a'\nformats = 'zip'\n", "unknown option 'formats'"),
+        ("[defaults]\nhistory = 'yes'\n[[target]]\nuser = 'a'\n", "type bool"),
+        ("[[target]]\nuser = 'a'\ncompression_level = true\n", "type int"),
+        ("[[target]]\nuser = 'a'\nmax_repo_size = '2X'\n", "'max_repo_size'"),
+        ("[[target]]\nuser = 'a'\njobs = 2\n", "unknown option 'jobs'"),
+        ("[[target]]\norg = 'a'\ngists = true\n", "orgs don't have gists"),
+        ("[[target]]\nuser = 'a'\n[[target]]\nuser = 'A'\n", "more than once"),
+        ("[defaults]\nhistory = true\n", "no targets"),
+        ("[target\n", "invalid config file"),
+    ],
+)
+def test_invalid_config(tmp_path, text, error):
+    with pytest.raises(ConfigError, match=error):
+        load(write_config(tmp_path, text))
+
+
+def test_run_batch(make_remote, tmp_path, monkeypatch):
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setenv("ACME_TOKEN", "secret")
+    remotes = {
+        ("alice", False): make_remote("alice-one"),
+        ("acme", True): make_remote("acme-one"),
+    }
+    listed = []
+
+    def stream_repos(username, token, *args, org=False, **kwargs):
+        listed.append((username, org, token))
+        url = remotes[username, org]
+        yield "repo", githubtakeout.RepoEntry("one", url, None, False, 1, None, None)
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", stream_repos)
+    # credentials can't be added to file:// URLs
+    monkeypatch.setattr(githubtakeout, "add_creds", lambda url, *args: url)
+
+    def options(owner, *argv):
+        return parse_args("--dir", str(tmp_path / "out" / owner), "--quiet", *argv)
+
+    results = githubtakeout.run_batch(
+        [
+            ("alice", False, None, options("alice")),
+            ("acme", True, "ACME_TOKEN", options("acme", "--format", "tar")),
+        ],
+        parse_args("--jobs", "2", "--quiet"),
+    )
+    # each target is listed with its own token
+    assert sorted(listed) == [("acme", True, "secret"), ("alice", False, None)]
+    assert [result.name for result in results] == ["alice/one", "acme/one"]
+    assert all(result.error is None for result in results)
+    assert (tmp_path / "out" / "alice" / "backups" / "one.zip").exists()
+    assert (tmp_path / "out" / "acme" / "backups" / "one.tar.gz").exists()
+
+
+def test_run_batch_shared_token(make_remote, tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv("GITHUB_TOKEN", "secret")
+    url = make_remote()
+    listed = []
+
+    def stream_repos(username, token, *args, **kwargs):
+        listed.append((username, token))
+        yield "repo", githubtakeout.RepoEntry("one", url, None, False, 1, None, None)
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", stream_repos)
+    monkeypatch.setattr(githubtakeout, "add_creds", lambda url, *args: url)
+    # the token belongs to alice
+    monkeypatch.setattr(githubtakeout, "token_login", lambda token: "Alice")
+    results = githubtakeout.run_batch(
+        [
+            (owner, False, None, parse_args("--dir", str(tmp_path / owner), "--quiet"))
+            for owner in ("alice", "bob")
+        ],
+        parse_args("--quiet"),
+    )
+    # bob's repos aren't listed with alice's token
+    assert listed == [("alice", "secret"), ("bob", None)]
+    assert "only listing public repos of 'bob'" in caplog.text
+    assert all(result.error is None for result in results)
+
+
+def test_run_batch_cached_listing_offline(tmp_path, monkeypatch, caplog):
+    caplog.set_level("INFO")
+    monkeypatch.setenv("GITHUB_TOKEN", "secret")
+
+    def stream_repos(username, *args, **kwargs):
+        yield "repo", githubtakeout.RepoEntry("one", None, None, False, 1, None, None)
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", stream_repos)
+    monkeypatch.setattr(githubtakeout, "token_login", lambda token: "alice")
+
+    def list_alice(*argv):
+        args = parse_args("--dir", str(tmp_path / "alice"), "--api", "rest", *argv)
+        githubtakeout.run_batch([("alice", False, None, args)], args)
+
+    list_alice("--list")
+
+    # offline, neither the listing nor the user of the token is looked up
+    def offline(*args, **kwargs):
+        raise AssertionError("no API requests with --cached")
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", offline)
+    monkeypatch.setattr(githubtakeout, "token_login", offline)
+    caplog.clear()
+    list_alice("--list", "--cached")
+    assert "alice/one" in caplog.text
@@ -0,0 +1,85 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for checksums computed while archives are written, and verifying them."""
+
+import hashlib
+import tarfile
+import zipfile
+
+import pytest
+
+import githubtakeout
+from githubtakeout.checksums import CHECKSUMS_NAME, Checksums
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar", "tar.uncompressed"])
+def test_archive_checksums(archive_format, tmp_path):
+    repo_dir = tmp_path / "backups" / "repo"
+    (repo_dir / "src").mkdir(parents=True)
+    (repo_dir / "README.md").write_text("# test repo\n")
+    (repo_dir / "src" / "main.py").write_text("print('hi')\n")
+    checksums = Checksums(tmp_path / "backups" / CHECKSUMS_NAME)
+    archive_path = githubtakeout.archive(repo_dir, archive_format, checksums=checksums)
+    (entry,) = checksums.entries()
+    assert entry["archive"] == archive_path.name
+    assert entry["size"] == archive_path.stat().st_size
+    assert entry["sha256"] == sha256(archive_path.read_bytes())
+    assert entry["files"] == {
+        "repo/README.md": sha256(b"# test repo\n"),
+        "repo/src/main.py": sha256(b"print('hi')\n"),
+    }
+    # the archives are still complete and readable
+    if archive_format == "zip":
+        with zipfile.ZipFile(archive_path) as zip_archive:
+            assert zip_archive.testzip() is None
+            assert zip_archive.read("repo/src/main.py") == b"print('hi')\n"
+    else:
+        with tarfile.open(archive_path) as tar_archive:
+            assert tar_archive.getnames() == [
+                "repo",
+                "repo/README.md",
+                "repo/src",
+                "repo/src/main.py",
+            ]
+    assert checksums.verify(entry) is None
+
+
+def test_verify(make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    working_dir = tmp_path / "backups"
+    tasks = [
+        (name, make_remote(name), working_dir / name, None) for name in ("one", "two")
+    ]
+    githubtakeout.backup_all(
+        tasks,
+        archive_format="zip",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        no_checkout=True,
+        checksums=Checksums(working_dir / CHECKSUMS_NAME),
+    )
+    assert githubtakeout.verify([tmp_path], jobs=2) == 0
+
+    # flip a byte without changing the size
+    data = bytearray((working_dir / "two.zip").read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    (working_dir / "two.zip").write_bytes(bytes(data))
+    (working_dir / "three.zip").write_bytes(b"")
+    # kept repos aren't archives, whatever their names end with
+    (working_dir / "guitar").mkdir()
+    (working_dir / "backup.zip").mkdir()
+    assert githubtakeout.verify([tmp_path], jobs=2) == 1
+    assert "two.zip: SHA-256 doesn't match" in caplog.text
+    assert caplog.text.count("no checksums for archive") == 1
+    assert "three.zip" in caplog.text
+    assert "verified 1 of 2 archives" in caplog.text
+
+    (working_dir / "one.zip").unlink()
+    assert githubtakeout.verify([tmp_path]) == 2
+    assert "one.zip: archive is missing" in caplog.text
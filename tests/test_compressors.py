@@ -0,0 +1,110 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for compressing tar archives."""
+
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import githubtakeout
+from githubtakeout.compressors import (
+    ParallelGzipWriter,
+    zip_compress_type,
+    zstd_available,
+)
+
+
+def test_parallel_gzip_writer():
+    data = os.urandom(100_000) + b"githubtakeout" * 100_000
+    output = io.BytesIO()
+    writer = ParallelGzipWriter(output, level=6, threads=4, block_size=64 * 1024)
+    for i in range(0, len(data), 10_000):
+        writer.write(data[i : i + 10_000])
+    writer.close()
+    assert gzip.decompress(output.getvalue()) == data
+
+
+def decompress(archive_path):
+    data = archive_path.read_bytes()
+    if archive_path.name.endswith(".tar.gz"):
+        return gzip.decompress(data)
+    if archive_path.name.endswith(".tar.zst"):
+        try:
+            from compression import zstd
+        except ImportError:
+            import zstandard
+
+            # streamed frames don't record their size, so use a stream reader
+            return zstandard.ZstdDecompressor().stream_reader(data).read()
+        return zstd.decompress(data)
+    return data
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize(
+    ("archive_format", "extension"),
+    [("tar", "tar.gz"), ("tar.zst", "tar.zst"), ("tar.uncompressed", "tar")],
+)
+def test_archive_tar_formats(archive_format, extension, threads, tmp_path):
+    if archive_format == "tar.zst" and not zstd_available():
+        pytest.skip("zstd is not available")
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "src").mkdir(parents=True)
+    (repo_dir / "src" / "main.py").write_text("print('hi')\n" * 1000)
+    archive_path = githubtakeout.archive(
+        repo_dir, archive_format, compression_level=1, compress_threads=threads
+    )
+    assert archive_path == tmp_path / f"repo.{extension}"
+    with tarfile.open(fileobj=io.BytesIO(decompress(archive_path))) as tar_archive:
+        main_py = tar_archive.extractfile("repo/src/main.py").read()
+    assert main_py == b"print('hi')\n" * 1000
+
+
+def test_archive_zip_compression_level(tmp_path):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "main.py").write_text("print('hi')\n" * 1000)
+    for level, compressed in ((0, False), (9, True)):
+        archive_path = githubtakeout.archive(repo_dir, "zip", compression_level=level)
+        with zipfile.ZipFile(archive_path) as zip_archive:
+            info = zip_archive.getinfo("repo/main.py")
+            assert zip_archive.read(info) == b"print('hi')\n" * 1000
+        # level 0 deflates without compressing
+        assert (info.compress_size < info.file_size // 10) == compressed
+
+
+def test_zip_compress_type(tmp_path):
+    text = tmp_path / "text.txt"
+    text.write_text("githubtakeout\n" * 1000)
+    small_random = tmp_path / "small.bin"
+    small_random.write_bytes(os.urandom(100))
+    random = tmp_path / "random.bin"
+    random.write_bytes(os.urandom(100_000))
+    png = tmp_path / "image.PNG"
+    png.write_bytes(b"\x89PNG" + b"\x00" * 10_000)
+    gzipped = tmp_path / "data"
+    gzipped.write_bytes(gzip.compress(b"githubtakeout" * 1000) + b"\x00" * 10_000)
+    assert zip_compress_type(text) == zipfile.ZIP_DEFLATED
+    assert zip_compress_type(small_random) == zipfile.ZIP_DEFLATED
+    assert zip_compress_type(random) == zipfile.ZIP_STORED
+    assert zip_compress_type(png) == zipfile.ZIP_STORED
+    assert zip_compress_type(gzipped) == zipfile.ZIP_STORED
+
+
+def test_archive_zip_stores_incompressible_files(tmp_path):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("githubtakeout\n" * 1000)
+    (repo_dir / "random.bin").write_bytes(os.urandom(100_000))
+    archive_path = githubtakeout.archive(repo_dir, "zip")
+    with zipfile.ZipFile(archive_path) as zip_archive:
+        assert zip_archive.testzip() is None
+        readme = zip_archive.getinfo("repo/README.md")
+        random = zip_archive.getinfo("repo/random.bin")
+    assert readme.compress_type == zipfile.ZIP_DEFLATED
+    assert random.compress_type == zipfile.ZIP_STORED
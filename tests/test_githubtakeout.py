@@ -15,6 +15,14 @@ import githubtakeout
 USER = "cgoldberg"
 
 
+def run(tmp_path, *options):
+    # back up USER's repos into tmp_path, with command line options
+    args = githubtakeout.build_parser().parse_args(
+        [USER, "--dir", str(tmp_path), *options]
+    )
+    return githubtakeout.run(args)
+
+
 @pytest.fixture(autouse=True, scope="session")
 def require_token():
     load_dotenv()
@@ -32,19 +40,7 @@ def require_token():
 def test_run_list_1_match(tmp_path, caplog):
     caplog.set_level("INFO")
     repo = "githubtakeout"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=False,
-        include_history=False,
-        skip_forks=False,
-        keep=False,
-        list_only=True,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none", "--list")
     assert "creating archives" not in caplog.text
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert not re.search(r"found \d* gists", caplog.text)
@@ -55,19 +51,7 @@ def test_run_list_1_match(tmp_path, caplog):
 def test_run_list_0_match(tmp_path, caplog):
     caplog.set_level("INFO")
     repo = "this_repo_does_not_exist"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=False,
-        include_history=False,
-        skip_forks=False,
-        keep=False,
-        list_only=True,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none", "--list")
     assert "creating archives" not in caplog.text
     assert "found 0 repos" in caplog.text
     assert not re.search(r"found \d* gists", caplog.text)
@@ -77,19 +61,7 @@ def test_run_list_0_match(tmp_path, caplog):
 def test_run_list_0_match_with_gists(tmp_path, caplog):
     caplog.set_level("INFO")
     repo = "this_repo_does_not_exist"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=True,
-        include_history=False,
-        skip_forks=False,
-        keep=False,
-        list_only=True,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none", "--gists", "--list")
     assert "creating archives" not in caplog.text
     assert "found 0 repos" in caplog.text
     assert re.search(r"found \d* gists", caplog.text)
@@ -98,19 +70,7 @@ def test_run_list_0_match_with_gists(tmp_path, caplog):
 
 def test_run_list_skip_all(tmp_path, caplog):
     caplog.set_level("INFO")
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=".*",
-        skip_pattern=".*",
-        archive_format="none",
-        include_gists=False,
-        include_history=False,
-        skip_forks=False,
-        keep=False,
-        list_only=True,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--skip_pattern", ".*", "--format", "none", "--list")
     assert "creating archives" not in caplog.text
     assert "found 0 repos" in caplog.text
 
@@ -120,19 +80,7 @@ def test_run_archive_1_match(archive_format, tmp_path, caplog):
     caplog.set_level("INFO")
     backup_dir = "backups"
     repo = "githubtakeout"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format=archive_format,
-        include_gists=False,
-        include_history=False,
-        skip_forks=False,
-        keep=False,
-        list_only=False,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", archive_format)
     assert re.search(f"creating archives in: .*{backup_dir}", caplog.text)
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert "gists" not in caplog.text
@@ -153,19 +101,7 @@ def test_run_no_archive_1_match_with_history(tmp_path, caplog):
     caplog.set_level("INFO")
     backup_dir = "backups"
     repo = "githubtakeout"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=False,
-        include_history=True,
-        skip_forks=False,
-        keep=False,
-        list_only=False,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none", "--history")
     assert re.search(f"creating archives in: .*{backup_dir}", caplog.text)
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert "gists" not in caplog.text
@@ -184,19 +120,7 @@ def test_run_no_archive_1_match_without_history(tmp_path, caplog):
     caplog.set_level("INFO")
     backup_dir = "backups"
     repo = "githubtakeout"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=False,
-        include_history=False,
-        skip_forks=False,
-        keep=False,  # this doesn't matter when archive_format is "none"
-        list_only=False,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none")
     assert re.search("creating archives in: .*backups", caplog.text)
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert "gists" not in caplog.text
@@ -215,19 +139,7 @@ def test_run_archive_1_match_with_history_pull_with_keep(tmp_path, caplog):
     caplog.set_level("INFO")
     backup_dir = "backups"
     repo = "githubtakeout"
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="none",
-        include_gists=False,
-        include_history=True,
-        skip_forks=False,
-        keep=True,
-        list_only=False,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--format", "none", "--history", "--keep")
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert "gists" not in caplog.text
     assert re.search(f"cloning repo: {USER}/{repo}.git to: .*backups", caplog.text)
@@ -239,19 +151,7 @@ def test_run_archive_1_match_with_history_pull_with_keep(tmp_path, caplog):
     assert Path(tmp_path / backup_dir / repo).exists()
     assert Path(tmp_path / backup_dir / repo / ".git").exists()
     caplog.clear()
-    githubtakeout.run(
-        username=USER,
-        base_dir=tmp_path,
-        pattern=repo,
-        skip_pattern=None,
-        archive_format="zip",
-        include_gists=False,
-        include_history=True,
-        skip_forks=False,
-        keep=True,
-        list_only=False,
-        prompt_for_token=False,
-    )
+    run(tmp_path, "--pattern", repo, "--history", "--keep")
     assert f"found 1 repos for user '{USER}'" in caplog.text
     assert "gists" not in caplog.text
     assert not re.search(f"cloning repo: {USER}/{repo}.git to: .*backups", caplog.text)
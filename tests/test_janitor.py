@@ -0,0 +1,49 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for deleting directories in the background."""
+
+from pathlib import Path
+
+import githubtakeout
+from githubtakeout.janitor import TRASH_NAME, Janitor
+
+
+def test_discard(tmp_path):
+    trash = tmp_path / TRASH_NAME
+    # left by an interrupted run
+    (trash / "tmp1234" / "old").mkdir(parents=True)
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "src").mkdir(parents=True)
+    (repo_dir / "src" / "main.py").write_text("print('hi')\n")
+    janitor = Janitor(trash)
+    janitor.discard(repo_dir)
+    # the name is free right away
+    assert not repo_dir.exists()
+    janitor.discard(tmp_path / "missing")
+    # waiting doesn't stop the janitor
+    janitor.wait()
+    assert not list(trash.iterdir())
+    (tmp_path / "other").mkdir()
+    janitor.discard(tmp_path / "other")
+    janitor.close()
+    assert not list(trash.iterdir())
+
+
+def test_backup_with_janitor(make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    janitor = Janitor(working_dir / TRASH_NAME)
+    tasks = [(name, make_remote(name), working_dir / name, None) for name in ("a", "b")]
+    results = githubtakeout.backup_all(
+        tasks,
+        archive_format="zip",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        janitor=janitor,
+    )
+    janitor.close()
+    assert all(result.error is None for result in results)
+    assert Path(working_dir / "a.zip").exists()
+    assert not Path(working_dir / "a").exists()
+    assert not list((working_dir / TRASH_NAME).iterdir())
@@ -0,0 +1,97 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for resuming interrupted runs and atomic archive writes."""
+
+from pathlib import Path
+
+import pytest
+
+import githubtakeout
+from githubtakeout.journal import JOURNAL_NAME, Journal
+
+OPTIONS = {"archive_format": "zip", "include_history": False}
+
+
+def test_interrupted_archive_leaves_no_file(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("# test repo\n")
+
+    def interrupt(path):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(githubtakeout, "zip_compress_type", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        githubtakeout.archive(repo_dir, "zip")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["repo"]
+
+
+def test_interrupted_save_keeps_previous_journal(tmp_path, monkeypatch):
+    journal = Journal(tmp_path / JOURNAL_NAME, OPTIONS)
+    journal.record("repo", "fetched", None)
+
+    write_text = Path.write_text
+
+    def interrupt(path, text):
+        # half the file is written when the run is interrupted
+        write_text(path, text[: len(text) // 2])
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(Path, "write_text", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        journal.record("repo", "done")
+    assert sorted(path.name for path in tmp_path.iterdir()) == [JOURNAL_NAME]
+    assert Journal(tmp_path / JOURNAL_NAME, OPTIONS).entry("repo") == {"fetched": None}
+
+
+def test_resume_interrupted_run(make_remote, tmp_path, monkeypatch, caplog):
+    caplog.set_level("INFO")
+    working_dir = tmp_path / "backups"
+    tasks = [
+        (name, make_remote(name), working_dir / name, None) for name in ("one", "two")
+    ]
+    journal_path = working_dir / JOURNAL_NAME
+    archive = githubtakeout.archive
+
+    def interrupt_two(local_repo_dir, *args, **kwargs):
+        if local_repo_dir.name == "two":
+            raise KeyboardInterrupt
+        return archive(local_repo_dir, *args, **kwargs)
+
+    def backup_all():
+        return githubtakeout.backup_all(
+            tasks,
+            archive_format="zip",
+            include_history=False,
+            keep=False,
+            show_progress=False,
+            journal=Journal(journal_path, OPTIONS),
+        )
+
+    monkeypatch.setattr(githubtakeout, "archive", interrupt_two)
+    with pytest.raises(KeyboardInterrupt):
+        backup_all()
+    assert (working_dir / "one.zip").exists()
+    assert not (working_dir / "two.zip").exists()
+    assert Journal(journal_path, OPTIONS).resumed
+
+    caplog.clear()
+    monkeypatch.setattr(githubtakeout, "archive", archive)
+    results = backup_all()
+    assert all(result.error is None for result in results)
+    assert "skipping repo backed up in the interrupted run: " in caplog.text
+    assert "(already fetched)" in caplog.text
+    assert "cloning repo" not in caplog.text
+    assert (working_dir / "two.zip").exists()
+    assert not (working_dir / "two").exists()
+
+
+def test_journal_with_other_options_starts_over(tmp_path):
+    journal = Journal(tmp_path / JOURNAL_NAME, OPTIONS)
+    journal.record("repo", "fetched", None)
+    assert Journal(tmp_path / JOURNAL_NAME, OPTIONS).entry("repo") == {"fetched": None}
+    other = OPTIONS | {"archive_format": "tar"}
+    assert not Journal(tmp_path / JOURNAL_NAME, other).resumed
+    journal.finish()
+    assert not (tmp_path / JOURNAL_NAME).exists()
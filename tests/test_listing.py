@@ -0,0 +1,248 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for enumerating repos and gists (no GitHub access needed)."""
+
+import os
+import subprocess
+import sys
+import threading
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import githubtakeout
+from githubtakeout.listcache import ListingCache
+
+PUSHED_AT = datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC)
+
+
+def fake_repo(name, fork=False):
+    return SimpleNamespace(
+        name=name,
+        full_name=f"user/{name}",
+        clone_url=f"https://github.com/user/{name}.git",
+        description=f"{name} description",
+        fork=fork,
+        size=42,
+        pushed_at=PUSHED_AT,
+    )
+
+
+def fake_gist(gist_id):
+    return SimpleNamespace(
+        id=gist_id,
+        git_pull_url=f"https://gist.github.com/{gist_id}.git",
+        description="a gist",
+        files={"a.py": SimpleNamespace(size=2048), "b.py": SimpleNamespace(size=1)},
+        updated_at=PUSHED_AT,
+    )
+
+
+def test_stream_repos_fetches_once(monkeypatch):
+    calls = []
+
+    def get_repos(username, token, include_gists):
+        calls.append(username)
+        repos = iter([fake_repo("one"), fake_repo("two", fork=True), fake_repo("x")])
+        return repos, iter([fake_gist("abc123")])
+
+    monkeypatch.setattr(githubtakeout, "get_repos", get_repos)
+    listing = list(
+        githubtakeout.stream_repos(
+            "user",
+            None,
+            pattern=".*",
+            skip_pattern="x",
+            skip_forks=True,
+            include_gists=True,
+        )
+    )
+    assert calls == ["user"]
+    assert listing[0] == (
+        "repo",
+        githubtakeout.RepoEntry(
+            name="one",
+            url="https://github.com/user/one.git",
+            description="one description",
+            fork=False,
+            size=42,
+            pushed_at="2026-01-02T03:04:05+00:00",
+            network="user/one",
+        ),
+    )
+    ((kind, gist),) = listing[1:]
+    assert kind == "gist"
+    assert gist.name == "abc123"
+    assert gist.size == 2
+
+
+def test_stream_repos_resolve_forks(monkeypatch):
+    fork = fake_repo("fork", fork=True)
+    fork.source = SimpleNamespace(full_name="upstream/fork")
+
+    def get_repos(username, token, include_gists):
+        return iter([fake_repo("one"), fork]), []
+
+    monkeypatch.setattr(githubtakeout, "get_repos", get_repos)
+    options = {
+        "pattern": ".*",
+        "skip_pattern": None,
+        "skip_forks": False,
+        "include_gists": False,
+    }
+    listing = githubtakeout.stream_repos("user", None, **options)
+    assert [repo.network for _, repo in listing] == ["user/one", None]
+    listing = githubtakeout.stream_repos("user", None, **options, resolve_forks=True)
+    assert [repo.network for _, repo in listing] == ["user/one", "upstream/fork"]
+
+
+def test_prefetch_raises_listing_errors():
+    def listing():
+        yield 1
+        raise SystemExit("error: invalid auth token")
+
+    items = githubtakeout.prefetch(listing())
+    assert next(items) == 1
+    with pytest.raises(SystemExit, match="invalid auth token"):
+        next(items)
+
+
+def test_backup_starts_before_listing_ends(make_remote, tmp_path, monkeypatch):
+    first_done = threading.Event()
+    urls = {name: make_remote(name) for name in ("one", "two")}
+
+    def stream_repos(username, *args, **kwargs):
+        yield (
+            "repo",
+            githubtakeout.RepoEntry("one", urls["one"], None, False, 1, None, None),
+        )
+        # the next page only "arrives" once the first repo was backed up
+        assert first_done.wait(timeout=30)
+        yield (
+            "repo",
+            githubtakeout.RepoEntry("two", urls["two"], None, False, 1, None, None),
+        )
+
+    backup = githubtakeout.backup
+
+    def backup_and_signal(name, *args, **kwargs):
+        result = backup(name, *args, **kwargs)
+        first_done.set()
+        return result
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", stream_repos)
+    monkeypatch.setattr(githubtakeout, "backup", backup_and_signal)
+    monkeypatch.setattr(githubtakeout, "add_creds", lambda url, *args: url)
+    args = githubtakeout.build_parser().parse_args(["user", "--dir", str(tmp_path)])
+    results = githubtakeout.run(args)
+    assert [result.name for result in results] == ["one", "two"]
+    assert all(result.error is None for result in results)
+    assert (tmp_path / "backups" / "two.zip").exists()
+
+
+def test_heavy_imports_are_deferred():
+    code = (
+        "import sys, githubtakeout; "
+        "print(sorted({'git', 'github', 'rich', 'dotenv'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stdout
+    assert output.strip() == "[]"
+
+
+@pytest.fixture
+def rest_server(monkeypatch):
+    """Serve ETags for pages of a listing (2 pages), and record the requests."""
+    etags = {"1": '"page-1"', "2": '"page-2"'}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self):
+            page = self.path.partition("&page=")[2] or "1"
+            etag = etags[page]
+            requests.append((self.command, page))
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+            else:
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                last = f'<{self.path}&page=2>; rel="last"'
+                self.send_header("Link", last)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            self.respond()
+
+        def do_HEAD(self):
+            self.respond()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.etags = etags
+    server.requests = requests
+    monkeypatch.setenv("GITHUB_API_URL", f"http://127.0.0.1:{server.server_port}")
+    githubtakeout.rest_client.cache_clear()
+    yield server
+    githubtakeout.rest_client.cache_clear()
+    server.shutdown()
+    server.server_close()
+
+
+def test_cached_listing(rest_server, tmp_path, monkeypatch):
+    fetches = []
+
+    def stream_repos(username, *args, **kwargs):
+        fetches.append(username)
+        yield (
+            "repo",
+            githubtakeout.RepoEntry(
+                "one", "https://github.com/user/one.git", None, False, 1, None, None
+            ),
+        )
+
+    monkeypatch.setattr(githubtakeout, "stream_repos", stream_repos)
+    now = [1000.0]
+    cache = ListingCache(tmp_path / "listing.json", clock=lambda: now[0])
+
+    def listing(**kwargs):
+        return githubtakeout.cached_listing(
+            "user", None, False, "rest", False, cache, **kwargs
+        )
+
+    with pytest.raises(SystemExit, match="no cached listing"):
+        listing(cached=True)
+    assert [entry.name for _, entry in listing()] == ["one"]
+    # the ETag of each page is taken before the listing
+    assert rest_server.requests == [("HEAD", "1"), ("HEAD", "2")]
+
+    # no requests at all within the TTL, or offline
+    rest_server.requests.clear()
+    now[0] += 60
+    assert listing(cache_ttl=300) == listing(cached=True)
+    assert rest_server.requests == []
+    assert fetches == ["user"]
+
+    # unchanged pages are revalidated instead of fetched again
+    assert [entry.name for _, entry in listing()] == ["one"]
+    assert rest_server.requests == [("GET", "1"), ("GET", "2")]
+    assert fetches == ["user"]
+
+    rest_server.etags["2"] = '"page-2-changed"'
+    listing()
+    assert fetches == ["user", "user"]
+    # the cache is kept on disk
+    reloaded = ListingCache(tmp_path / "listing.json")
+    assert reloaded.get("user:user")["validators"][1][1] == '"page-2-changed"'
@@ -0,0 +1,80 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for skipping unchanged repos using the backup manifest."""
+
+import git
+
+import githubtakeout
+from githubtakeout.manifest import MANIFEST_NAME, Manifest
+
+
+def backup(url, working_dir, manifest, archive_format="zip"):
+    githubtakeout.get_and_archive_repo(
+        url,
+        working_dir / "repo",
+        archive_format=archive_format,
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        manifest=manifest,
+    )
+
+
+def test_remote_refs(make_remote, tmp_path):
+    url = make_remote()
+    refs = githubtakeout.remote_refs(url)
+    assert set(refs) == {"HEAD", "refs/heads/main"}
+    assert refs["HEAD"] == refs["refs/heads/main"]
+
+    # like the refs GitHub keeps for pull requests, only mirrors have them
+    with git.Repo(tmp_path / "remotes" / "repo.git") as repo:
+        repo.git.update_ref("refs/pull/1/head", "HEAD")
+    assert set(githubtakeout.remote_refs(url)) == {"HEAD", "refs/heads/main"}
+    assert "refs/pull/1/head" in githubtakeout.remote_refs(url, mirror=True)
+
+
+def test_skip_unchanged_repo(make_remote, push_commit, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    assert "cloning repo" in caplog.text
+    assert (working_dir / "repo.zip").exists()
+    assert (working_dir / MANIFEST_NAME).exists()
+
+    # nothing changed, so the next run skips it
+    caplog.clear()
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    assert "skipping unchanged repo" in caplog.text
+    assert "cloning repo" not in caplog.text
+
+    # a new commit is backed up
+    caplog.clear()
+    push_commit()
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    assert "skipping unchanged repo" not in caplog.text
+    assert "cloning repo" in caplog.text
+
+
+def test_backup_again_when_options_change(make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    caplog.clear()
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME), "tar")
+    assert "skipping unchanged repo" not in caplog.text
+    assert (working_dir / "repo.tar.gz").exists()
+
+
+def test_backup_again_when_archive_missing(make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    (working_dir / "repo.zip").unlink()
+    caplog.clear()
+    backup(url, working_dir, Manifest(working_dir / MANIFEST_NAME))
+    assert "skipping unchanged repo" not in caplog.text
+    assert (working_dir / "repo.zip").exists()
@@ -0,0 +1,85 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for per-repo, per-phase metrics output."""
+
+import json
+
+import pytest
+
+import githubtakeout
+from githubtakeout.manifest import MANIFEST_NAME, Manifest
+from githubtakeout.metrics import Metrics
+
+
+def test_metrics_output(make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    missing_url = (tmp_path / "remotes" / "missing.git").as_uri()
+    tasks = [
+        ("repo", make_remote(), working_dir / "repo", None),
+        ("missing", missing_url, working_dir / "missing", None),
+    ]
+    jsonl_path = tmp_path / "metrics.jsonl"
+    textfile_path = tmp_path / "githubtakeout.prom"
+    metrics = Metrics(jsonl_path, textfile_path)
+    with metrics.run.phase("enumerate"):
+        pass
+    githubtakeout.backup_all(
+        tasks,
+        archive_format="tar",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        metrics=metrics,
+    )
+    metrics.finish()
+
+    repo, missing, summary = (
+        json.loads(line) for line in jsonl_path.read_text().splitlines()
+    )
+    assert repo["status"] == "ok"
+    assert list(repo["phases"]) == [
+        "clean",
+        "clone",
+        "remove_git",
+        "archive",
+        "delete",
+    ]
+    assert repo["bytes_fetched"] > 0
+    assert repo["bytes_source"] == len("# test repo\n") + len("print('hi')\n")
+    assert repo["bytes_written"] == (working_dir / "repo.tar.gz").stat().st_size
+    assert repo["ratio"] == pytest.approx(repo["bytes_written"] / repo["bytes_source"])
+    assert missing["status"] == "failed"
+    assert missing["error"] == "failed cloning repo"
+    assert summary["repos"] == 2
+    assert summary["failed"] == 1
+    assert "enumerate" in summary["phases"]
+
+    textfile = textfile_path.read_text()
+    assert 'githubtakeout_repo_phase_duration_seconds{repo="repo",phase="clone"}' in (
+        textfile
+    )
+    assert 'githubtakeout_repo_success{repo="missing"} 0' in textfile
+    assert 'githubtakeout_run_repos{status="ok"} 1' in textfile
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_metrics_skipped_repo(make_remote, tmp_path):
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    manifest = Manifest(working_dir / MANIFEST_NAME)
+    metrics = Metrics()
+    for _ in range(2):
+        githubtakeout.backup(
+            "repo",
+            url,
+            working_dir / "repo",
+            metrics=metrics,
+            archive_format="zip",
+            include_history=False,
+            keep=False,
+            show_progress=False,
+            manifest=manifest,
+        )
+    assert [record["status"] for record in metrics.records] == ["ok", "skipped"]
+    assert list(metrics.records[1]["phases"]) == ["refs"]
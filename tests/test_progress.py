@@ -0,0 +1,70 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for the shared progress display."""
+
+from pathlib import Path
+
+import githubtakeout
+from githubtakeout import progress
+from githubtakeout.progress import GitProgress, ProgressDisplay
+
+
+def test_git_progress_is_throttled(monkeypatch):
+    display = ProgressDisplay()
+    monkeypatch.setattr(progress, "display", display)
+    updates = []
+    git_progress = GitProgress("repo")
+    receiving = GitProgress.RECEIVING
+    git_progress.update(receiving | GitProgress.BEGIN, 0, 1000)
+    assert display.active == 1
+
+    def update(*args):
+        updates.append(args)
+
+    monkeypatch.setattr(display, "update", update)
+    for count in range(1, 1000):
+        git_progress.update(receiving, count, 1000)
+    # other stages aren't shown
+    git_progress.update(GitProgress.RESOLVING, 5, 10)
+    assert len(updates) < 10
+    git_progress.update(receiving | GitProgress.END, 1000, 1000, "done")
+    assert updates[-1][1:] == (1000, "done")
+    assert display.active == 0
+    assert display.progressbar is None
+
+
+def test_close_finishes_bar(monkeypatch):
+    display = ProgressDisplay()
+    monkeypatch.setattr(progress, "display", display)
+    git_progress = GitProgress("repo")
+    other = GitProgress("other")
+    git_progress.update(GitProgress.RECEIVING | GitProgress.BEGIN, 0, 10)
+    other.update(GitProgress.RECEIVING | GitProgress.BEGIN, 0, 10)
+    git_progress.close()
+    # finished bars are removed from the display
+    assert [task.description for task in display.progressbar.tasks] == [
+        "other: Receiving"
+    ]
+    other.close()
+    assert display.active == 0
+    git_progress.close()
+    assert display.active == 0
+
+
+def test_backup_all_with_progress(make_remote, tmp_path):
+    working_dir = tmp_path / "backups"
+    tasks = [
+        (name, make_remote(name), working_dir / name, None) for name in ("one", "two")
+    ]
+    results = githubtakeout.backup_all(
+        tasks,
+        2,
+        archive_format="zip",
+        include_history=True,
+        keep=False,
+        show_progress=True,
+    )
+    assert all(result.error is None for result in results)
+    assert Path(working_dir / "one.zip").exists()
+    assert progress.display.active == 0
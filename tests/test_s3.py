@@ -0,0 +1,183 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for streaming archives to a local stand-in for S3-compatible storage."""
+
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree as ET
+
+import pytest
+
+import githubtakeout
+from githubtakeout.manifest import MANIFEST_NAME, Manifest
+from githubtakeout.s3 import S3Client, S3Sink
+
+PART_SIZE = 1024
+
+
+@pytest.fixture
+def s3_server():
+    """Serve the S3 API calls used for uploads (like MinIO), and record them."""
+    objects = {}
+    uploads = {}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def parse(self):
+            url = urlsplit(self.path)
+            query = {
+                key: values[0] for key, values in parse_qs(url.query, True).items()
+            }
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            assert self.headers["Authorization"].startswith("AWS4-HMAC-SHA256 ")
+            assert (
+                self.headers["x-amz-content-sha256"] == hashlib.sha256(body).hexdigest()
+            )
+            requests.append((self.command, sorted(query)))
+            return unquote(url.path), query, body
+
+        def reply(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_PUT(self):
+            path, query, body = self.parse()
+            if "uploadId" in query:
+                uploads[query["uploadId"]][int(query["partNumber"])] = body
+                self.reply(200, headers={"ETag": f'"{query["partNumber"]}"'})
+            else:
+                objects[path] = body
+                self.reply(200)
+
+        def do_POST(self):
+            path, query, body = self.parse()
+            if "uploads" in query:
+                upload_id = f"upload-{len(uploads)}"
+                uploads[upload_id] = {}
+                xml = (
+                    '<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/'
+                    f'doc/2006-03-01/"><UploadId>{upload_id}</UploadId>'
+                    "</InitiateMultipartUploadResult>"
+                )
+                self.reply(200, xml.encode())
+            else:
+                parts = uploads.pop(query["uploadId"])
+                numbers = [
+                    int(element.text)
+                    for element in ET.fromstring(body).iter("PartNumber")
+                ]
+                objects[path] = b"".join(parts[number] for number in numbers)
+                self.reply(200, b"<CompleteMultipartUploadResult/>")
+
+        def do_DELETE(self):
+            _, query, _ = self.parse()
+            del uploads[query["uploadId"]]
+            self.reply(204)
+
+        def do_HEAD(self):
+            path, _, _ = self.parse()
+            if path in objects:
+                self.reply(200, headers={"Content-Length": str(len(objects[path]))})
+            else:
+                self.reply(404)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.objects = objects
+    server.uploads = uploads
+    server.requests = requests
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sink(s3_server):
+    client = S3Client(s3_server.url, "access", "secret")
+    return S3Sink(client, "bucket", "takeout/", part_size=PART_SIZE)
+
+
+def test_multipart_upload(s3_server, sink):
+    data = os.urandom(PART_SIZE * 5 // 2)
+    with sink.open("data.bin") as f:
+        for i in range(0, len(data), 100):
+            f.write(data[i : i + 100])
+        assert f.tell() == len(data)
+    assert s3_server.objects["/bucket/takeout/data.bin"] == data
+    assert [method for method, _ in s3_server.requests] == [
+        "POST",
+        "PUT",
+        "PUT",
+        "PUT",
+        "POST",
+    ]
+    assert sink.size("data.bin") == len(data)
+    assert not sink.exists("missing.bin")
+
+
+def test_small_object_single_request(s3_server, sink):
+    with sink.open("small.bin") as f:
+        f.write(b"small")
+    assert s3_server.objects["/bucket/takeout/small.bin"] == b"small"
+    assert s3_server.requests == [("PUT", [])]
+
+
+def test_failed_write_aborts_upload(s3_server, sink):
+    def interrupted_upload():
+        with sink.open("data.bin") as f:
+            f.write(os.urandom(PART_SIZE * 2))
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        interrupted_upload()
+    assert s3_server.objects == {}
+    assert s3_server.uploads == {}
+    assert s3_server.requests[-1] == ("DELETE", ["uploadId"])
+
+
+@pytest.mark.parametrize("no_checkout", [False, True])
+def test_backup_uploads_archives(make_remote, tmp_path, s3_server, sink, no_checkout):
+    working_dir = tmp_path / "backups"
+    tasks = [("repo", make_remote(), working_dir / "repo", None)]
+    options = {
+        "include_history": False,
+        "keep": False,
+        "show_progress": False,
+        "no_checkout": no_checkout,
+        "sink": sink,
+        "manifest": Manifest(working_dir / MANIFEST_NAME, exists=sink.exists),
+    }
+    results = githubtakeout.backup_all(tasks, archive_format="zip", **options)
+    assert results[0].error is None
+    assert not (working_dir / "repo.zip").exists()
+    archive = s3_server.objects["/bucket/takeout/repo.zip"]
+    with zipfile.ZipFile(io.BytesIO(archive)) as zip_archive:
+        assert "repo/README.md" in zip_archive.namelist()
+
+    # the uploaded archive is checked instead of a local file
+    s3_server.requests.clear()
+    githubtakeout.backup_all(tasks, archive_format="zip", **options)
+    assert s3_server.requests == [("HEAD", [])]
+
+    githubtakeout.backup_all(tasks, archive_format="tar", **options)
+    archive = s3_server.objects["/bucket/takeout/repo.tar.gz"]
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar_archive:
+        assert "repo/src/main.py" in tar_archive.getnames()
@@ -0,0 +1,113 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for size-aware scheduling and disk space admission control."""
+
+import pytest
+
+import githubtakeout
+from githubtakeout import scheduler
+from githubtakeout.scheduler import Scheduler, estimate_footprint, parse_size
+
+GiB = 1024**3
+
+
+@pytest.mark.parametrize(
+    ("text", "size"),
+    [("512", 512), ("10k", 10240), ("500M", 500 * 1024**2), ("2GiB", 2 * GiB)],
+)
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+def test_parse_invalid_size():
+    with pytest.raises(ValueError, match="invalid size"):
+        parse_size("2 gigs")
+
+
+def test_estimate_footprint():
+    assert estimate_footprint(None) == 0
+    # objects, checked out files, and the archive
+    assert estimate_footprint(1024, archive_format="zip") == 3 * 1024**2
+    assert estimate_footprint(1024, archive_format="none") == 2 * 1024**2
+    assert estimate_footprint(1024, include_history=True) == 4 * 1024**2
+    assert estimate_footprint(1024, sink=object()) == 2 * 1024**2
+
+
+def test_largest_first_within_budget():
+    items = [(name, "/", size * GiB, False) for name, size in (("a", 1), ("b", 6))]
+    items += [("c", "/", 4 * GiB, False), ("d", "/", 9 * GiB, True)]
+    queue = Scheduler(items, budget=8 * GiB, free_space=lambda path: 100 * GiB)
+    assert queue.next() == ("b", 6 * GiB, True)
+    # "c" doesn't fit in the budget next to "b", a smaller repo is admitted
+    assert queue.next() == ("a", GiB, True)
+    queue.done(6 * GiB)
+    assert queue.next() == ("c", 4 * GiB, True)
+    queue.done(GiB)
+    queue.done(4 * GiB)
+    # deferred repos run last, and alone, even when larger than the budget
+    assert queue.next() == ("d", 9 * GiB, True)
+    queue.done(9 * GiB)
+    assert queue.next() is None
+
+
+def test_items_added_while_running():
+    queue = Scheduler(budget=8 * GiB, free_space=lambda path: 100 * GiB, closed=False)
+    queue.add(("a", "/", GiB, False))
+    queue.add(("d", "/", 9 * GiB, True))
+    assert queue.next() == ("a", GiB, True)
+    queue.add(("b", "/", 6 * GiB, False))
+    assert queue.next() == ("b", 6 * GiB, True)
+    queue.done(GiB)
+    queue.done(6 * GiB)
+    # a deferred repo waits until no more repos can be added
+    queue.close()
+    assert queue.next() == ("d", 9 * GiB, True)
+    queue.done(9 * GiB)
+    assert queue.next() is None
+
+
+def test_not_enough_free_space():
+    items = [("big", "/", 50 * GiB, False), ("small", "/", GiB, False)]
+    queue = Scheduler(items, free_space=lambda path: 10 * GiB)
+    assert queue.next() == ("big", 50 * GiB, False)
+    assert queue.next() == ("small", GiB, True)
+
+
+def test_space_being_freed():
+    # 40 GiB are freed once the dirs being deleted are gone
+    free = [10 * GiB]
+
+    def settle():
+        free[0] += 40 * GiB
+
+    items = [("big", "/", 50 * GiB, False)]
+    queue = Scheduler(items, free_space=lambda path: free[0], settle=settle)
+    assert queue.next() == ("big", 50 * GiB, True)
+
+
+def test_backup_all_size_limits(make_remote, tmp_path, monkeypatch, caplog):
+    caplog.set_level("INFO")
+    monkeypatch.setattr(scheduler, "disk_free", lambda path: 100 * 1024**2)
+    working_dir = tmp_path / "backups"
+    sizes = {"small": 1, "large": 10 * 1024, "huge": 100 * 1024}
+    tasks = [
+        githubtakeout.Task(name, make_remote(name), working_dir / name, None, size)
+        for name, size in sizes.items()
+    ]
+    tasks = [githubtakeout.limit_size(task, 5 * 1024**2, True) for task in tasks]
+    assert [task.deferred for task in tasks] == [False, True, True]
+    results = githubtakeout.backup_all(
+        tasks,
+        archive_format="zip",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+    )
+    # results are in the order of the tasks, whatever order they ran in
+    assert [result.name for result in results] == ["small", "large", "huge"]
+    assert [result.error is None for result in results] == [True, True, False]
+    assert "not enough disk space" in results[2].error
+    assert (working_dir / "large.zip").exists()
+    assert not (working_dir / "huge").exists()
+    assert "deferring large repo to the end of the run: large" in caplog.text
@@ -0,0 +1,80 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for dated snapshots of the backups dir, and pruning them."""
+
+import os
+from datetime import UTC, datetime, timedelta
+
+from githubtakeout.snapshots import SNAPSHOTS_NAME, Snapshots
+
+START = datetime(2026, 3, 2, 12, tzinfo=UTC)
+
+
+def test_snapshots_share_unchanged_files(tmp_path):
+    (tmp_path / "repo" / "src").mkdir(parents=True)
+    (tmp_path / "repo" / "README.md").write_text("# test repo\n")
+    (tmp_path / "repo" / "src" / "main.py").write_text("print('hi')\n")
+    (tmp_path / "repo" / "link").symlink_to("README.md")
+    (tmp_path / "repo.zip").write_bytes(b"archive 1")
+    (tmp_path / "store").mkdir()
+    (tmp_path / ".manifest.json").write_text("{}")
+    snapshots = Snapshots(tmp_path, exclude=["store"])
+    first = snapshots.take(START)
+    assert first == tmp_path / SNAPSHOTS_NAME / "20260302T120000"
+    assert sorted(path.name for path in first.iterdir()) == ["repo", "repo.zip"]
+    assert (first / "repo" / "link").readlink().as_posix() == "README.md"
+    # archives are linked, files in dirs are copied
+    assert (first / "repo.zip").samefile(tmp_path / "repo.zip")
+    assert not (first / "repo" / "README.md").samefile(tmp_path / "repo" / "README.md")
+
+    # archives are replaced, files in dirs may be changed in place
+    (tmp_path / "repo.zip.tmp").write_bytes(b"archive 2")
+    os.replace(tmp_path / "repo.zip.tmp", tmp_path / "repo.zip")
+    main_path = tmp_path / "repo" / "src" / "main.py"
+    main_path.write_text("print('bye')\n")
+    os.utime(main_path, (0, 0))
+    # a day later, so the first isn't pruned
+    second = snapshots.take(START + timedelta(days=1))
+    assert (second / "repo" / "README.md").samefile(first / "repo" / "README.md")
+    assert not (second / "repo" / "src" / "main.py").samefile(
+        first / "repo" / "src" / "main.py"
+    )
+    assert (first / "repo" / "src" / "main.py").read_text() == "print('hi')\n"
+    assert (second / "repo" / "src" / "main.py").read_text() == "print('bye')\n"
+    assert (first / "repo.zip").read_bytes() == b"archive 1"
+    assert (second / "repo.zip").read_bytes() == b"archive 2"
+
+
+def test_interrupted_snapshots_are_discarded(tmp_path):
+    (tmp_path / "repo.zip").write_bytes(b"archive")
+    (tmp_path / SNAPSHOTS_NAME / "20260301T000000.tmp").mkdir(parents=True)
+    snapshots = Snapshots(tmp_path)
+    snapshots.take(START)
+    assert snapshots.snapshots() == ["20260302T120000"]
+    assert [path.name for path in (tmp_path / SNAPSHOTS_NAME).iterdir()] == [
+        "20260302T120000"
+    ]
+
+
+def test_prune(tmp_path):
+    # two snapshots a day, for four weeks
+    snapshots = Snapshots(tmp_path, keep_daily=3, keep_weekly=2)
+    for day in range(28):
+        for hour in (0, 12):
+            timestamp = START + timedelta(days=day, hours=hour - 12)
+            (snapshots.path / timestamp.strftime("%Y%m%dT%H%M%S")).mkdir(parents=True)
+    snapshots.prune()
+    assert snapshots.snapshots() == [
+        # the last of the week before (a Sunday)
+        "20260322T120000",
+        # the last of each of the last three days
+        "20260327T120000",
+        "20260328T120000",
+        "20260329T120000",
+    ]
+
+    snapshots.keep_daily = snapshots.keep_weekly = 0
+    snapshots.prune()
+    # the newest is always kept
+    assert snapshots.snapshots() == ["20260329T120000"]
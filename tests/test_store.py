@@ -0,0 +1,77 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for the deduplicating backup store."""
+
+import pytest
+
+import githubtakeout
+from githubtakeout.store import STORE_NAME, Store
+
+
+def make_tree(repo_dir, files):
+    for path, content in files.items():
+        file_path = repo_dir / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+
+def test_snapshot_deduplicates(tmp_path):
+    store = Store(tmp_path / STORE_NAME)
+    shared = {"LICENSE": "MIT\n", "src/lib.py": "x = 1\n"}
+    make_tree(tmp_path / "upstream", shared)
+    make_tree(tmp_path / "fork", {**shared, "FORK.md": "forked\n"})
+    _, num_new, _ = store.snapshot(tmp_path / "upstream", "upstream")
+    assert num_new == 2
+    _, num_new, size_new = store.snapshot(tmp_path / "fork", "fork")
+    assert (num_new, size_new) == (1, len("forked\n"))
+    # nothing changed since the last run
+    _, num_new, _ = store.snapshot(tmp_path / "fork", "fork")
+    assert num_new == 0
+    assert len(list(store.objects_dir.rglob("*"))) == 3 + 3  # 3 objects, 3 dirs
+    assert len(store.snapshots("fork")) == 2
+
+
+def test_restore(tmp_path):
+    store = Store(tmp_path / STORE_NAME)
+    repo_dir = tmp_path / "repo"
+    make_tree(repo_dir, {"README.md": "v1\n", "bin/run.sh": "#!/bin/sh\n"})
+    (repo_dir / "bin" / "run.sh").chmod(0o755)
+    (repo_dir / "empty").mkdir()
+    (repo_dir / "LINK").symlink_to("README.md")
+    first, _, _ = store.snapshot(repo_dir, "repo")
+    (repo_dir / "README.md").write_text("v2\n")
+    store.snapshot(repo_dir, "repo")
+
+    latest_dir = tmp_path / "latest"
+    store.restore("repo", latest_dir)
+    assert (latest_dir / "README.md").read_text() == "v2\n"
+    assert (latest_dir / "bin" / "run.sh").stat().st_mode & 0o777 == 0o755
+    assert (latest_dir / "empty").is_dir()
+    assert (latest_dir / "LINK").readlink().name == "README.md"
+
+    first_dir = tmp_path / "first"
+    store.restore("repo", first_dir, snapshot=first.stem)
+    assert (first_dir / "README.md").read_text() == "v1\n"
+
+    with pytest.raises(FileNotFoundError):
+        store.restore("missing", tmp_path / "missing")
+
+
+def test_backup_to_store(make_remote, tmp_path, caplog):
+    caplog.set_level("INFO")
+    url = make_remote()
+    working_dir = tmp_path / "backups"
+    githubtakeout.get_and_archive_repo(
+        url,
+        working_dir / "repo",
+        archive_format="zip",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        store=Store(working_dir / STORE_NAME),
+    )
+    assert "stored snapshot" in caplog.text
+    assert (working_dir / "repo.zip").exists()
+    githubtakeout.restore(tmp_path, "repo")
+    assert (tmp_path / "restored" / "repo" / "src" / "main.py").exists()
@@ -0,0 +1,114 @@
+# Copyright (c) 2015-2026 Corey Goldberg
+# License: MIT
+
+"""Tests for the throughput of previous runs, and estimating runs with it."""
+
+import pytest
+
+import githubtakeout
+from githubtakeout.metrics import RepoMetrics
+from githubtakeout.throughput import (
+    THROUGHPUT_RUNS,
+    Throughput,
+    add_sample,
+    empty_sums,
+    fit,
+    makespan,
+)
+
+
+def repo_metrics(clone_secs, archive_secs, bytes_written=None):
+    metrics = RepoMetrics("repo", measure=False)
+    metrics.phases = {"clone": clone_secs, "archive": archive_secs}
+    metrics.bytes_written = bytes_written
+    return metrics
+
+
+def test_fit_separates_overhead_from_rate():
+    sums = empty_sums()
+    # 2 secs per repo, plus 1 sec per MiB
+    for size in (1, 10, 100):
+        add_sample(sums, size * 1024**2, 2 + size)
+    overhead, secs_per_byte = fit(sums)
+    assert overhead == pytest.approx(2)
+    assert secs_per_byte * 1024**2 == pytest.approx(1)
+    assert fit({}) is None
+
+
+def test_makespan():
+    assert makespan([4, 3, 2, 1], jobs=2) == 5
+    assert makespan([4, 3, 2, 1], jobs=8) == 4
+    assert makespan([], jobs=2) == 0
+
+
+def test_runs_are_recorded_and_trimmed(tmp_path):
+    path = tmp_path / "throughput.json"
+    for _ in range(THROUGHPUT_RUNS + 2):
+        throughput = Throughput(path)
+        throughput.add("zip", 1024**2, repo_metrics(1.0, 0.5, 512 * 1024))
+        skipped = repo_metrics(1.0, 0.5)
+        skipped.skipped = True
+        throughput.add("zip", 1024**2, skipped)
+        throughput.save()
+    throughput = Throughput(path)
+    assert len(throughput.runs) == THROUGHPUT_RUNS
+    assert throughput.sums("zip", "transfer")["n"] == THROUGHPUT_RUNS
+    assert throughput.model("zip", "archive") == (0.0, pytest.approx(0.5 / 1024**2))
+    assert throughput.ratio("zip") == 0.5
+    assert throughput.model("tar", "total") is None
+
+
+def test_estimate_run(tmp_path, caplog):
+    caplog.set_level("INFO")
+    throughput = Throughput(tmp_path / "throughput.json")
+    # 1 sec per MiB, for everything
+    for size in (1, 4):
+        throughput.add("zip", size * 1024**2, repo_metrics(size / 2, size / 2, 0))
+    throughput.save()
+    options = {
+        "archive_format": "zip",
+        "include_history": False,
+        "mirror": False,
+        "no_checkout": False,
+        "sink": None,
+        "throughput": throughput,
+    }
+    tasks = [
+        githubtakeout.Task(name, None, tmp_path / name, None, size * 1024)
+        for name, size in (("a", 4), ("b", 3), ("c", 2), ("d", 1))
+    ]
+    githubtakeout.estimate_run([(tasks, options)], jobs=2)
+    assert "plan for 4 repos, with 2 jobs:" in caplog.text
+    assert "transfer: 10.0 MiB (at most)" in caplog.text
+    # the two largest repos at once, each 3x its size on disk
+    assert "peak scratch disk: 21.0 MiB" in caplog.text
+    assert "wall time: 5s" in caplog.text
+
+    # without previous runs, only sizes are estimated
+    caplog.clear()
+    options["throughput"] = Throughput(tmp_path / "none.json")
+    githubtakeout.estimate_run([(tasks, options)], jobs=2, disk_budget=1)
+    assert "peak scratch disk: 12.0 MiB" in caplog.text
+    assert "wall time: unknown" in caplog.text
+    assert "zip: no previous runs" in caplog.text
+
+
+def test_backups_are_timed(make_remote, tmp_path):
+    throughput = Throughput(tmp_path / "throughput.json")
+    tasks = [
+        githubtakeout.Task(
+            "repo", make_remote(), tmp_path / "backups" / "repo", None, 8
+        )
+    ]
+    githubtakeout.backup_all(
+        tasks,
+        archive_format="tar",
+        include_history=False,
+        keep=False,
+        show_progress=False,
+        throughput=throughput,
+    )
+    throughput.save()
+    assert throughput.sums("tar", "transfer")["bytes"] == 8 * 1024
+    assert throughput.sums("tar", "archive")["n"] == 1
+    assert throughput.ratio("tar") > 0